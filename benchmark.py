@@ -0,0 +1,76 @@
+"""
+Benchmark
+=========
+
+by @HikariTenshi
+
+This script measures the wall time, rows per second, database queries and peak memory of the calculations
+for the stored builds and synthetic long rotations, without the GUI. The results can be saved as a baseline
+and compared against later, the script exits with 1 if a metric got worse than the threshold allows.
+
+Example Usage:
+
+    python benchmark.py --output baseline.json
+    python benchmark.py --compare baseline.json --threshold 0.1
+    python benchmark.py --no-builds --lengths 200 1000 --phases simulate --no-memory
+"""
+
+import argparse
+import logging
+import sys
+from engine.batch import BUILD_TABLES
+from engine.benchmark import DEFAULT_THRESHOLD, PHASES, SYNTHETIC_LENGTHS, compare_results, load_baseline, run_benchmarks, save_baseline
+from config.constants import logger
+
+logger = logging.getLogger(__name__)
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Benchmark the calculations for the stored builds and synthetic rotations.")
+    parser.add_argument("--tables", nargs="+", default=BUILD_TABLES, help="The tables to read the builds from.")
+    parser.add_argument("--lengths", nargs="+", type=int, default=SYNTHETIC_LENGTHS, help="The amounts of steps of the synthetic rotations.")
+    parser.add_argument("--phases", nargs="+", choices=PHASES, default=PHASES, help="The phases to measure.")
+    parser.add_argument("--no-builds", action="store_true", help="Only benchmark the synthetic rotations.")
+    parser.add_argument("--no-synthetic", action="store_true", help="Only benchmark the stored builds.")
+    parser.add_argument("--repeat", type=int, default=3, help="The amount of timed runs of each phase, the best one is reported.")
+    parser.add_argument("--no-memory", action="store_true", help="Don't measure the peak memory, tracing the allocations is slow.")
+    parser.add_argument("--output", help="Save the results as a baseline to this JSON file.")
+    parser.add_argument("--compare", help="Compare the results against the baseline in this JSON file.")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="The relative increase of a metric that counts as a regression.")
+    arguments = parser.parse_args()
+    if arguments.repeat < 1:
+        parser.error("--repeat must be at least 1")
+    return arguments
+
+def main():
+    arguments = parse_arguments()
+    baseline = load_baseline(arguments.compare) if arguments.compare else None
+    results = run_benchmarks(
+        tables=arguments.tables, lengths=arguments.lengths, phases=arguments.phases, repeat=arguments.repeat,
+        include_builds=not arguments.no_builds, include_synthetic=not arguments.no_synthetic, trace_memory=not arguments.no_memory)
+
+    for fixture, phases in results["results"].items():
+        if "error" in phases:
+            logger.info(f"{fixture:<28} {phases['error']}")
+            continue
+        for phase, metrics in phases.items():
+            memory = f"{metrics['peak_memory'] / 1024 / 1024:>8.2f} MiB" if metrics["peak_memory"] is not None else ""
+            logger.info(
+                f"{fixture:<28} {phase:<11} {metrics['wall_time']:>9.4f} s {metrics['rows_per_second']:>10.1f} rows/s "
+                f"{metrics['db_queries']:>6} queries {memory}")
+
+    if arguments.output:
+        save_baseline(results, arguments.output)
+        logger.info(f"Saved the results to {arguments.output}")
+
+    if baseline is not None:
+        regressions = compare_results(results, baseline, arguments.threshold)
+        for regression in regressions:
+            logger.warning(
+                f'{regression["fixture"]} {regression["phase"]} {regression["metric"]}: '
+                f'{regression["baseline"]:.4g} -> {regression["current"]:.4g} (+{regression["change"]:.0%})')
+        if regressions:
+            sys.exit(1)
+        logger.info(f"No regressions above {arguments.threshold:.0%} compared to {arguments.compare}")
+
+if __name__ == "__main__":
+    main()
@@ -12,6 +12,7 @@ Constants
 - **CONSTANTS_DB_PATH**: Path to the constants database file.
 - **CHARACTERS_DB_PATH**: Path to the characters database folder.
 - **CALCULATOR_DB_PATH**: Path to the calculator database file.
+- **RESULT_CACHE_DB_PATH**: Path to the database file the results of previous calculations are cached in.
 - **CONFIG_PATH**: Path to the table configuration JSON file.
 - **UI_FILE**: Path to the UI file.
 - **CREDENTIALS_PATH**: Path to the credentials JSON file.
@@ -45,6 +46,7 @@ VERSION = "V3.4.3"
 CONSTANTS_DB_PATH = "databases/constants.db"
 CHARACTERS_DB_PATH = "databases/characters"
 CALCULATOR_DB_PATH = "databases/calculator.db"
+RESULT_CACHE_DB_PATH = "databases/result_cache.db"
 CONFIG_PATH = "config/table_config.json"
 UI_FILE = "ui/calc_gui.ui"
 CREDENTIALS_PATH = "credentials/credentials.json"
@@ -0,0 +1,202 @@
+"""
+Batch
+=====
+
+by @HikariTenshi
+original script by @Maygi
+
+This module evaluates many build strings at once without the GUI. The build strings are
+decoded into a lineup and a rotation, simulated in a process pool with one worker per CPU core
+and the results are streamed to a JSONL file or a database table as soon as each build is done.
+"""
+
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from utils.database_io import connect_to_database, create_table, fetch_data_from_database, table_exists
+from engine.build_codec import parse_build
+from engine.game_data import get_game_data, get_table_config
+from engine.simulation import simulate
+from config.constants import logger, CALCULATOR_DB_PATH, CONSTANTS_DB_PATH
+
+logger = logging.getLogger(__name__)
+
+# The tables of the constants database that contain build strings
+BUILD_TABLES = ["ApprovedBuilds", "ExperimentalBuilds"]
+
+# The columns of the results table, the ID column is added by create_table
+RESULT_COLUMNS = {
+    "Source": "TEXT",
+    "SourceID": "INTEGER",
+    "Name": "TEXT",
+    "OpenerDPS": "REAL",
+    "LoopDPS": "REAL",
+    "DPS2Mins": "REAL",
+    "Complexity": "REAL",
+    "Error": "TEXT"
+}
+
+def decode_build(build):
+    """
+    Decode a build string into a character lineup and a rotation, like import_build does for the GUI.
+
+    :param build: The build string, in the legacy or the compact format of the build codec.
+    :type build: str
+    :return: The name of the build, the lineup as dictionaries with the CharacterLineup column names as keys
+        and the rotation as (character, skill) pairs.
+    :rtype: tuple
+    :raises MalformedBuildError: If the build string doesn't have the expected sections or values.
+    """
+    decoded = parse_build(build, strict=False)
+    return decoded.name, decoded.lineup, decoded.rotation
+
+def get_settings(db_name=CALCULATOR_DB_PATH):
+    """
+    Get the calculation settings, from the calculator database if it has been initialized
+    or the initial data of the Settings table otherwise.
+
+    :param db_name: The calculator database, defaults to CALCULATOR_DB_PATH.
+    :type db_name: str, optional
+    :return: The settings, with the column names of the Settings table as keys.
+    :rtype: dict
+    """
+    table = get_table_config(CALCULATOR_DB_PATH, "Settings")
+    columns = list(table["db_columns"].keys())
+    if os.path.exists(db_name) and table_exists(db_name, "Settings"):
+        rows = fetch_data_from_database(db_name, "Settings", columns=columns)
+        if rows:
+            return dict(zip(columns, rows[0]))
+    return dict(zip(columns, table["initial_data"][0]))
+
+def get_stored_builds(db_name=CONSTANTS_DB_PATH, tables=None):
+    """
+    Get the build strings stored in the constants database.
+
+    :param db_name: The database containing the builds, defaults to CONSTANTS_DB_PATH.
+    :type db_name: str, optional
+    :param tables: The tables to read the builds from, defaults to BUILD_TABLES.
+    :type tables: list, optional
+    :return: The builds as (source, ID, build string) tuples.
+    :rtype: list
+    """
+    builds = []
+    for table_name in tables or BUILD_TABLES:
+        for build_id, build in fetch_data_from_database(db_name, table_name, columns=["ID", "Build"]):
+            builds.append((table_name, build_id, build))
+    return builds
+
+def init_worker():
+    """
+    Load the reference data once per worker process, so the builds don't have to wait for it.
+    """
+    get_game_data()
+
+def evaluate_build(source, source_id, build, settings):
+    """
+    Decode and simulate a single build string.
+
+    :param source: Where the build comes from, e.g. the name of its table.
+    :type source: str
+    :param source_id: The ID of the build in its source.
+    :type source_id: int
+    :param build: The build string.
+    :type build: str
+    :param settings: The settings, with the column names of the Settings table as keys.
+    :type settings: dict
+    :return: The result, with the column names of RESULT_COLUMNS as keys.
+        If the build could not be evaluated, the DPS values are None and Error describes the problem.
+    :rtype: dict
+    """
+    result = dict.fromkeys(RESULT_COLUMNS)
+    result.update({"Source": source, "SourceID": source_id})
+    try:
+        name, lineup, rotation = decode_build(build)
+        result["Name"] = name
+        simulation = simulate(lineup, rotation, settings)
+        result.update({
+            "OpenerDPS": simulation.opener_dps,
+            "LoopDPS": simulation.loop_dps,
+            "DPS2Mins": simulation.dps_2_mins,
+            "Complexity": simulation.complexity
+        })
+    except Exception as e:
+        result["Error"] = f"{type(e).__name__}: {e}"
+    return result
+
+class JsonlResultWriter:
+    """
+    Writes batch results to a JSONL file, one JSON object per line.
+
+    :param path: The path of the file, an existing file is overwritten.
+    :type path: str
+    """
+    def __init__(self, path):
+        self.file = open(path, "w", encoding="utf-8")
+
+    def write(self, result):
+        self.file.write(json.dumps(result) + "\n")
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+class DatabaseResultWriter:
+    """
+    Writes batch results to a table of a database, the table is created if it doesn't exist and cleared otherwise.
+
+    :param db_name: The name of the database.
+    :type db_name: str
+    :param table_name: The name of the table.
+    :type table_name: str
+    """
+    def __init__(self, db_name, table_name):
+        self.table_name = table_name
+        self.conn = connect_to_database(db_name)
+        create_table(self.conn, table_name, RESULT_COLUMNS)
+        self.conn.execute(f"DELETE FROM {table_name}")
+        self.conn.commit()
+
+    def write(self, result):
+        columns = list(RESULT_COLUMNS)
+        self.conn.execute(
+            f"INSERT INTO {self.table_name} ({', '.join(columns)}) VALUES ({', '.join(['?'] * len(columns))})",
+            [result[column] for column in columns])
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+def run_batch(builds, writer, settings=None, max_workers=None):
+    """
+    Evaluate build strings in a process pool and write every result as soon as it is done.
+
+    :param builds: The builds as (source, ID, build string) tuples.
+    :type builds: list
+    :param writer: The writer the results are streamed to, e.g. a JsonlResultWriter or a DatabaseResultWriter.
+    :type writer: object
+    :param settings: The settings, defaults to the settings of the calculator database.
+    :type settings: dict, optional
+    :param max_workers: The amount of worker processes, defaults to the amount of CPU cores.
+    :type max_workers: int, optional
+    :return: The results, in the order they were done.
+    :rtype: list
+    """
+    if settings is None:
+        settings = get_settings()
+    max_workers = max_workers or os.cpu_count() or 1
+    start = time.perf_counter()
+    results = []
+
+    logger.info(f"Evaluating {len(builds)} builds with {max_workers} workers...")
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=init_worker) as executor:
+        futures = [executor.submit(evaluate_build, source, source_id, build, settings) for source, source_id, build in builds]
+        for future in as_completed(futures):
+            result = future.result()
+            writer.write(result)
+            results.append(result)
+            if result["Error"]:
+                logger.warning(f'{result["Source"]} {result["SourceID"]} failed: {result["Error"]}')
+    logger.info(f"Evaluated {len(builds)} builds in {time.perf_counter() - start:.2f}s")
+    return results
@@ -0,0 +1,361 @@
+"""
+Benchmark
+=========
+
+by @HikariTenshi
+original script by @Maygi
+
+This module measures the performance of the calculations without the GUI. The fixtures are the
+build strings stored in the constants database and synthetic long rotations, each of them is
+measured for the full simulation, for loading the data only, for the simulation only and for the
+calculation of the GUI, which also reads and writes the tables of a copy of the calculator database.
+The results can be saved as a baseline and later runs compared against it to find regressions.
+"""
+
+import gc
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from utils.config_io import load_config
+from utils.database_io import set_statement_callback, table_exists, clear_and_initialize_table
+from engine.batch import decode_build, get_settings, get_stored_builds
+from engine.calculation import calculate, write_build, write_results
+from engine.game_data import GameData
+from engine.simulation import Simulation, get_rotation_steps
+from config.constants import logger, CALCULATOR_DB_PATH, CONFIG_PATH, CONSTANTS_DB_PATH
+
+logger = logging.getLogger(__name__)
+
+# The version of the baseline file format
+BASELINE_VERSION = 1
+
+# The amount of rotation steps of the synthetic fixtures
+SYNTHETIC_LENGTHS = [200, 1000, 5000]
+
+# full: loading the data and simulating, load: loading the data and setting up the simulation, simulate: only running the simulation,
+# calculation: reading the tables of the calculator database, simulating and writing the results back, like the GUI
+PHASES = ["full", "load", "simulate", "calculation"]
+
+# The metrics that get worse when they increase, compared against the baseline
+COMPARED_METRICS = ["wall_time", "db_queries", "peak_memory"]
+
+# The relative increase of a metric that counts as a regression
+DEFAULT_THRESHOLD = 0.2
+
+class QueryCounter:
+    """
+    Counts the SQL statements executed on the connections of the database helpers within a with block.
+    """
+    def __init__(self):
+        self.count = 0
+
+    def __enter__(self):
+        set_statement_callback(self.count_statement)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        set_statement_callback(None)
+
+    def count_statement(self, statement):
+        self.count += 1
+
+def get_build_fixtures(db_name=CONSTANTS_DB_PATH, tables=None):
+    """
+    Get the stored build strings as fixtures, skipping the ones that can't be decoded.
+
+    :param db_name: The database containing the builds, defaults to CONSTANTS_DB_PATH.
+    :type db_name: str, optional
+    :param tables: The tables to read the builds from, defaults to BUILD_TABLES.
+    :type tables: list, optional
+    :return: The fixtures as (name, lineup, rotation) tuples, named after the table and ID of the build.
+    :rtype: list
+    """
+    fixtures = []
+    for source, build_id, build in get_stored_builds(db_name, tables):
+        try:
+            _, lineup, rotation = decode_build(build)
+        except ValueError as e:
+            logger.warning(f"Skipping the build {source}/{build_id}: {e}")
+            continue
+        fixtures.append((f"{source}/{build_id}", lineup, rotation))
+    return fixtures
+
+def get_synthetic_fixtures(lineup, rotation, lengths=None):
+    """
+    Get long rotations by repeating a rotation until it has the given amount of steps.
+
+    :param lineup: The lineup of the rotation.
+    :type lineup: list
+    :param rotation: The rotation steps as (character, skill) pairs.
+    :type rotation: list
+    :param lengths: The amounts of steps, defaults to SYNTHETIC_LENGTHS.
+    :type lengths: list, optional
+    :return: The fixtures as (name, lineup, rotation) tuples, named after their amount of steps.
+    :rtype: list
+    """
+    steps = get_rotation_steps(rotation)
+    fixtures = []
+    for length in lengths or SYNTHETIC_LENGTHS:
+        repeated = [steps[i % len(steps)] for i in range(length)]
+        fixtures.append((f"synthetic/{length}", lineup, repeated))
+    return fixtures
+
+def find_base_fixture(fixtures, settings, game_data):
+    """
+    Find the first fixture that can be simulated, to repeat its rotation for the synthetic fixtures.
+
+    :param fixtures: The fixtures as (name, lineup, rotation) tuples.
+    :type fixtures: list
+    :param settings: The settings, with the column names of the Settings table as keys.
+    :type settings: dict
+    :param game_data: The reference data.
+    :type game_data: GameData
+    :return: The first working fixture, or None if none of them can be simulated.
+    :rtype: tuple
+    """
+    for fixture in fixtures:
+        name, lineup, rotation = fixture
+        try:
+            Simulation(lineup, rotation, settings, game_data=game_data).run()
+        except Exception as e:
+            logger.debug(f"{name} can't be used for the synthetic fixtures: {type(e).__name__}: {e}")
+            continue
+        return fixture
+    return None
+
+def create_calculator_copy(directory, db_name=CALCULATOR_DB_PATH):
+    """
+    Copy the calculator database, so the calculation phase doesn't change the tables of the GUI.
+    The tables that don't exist yet are initialized like the GUI does when it starts.
+
+    :param directory: The directory to create the copy in.
+    :type directory: str
+    :param db_name: The calculator database, defaults to CALCULATOR_DB_PATH.
+    :type db_name: str, optional
+    :return: The path of the copy.
+    :rtype: str
+    """
+    path = os.path.join(directory, os.path.basename(db_name))
+    if os.path.exists(db_name):
+        # Read-only, so closing it doesn't checkpoint the write-ahead log of the GUI
+        source = sqlite3.connect(f"file:{os.path.abspath(db_name)}?mode=ro", uri=True)
+        target = sqlite3.connect(path)
+        try:
+            source.backup(target)
+        finally:
+            source.close()
+            target.close()
+    for table in load_config(CONFIG_PATH)[CALCULATOR_DB_PATH]["tables"]:
+        if not table_exists(path, table["table_name"]):
+            clear_and_initialize_table(path, table["table_name"], table["db_columns"], initial_data=table.get("initial_data", None))
+    return path
+
+def run_calculation(db_name):
+    """
+    Calculate the rotation of a calculator database and write the results back to its tables.
+
+    :param db_name: The calculator database.
+    :type db_name: str
+    """
+    write_results(calculate(db_name), db_name)
+
+def measure(function, setup=None, repeat=3, trace_memory=True):
+    """
+    Measure a function, the best wall time of several runs and the SQL statements and peak memory of one more run.
+    The memory is measured in a separate run, since tracing the allocations slows the function down a lot.
+
+    :param function: The function to measure, called with the return value of setup if it is given.
+    :type function: callable
+    :param setup: Prepares each run without being measured.
+    :type setup: callable, optional
+    :param repeat: The amount of timed runs, defaults to 3.
+    :type repeat: int, optional
+    :param trace_memory: Whether to measure the peak memory, otherwise it is None, defaults to True.
+    :type trace_memory: bool, optional
+    :return: The wall time in seconds, the amount of SQL statements and the peak memory in bytes.
+    :rtype: dict
+    """
+    def prepare():
+        return (setup(),) if setup is not None else ()
+
+    def run_once(arguments):
+        # The setup is done before the collection, so its garbage isn't collected during the measurement
+        gc.collect()
+        start = time.perf_counter()
+        function(*arguments)
+        return time.perf_counter() - start
+
+    wall_time = min(run_once(prepare()) for _ in range(repeat))
+
+    arguments = prepare()
+    peak_memory = None
+    if trace_memory:
+        tracemalloc.start()
+    try:
+        with QueryCounter() as counter:
+            run_once(arguments)
+        if trace_memory:
+            peak_memory = tracemalloc.get_traced_memory()[1]
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+
+    return {"wall_time": wall_time, "db_queries": counter.count, "peak_memory": peak_memory}
+
+def benchmark_fixture(lineup, rotation, settings, game_data, phases=None, repeat=3, trace_memory=True):
+    """
+    Benchmark a fixture in each phase.
+
+    :param lineup: The lineup of the fixture.
+    :type lineup: list
+    :param rotation: The rotation steps as (character, skill) pairs.
+    :type rotation: list
+    :param settings: The settings, with the column names of the Settings table as keys.
+    :type settings: dict
+    :param game_data: The loaded reference data, used by the simulate phase.
+    :type game_data: GameData
+    :param phases: The phases to measure, defaults to PHASES.
+    :type phases: list, optional
+    :param repeat: The amount of timed runs of each phase, defaults to 3.
+    :type repeat: int, optional
+    :param trace_memory: Whether to measure the peak memory, defaults to True.
+    :type trace_memory: bool, optional
+    :return: The metrics of each phase, with the phase names as keys.
+    :rtype: dict
+    """
+    rows = len(get_rotation_steps(rotation))
+    phases = phases or PHASES
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        db_name = None
+        if "calculation" in phases:
+            # The copy has the settings get_settings reads, the build replaces its lineup and rotation
+            db_name = create_calculator_copy(directory)
+            write_build(lineup, rotation, db_name)
+        functions = {
+            "full": (lambda: Simulation(lineup, rotation, settings, game_data=GameData()).run(), None),
+            "load": (lambda: Simulation(lineup, rotation, settings, game_data=GameData()), None),
+            "simulate": (lambda simulation: simulation.run(), lambda: Simulation(lineup, rotation, settings, game_data=game_data)),
+            "calculation": (lambda: run_calculation(db_name), None)
+        }
+        for phase in phases:
+            function, setup = functions[phase]
+            metrics = measure(function, setup, repeat, trace_memory)
+            metrics["rows_per_second"] = rows / metrics["wall_time"] if metrics["wall_time"] else None
+            results[phase] = metrics
+    return results
+
+def run_benchmarks(tables=None, lengths=None, phases=None, repeat=3, include_builds=True, include_synthetic=True, trace_memory=True):
+    """
+    Benchmark the stored builds and the synthetic rotations.
+    A fixture that fails is recorded with its error instead of metrics.
+
+    :param tables: The tables to read the builds from, defaults to BUILD_TABLES.
+    :type tables: list, optional
+    :param lengths: The amounts of steps of the synthetic rotations, defaults to SYNTHETIC_LENGTHS.
+    :type lengths: list, optional
+    :param phases: The phases to measure, defaults to PHASES.
+    :type phases: list, optional
+    :param repeat: The amount of timed runs of each phase, defaults to 3.
+    :type repeat: int, optional
+    :param include_builds: Whether to benchmark the stored builds, defaults to True.
+    :type include_builds: bool, optional
+    :param include_synthetic: Whether to benchmark the synthetic rotations, defaults to True.
+    :type include_synthetic: bool, optional
+    :param trace_memory: Whether to measure the peak memory, defaults to True.
+    :type trace_memory: bool, optional
+    :return: The baseline, with the metrics of each fixture and phase.
+    :rtype: dict
+    """
+    settings = get_settings()
+    game_data = GameData()
+    build_fixtures = get_build_fixtures(tables=tables)
+    fixtures = list(build_fixtures) if include_builds else []
+    if include_synthetic:
+        base_fixture = find_base_fixture(build_fixtures, settings, game_data)
+        if base_fixture is None:
+            logger.warning("None of the stored builds can be simulated, skipping the synthetic fixtures")
+        else:
+            logger.info(f"Repeating the rotation of {base_fixture[0]} for the synthetic fixtures")
+            fixtures.extend(get_synthetic_fixtures(base_fixture[1], base_fixture[2], lengths))
+
+    results = {}
+    for name, lineup, rotation in fixtures:
+        try:
+            results[name] = benchmark_fixture(lineup, rotation, settings, game_data, phases, repeat, trace_memory)
+        except Exception as e:
+            results[name] = {"error": f"{type(e).__name__}: {e}"}
+            logger.warning(f"{name} failed: {results[name]['error']}")
+            continue
+        logger.debug(f"{name}: {results[name]}")
+
+    return {
+        "version": BASELINE_VERSION,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "repeat": repeat,
+        "results": results
+    }
+
+def save_baseline(baseline, path):
+    """
+    Save benchmark results as a JSON file.
+
+    :param baseline: The results of run_benchmarks.
+    :type baseline: dict
+    :param path: The path of the file.
+    :type path: str
+    """
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(baseline, file, indent=2)
+
+def load_baseline(path):
+    """
+    Load benchmark results saved with save_baseline.
+
+    :param path: The path of the file.
+    :type path: str
+    :return: The results.
+    :rtype: dict
+    :raises ValueError: If the file has a different format version.
+    """
+    with open(path, encoding="utf-8") as file:
+        baseline = json.load(file)
+    if baseline.get("version") != BASELINE_VERSION:
+        raise ValueError(f"The baseline {path} has the version {baseline.get('version')}; expected {BASELINE_VERSION}")
+    return baseline
+
+def compare_results(current, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Compare benchmark results against a baseline. Fixtures and phases that are missing from either of them or failed are skipped.
+
+    :param current: The new results of run_benchmarks.
+    :type current: dict
+    :param baseline: The baseline results.
+    :type baseline: dict
+    :param threshold: The relative increase of a metric that counts as a regression, defaults to DEFAULT_THRESHOLD.
+    :type threshold: float, optional
+    :return: The regressions as dictionaries with the keys fixture, phase, metric, baseline, current and change.
+    :rtype: list
+    """
+    regressions = []
+    for fixture, phases in current["results"].items():
+        baseline_phases = baseline["results"].get(fixture)
+        if baseline_phases is None or "error" in phases or "error" in baseline_phases:
+            continue
+        for phase, metrics in phases.items():
+            baseline_metrics = baseline_phases.get(phase)
+            if baseline_metrics is None:
+                continue
+            for metric in COMPARED_METRICS:
+                old, new = baseline_metrics.get(metric), metrics.get(metric)
+                if not old or new is None:
+                    continue
+                change = (new - old) / old
+                if change > threshold:
+                    regressions.append({"fixture": fixture, "phase": phase, "metric": metric, "baseline": old, "current": new, "change": change})
+    return regressions
@@ -0,0 +1,167 @@
+"""
+Buff Map
+========
+
+by @HikariTenshi
+original script by @Maygi
+
+This module contains the total buff map of a rotation step. The stats every step has are
+stored in a fixed layout list indexed by the Stat enum, skill-specific buffs that are added
+while the buffs are processed (e.g. "Skill Name (Additive)") are kept in a small side table.
+"""
+
+import logging
+from enum import IntEnum
+from config.constants import logger
+
+logger = logging.getLogger(__name__)
+
+class Stat(IntEnum):
+    """
+    The index of each stat in the values of a buff map.
+    """
+    ATTACK = 0
+    HEALTH = 1
+    DEFENSE = 2
+    CRIT_RATE = 3
+    CRIT_DMG = 4
+    NORMAL = 5
+    HEAVY = 6
+    SKILL = 7
+    LIBERATION = 8
+    NORMAL_DEEPEN = 9
+    HEAVY_DEEPEN = 10
+    SKILL_DEEPEN = 11
+    LIBERATION_DEEPEN = 12
+    PHYSICAL = 13
+    GLACIO = 14
+    FUSION = 15
+    ELECTRO = 16
+    AERO = 17
+    SPECTRO = 18
+    HAVOC = 19
+    SPECIFIC = 20
+    DEEPEN = 21
+    MULTIPLIER = 22
+    RESISTANCE = 23
+    IGNORE_DEFENSE = 24
+    FLAT_ATTACK = 25
+    FLAT_HEALTH = 26
+    FLAT_DEFENSE = 27
+    ENERGY_REGEN = 28
+
+# The keys of the stats, in the order of the Stat enum
+STAT_KEYS = (
+    "attack",
+    "health",
+    "defense",
+    "crit_rate",
+    "crit_dmg",
+    "normal",
+    "heavy",
+    "skill",
+    "liberation",
+    "normal_(deepen)",
+    "heavy_(deepen)",
+    "skill_(deepen)",
+    "liberation_(deepen)",
+    "physical",
+    "glacio",
+    "fusion",
+    "electro",
+    "aero",
+    "spectro",
+    "havoc",
+    "specific",
+    "deepen",
+    "multiplier",
+    "resistance",
+    "ignore_defense",
+    "flat_attack",
+    "flat_health",
+    "flat_defense",
+    "energy_regen"
+)
+
+STAT_INDICES = {key: index for index, key in enumerate(STAT_KEYS)}
+
+EMPTY_VALUES = [0] * len(STAT_KEYS)
+
+class BuffMap:
+    """
+    The total buffs of a character at a rotation step.
+
+    The map can be used like the dictionary it replaces, looking up a key of a stat reads its slot
+    in :attr:`values`, any other key is stored in :attr:`extra`. Code that only needs the fixed stats
+    should index :attr:`values` with :class:`Stat` directly.
+
+    :param values: The values of the stats, indexed by Stat, defaults to all zeros.
+    :type values: list, optional
+    :param extra: The skill-specific buffs, defaults to an empty dictionary.
+    :type extra: dict, optional
+    """
+    __slots__ = ("values", "extra")
+
+    def __init__(self, values=None, extra=None):
+        self.values = EMPTY_VALUES[:] if values is None else values
+        self.extra = {} if extra is None else extra
+
+    def __repr__(self):
+        return f"BuffMap({dict(self.items())!r})"
+
+    def __len__(self):
+        return len(self.values) + len(self.extra)
+
+    def __iter__(self):
+        yield from STAT_KEYS
+        yield from self.extra
+
+    def __contains__(self, key):
+        return key in STAT_INDICES or key in self.extra
+
+    def __getitem__(self, key):
+        index = STAT_INDICES.get(key)
+        if index is None:
+            return self.extra[key]
+        return self.values[index]
+
+    def __setitem__(self, key, value):
+        index = STAT_INDICES.get(key)
+        if index is None:
+            self.extra[key] = value
+        else:
+            self.values[index] = value
+
+    def get(self, key, default=None):
+        index = STAT_INDICES.get(key)
+        if index is None:
+            return self.extra.get(key, default)
+        return self.values[index]
+
+    def items(self):
+        """
+        Iterate over the keys and the current values of the map, the stats first and then the skill-specific buffs.
+
+        :return: The key and value pairs.
+        :rtype: generator
+        """
+        values = self.values
+        for index, key in enumerate(STAT_KEYS):
+            yield key, values[index]
+        yield from self.extra.items()
+
+    def copy(self):
+        """
+        Create a snapshot of the map.
+
+        :return: The copied buff map.
+        :rtype: BuffMap
+        """
+        return BuffMap(self.values[:], dict(self.extra))
+
+    def reset(self):
+        """
+        Reset all stats to zero and remove the skill-specific buffs.
+        """
+        self.values[:] = EMPTY_VALUES
+        self.extra.clear()
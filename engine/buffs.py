@@ -0,0 +1,456 @@
+"""
+Buffs
+=====
+
+by @HikariTenshi
+original script by @Maygi
+
+This module creates the buff definitions from weapons, echoes and inherent skills,
+and applies active buffs to the total buff map of a rotation step.
+"""
+
+import logging
+from utils.naming_case import camel_to_snake
+from config.constants import logger
+
+logger = logging.getLogger(__name__)
+
+STANDARD_BUFF_TYPES = ["normal", "heavy", "skill", "liberation"]
+ELEMENTAL_BUFF_TYPES = ["glacio", "fusion", "electro", "aero", "spectro", "havoc"]
+
+CLASSIFICATIONS = {
+    "No": "normal",
+    "He": "heavy",
+    "Sk": "skill",
+    "Rl": "liberation",
+    "Gl": "glacio",
+    "Fu": "fusion",
+    "El": "electro",
+    "Ae": "aero",
+    "Sp": "spectro",
+    "Ha": "havoc",
+    "Ph": "physical",
+    "Ec": "echo",
+    "Ou": "outro",
+    "In": "intro"
+}
+
+REVERSE_CLASSIFICATIONS = {value: key for key, value in CLASSIFICATIONS.items()}
+
+def translate_classification_code(code):
+    return CLASSIFICATIONS.get(code) or code # Default to code if not found
+
+def reverse_translate_classification_code(code):
+    return REVERSE_CLASSIFICATIONS.get(code) or code # Default to code if not found
+
+class Buff:
+    """
+    An immutable buff definition.
+
+    Buff definitions are created once per calculation and shared by reference between every active 
+    instance of the buff, so the fields can't be changed after creation. Use :meth:`replace` to derive 
+    a variant of a buff, e.g. an outro buff that has been resolved to the character it applies to.
+
+    :param name: The name of the buff.
+    :type name: str
+    :param type: The type of buff (buff, stacking_buff, dmg, buff_energy, ...).
+    :type type: str
+    :param classifications: The classifications this buff applies to, or All if it applies to all.
+    :type classifications: str
+    :param buff_type: The type of buff - standard, ATK buff, crit buff, elemental buff, etc.
+    :type buff_type: str
+    :param amount: The value of the buff.
+    :type amount: float
+    :param duration: How long the buff lasts, or "Passive" for passive buffs.
+    :type duration: float or str
+    :param triggered_by: The Skill, or Classification type, this buff is triggered by.
+    :type triggered_by: str
+    :param stack_limit: The maximum stack limit of this buff.
+    :type stack_limit: float
+    :param stack_interval: The minimum stack interval of gaining a new stack of this buff.
+    :type stack_interval: float
+    :param applies_to: The character this buff applies to, or Team in the case of a team buff.
+    :type applies_to: str
+    :param can_activate: The character that can activate this buff.
+    :type can_activate: str
+    :param special_condition: A special condition that has to be fulfilled to activate the buff, defaults to None.
+    :type special_condition: str, optional
+    :param additional_condition: Additional classifications or skill names the triggering skill needs to have, defaults to None.
+    :type additional_condition: str, optional
+    :param d_cond: The dynamic conditions (forte, concerto, resonance) the buff changes when activated, defaults to None.
+    :type d_cond: dict, optional
+    """
+    __slots__ = (
+        "name", "type", "classifications", "buff_type", "amount", "duration", "triggered_by", "stack_limit", 
+        "stack_interval", "applies_to", "can_activate", "special_condition", "additional_condition", "d_cond")
+
+    def __init__(self, name, type, classifications, buff_type, amount, duration, triggered_by, stack_limit, stack_interval, applies_to, can_activate, special_condition=None, additional_condition=None, d_cond=None):
+        for field, value in zip(self.__slots__, (name, type, classifications, buff_type, amount, duration, triggered_by, stack_limit, stack_interval, applies_to, can_activate, special_condition, additional_condition, d_cond)):
+            object.__setattr__(self, field, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Buff is read-only")
+
+    def __delattr__(self, name):
+        raise AttributeError("Buff is read-only")
+
+    # Buff definitions are read-only, so copies of a simulation can share them
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __repr__(self):
+        fields = ", ".join(f"{field}={getattr(self, field)!r}" for field in self.__slots__)
+        return f"Buff({fields})"
+
+    def replace(self, **changes):
+        """
+        Create a copy of the buff with some of its fields replaced.
+
+        :param changes: The fields to replace and their new values.
+        :type changes: dict
+        :return: The new buff.
+        :rtype: Buff
+        """
+        fields = {field: getattr(self, field) for field in self.__slots__}
+        fields.update(changes)
+        return Buff(**fields)
+
+class ActiveBuff:
+    """
+    An active instance of a buff in a rotation.
+
+    Only the state that changes while the rotation is simulated is stored here, the buff definition itself is shared.
+
+    :param buff: The buff definition.
+    :type buff: Buff
+    :param start_time: The time the buff becomes active.
+    :type start_time: float
+    :param stacks: The current number of stacks, defaults to 0.
+    :type stacks: int, optional
+    :param stack_time: The time the last stack was gained, defaults to 0.
+    :type stack_time: float, optional
+    """
+    __slots__ = ("buff", "start_time", "stacks", "stack_time")
+
+    def __init__(self, buff, start_time, stacks=0, stack_time=0):
+        self.buff = buff
+        self.start_time = start_time
+        self.stacks = stacks
+        self.stack_time = stack_time
+
+    def __repr__(self):
+        return f"ActiveBuff(buff={self.buff.name!r}, start_time={self.start_time}, stacks={self.stacks}, stack_time={self.stack_time})"
+
+    def copy(self, buff=None):
+        """
+        Create a new active instance with the same state.
+
+        :param buff: The buff definition of the copy, defaults to the definition of this instance.
+        :type buff: Buff, optional
+        :return: The copied active buff.
+        :rtype: ActiveBuff
+        """
+        return ActiveBuff(buff or self.buff, self.start_time, self.stacks, self.stack_time)
+
+def create_echo_buff(echo_buff, character):
+    """
+    Create a new echo buff out of the given echo.
+
+    :param echo_buff: The echo buff information.
+    :type echo_buff: dict
+    :param character: The character the buff applies to.
+    :type character: str
+    :return: The new echo buff.
+    :rtype: Buff
+    """
+    new_applies_to = character if echo_buff["applies_to"] == "Self" else echo_buff["applies_to"]
+    return Buff(
+        name=echo_buff["name"],
+        type=echo_buff["type"], # The type of buff 
+        classifications=echo_buff["classifications"], # The classifications this buff applies to, or All if it applies to all.
+        buff_type=echo_buff["buff_type"], # The type of buff - standard, ATK buff, crit buff, elemental buff, etc
+        amount=echo_buff["amount"], # The value of the buff
+        duration=echo_buff["duration"], # How long the buff lasts - a duration is 0 indicates a passive
+        triggered_by=echo_buff["triggered_by"], # The Skill, or Classification type, this buff is triggered by.
+        stack_limit=echo_buff["stack_limit"], # The maximum stack limit of this buff.
+        stack_interval=echo_buff["stack_interval"], # The minimum stack interval of gaining a new stack of this buff.
+        applies_to=new_applies_to, # The character this buff applies to, or Team in the case of a team buff
+        can_activate=character,
+        additional_condition=echo_buff["additionalCondition"]
+    )
+
+def extract_value_from_rank(value_str, rank):
+    """
+    Extract the value for a given rank from a slash-delimited string.
+
+    This function takes a string containing slash-delimited values and extracts the value corresponding to the given rank.
+    If the rank is out of bounds, it returns the last value in the string as a float. If the input string is not slash-delimited, 
+    it returns the value as a string if it is 'Passive' and as a float otherwise.
+
+    :param value_str: The slash-delimited string containing values.
+    :type value_str: str
+    :param rank: The rank for which the value is to be extracted.
+    :type rank: int
+    :return: The extracted value as a float or string.
+    :rtype: float or string
+    """
+    if value_str is None:
+        return None
+    elif "/" in value_str:
+        values = value_str.split('/')
+        return float(values[rank]) if rank < len(values) else float(values[-1])
+    elif value_str == "Passive":
+        return value_str
+    return float(value_str)
+
+def row_to_weapon_buff(weapon_buff, rank, character):
+    """
+    Convert a raw weapon buff into a refined weapon buff specific to a character and their weapon rank.
+
+    :param weapon_buff: The raw weapon buff information.
+    :type weapon_buff: dict
+    :param rank: The weapon rank.
+    :type rank: int
+    :param character: The character the buff applies to.
+    :type character: str
+    :return: The refined weapon buff.
+    :rtype: Buff
+    """
+    logger.debug(f'weapon buff: {weapon_buff}; amount: {weapon_buff["amount"]}')
+    new_amount = extract_value_from_rank(weapon_buff["amount"], rank)
+    new_duration = extract_value_from_rank(weapon_buff["duration"], rank)
+    new_stack_limit = extract_value_from_rank(str(weapon_buff["stack_limit"]), rank)
+    new_stack_interval = extract_value_from_rank(str(weapon_buff["stack_interval"]), rank)
+    new_applies_to = character if weapon_buff['applies_to'] == "Self" else weapon_buff["applies_to"]
+    
+    return Buff(
+        name=weapon_buff["name"], # buff  name
+        type=weapon_buff["type"], # the type of buff 
+        classifications=weapon_buff["classifications"], # the classifications this buff applies to, or All if it applies to all.
+        buff_type=weapon_buff["buff_type"], # the type of buff - standard, ATK buff, crit buff, deepen, etc
+        amount=new_amount, # slash delimited - the value of the buff
+        duration="Passive" if weapon_buff["duration"] in ("Passive", "0", 0) else new_duration, # slash delimited - how long the buff lasts - a duration is 0 indicates a passive
+        triggered_by=weapon_buff["triggered_by"], # The Skill, or Classification type, this buff is triggered by.
+        stack_limit=new_stack_limit, # slash delimited - the maximum stack limit of this buff.
+        stack_interval=new_stack_interval, # slash delimited - the minimum stack interval of gaining a new stack of this buff.
+        applies_to=new_applies_to, # The character this buff applies to, or Team in the case of a team buff
+        can_activate=character,
+        special_condition=weapon_buff["special_condition"],
+        additional_condition=weapon_buff["additional_condition"]
+    )
+
+def create_active_buff(p_buff, p_time):
+    """
+    Create an active buff.
+
+    :param p_buff: The buff definition.
+    :type p_buff: Buff
+    :param p_time: The time the buff becomes active.
+    :type p_time: float
+    :return: The active buff.
+    :rtype: ActiveBuff
+    """
+    return ActiveBuff(p_buff, p_time)
+
+def create_active_stacking_buff(p_buff, time, p_stacks):
+    """
+    Create an active stacking buff.
+
+    :param p_buff: The buff definition.
+    :type p_buff: Buff
+    :param time: The time the buff becomes active.
+    :type time: float
+    :param p_stacks: The number of stacks the buff starts with.
+    :type p_stacks: int
+    :return: The active stacking buff.
+    :rtype: ActiveBuff
+    """
+    return ActiveBuff(p_buff, time, p_stacks, time)
+
+"""
+Converts a row from the ActiveEffects sheet into a Buff.
+@param {Array} row A single row of data from the ActiveEffects sheet.
+@return {Buff} The row data as a Buff.
+"""
+def row_to_active_effect_object(row, skill_data):
+    is_regular_format = row[7] and str(row[7]).strip() != ""
+    activator = row[10] if is_regular_format else row[6]
+    if skill_data.get(row[0]) is not None:
+        activator = skill_data[row[0]]["source"]
+    if is_regular_format:
+        triggered_by_parsed = row[7]
+        parsed_condition = None
+        parsed_condition2 = None
+        if "&" in row[7]:
+            triggered_by_parsed = row[7].split("&")[0]
+            parsed_condition2 = row[7].split("&")[1]
+            logger.debug(f'conditions for {row[0]}; {triggered_by_parsed}, {parsed_condition2}')
+        elif row[1] != "Dmg" and ";" in row[7]:
+            triggered_by_parsed = row[7].split(";")[0]
+            parsed_condition = row[7].split(";")[1]
+            logger.debug(f'{row[0]}; found special condition: {parsed_condition}')
+        return Buff(
+            name=row[0], # skill name
+            type=camel_to_snake(row[1]), # The type of buff 
+            classifications=row[2], # The classifications this buff applies to, or All if it applies to all.
+            buff_type=camel_to_snake(row[3]), # The type of buff - standard, ATK buff, crit buff, elemental buff, etc
+            amount=row[4], # The value of the buff
+            duration=row[5] if row[5] == "Passive" else float(row[5]), # How long the buff lasts - a duration is 0 indicates a passive
+            triggered_by=triggered_by_parsed, # The Skill, or Classification type, this buff is triggered by.
+            stack_limit=row[8] or 0, # The maximum stack limit of this buff.
+            stack_interval=row[9] or 0, # The minimum stack interval of gaining a new stack of this buff.
+            applies_to=row[10], # The character this buff applies to, or Team in the case of a team buff
+            can_activate=activator,
+            special_condition=parsed_condition,
+            additional_condition=parsed_condition2,
+            d_cond={
+                "forte": row[11] or 0,
+                "concerto": row[12] or 0,
+                "resonance": row[13] or 0
+            }
+        )
+    return Buff( # short format for outros and similar
+        name=row[0],
+        type=camel_to_snake(row[1]),
+        classifications=row[2],
+        buff_type=camel_to_snake(row[3]),
+        amount=row[4],
+        duration=row[5] if row[5] == "Passive" else float(row[5]),
+        triggered_by="", # No triggered_by field for this format
+        stack_limit=0, # Assuming 0 as default value if not present
+        stack_interval=0, # Assuming 0 as default value if not present
+        applies_to=row[6],
+        can_activate=activator,
+        d_cond={
+            "forte": 0,
+            "concerto": 0,
+            "resonance": 0
+        }
+    )
+
+# Buff sorting - damage effects need to always be defined first so if other buffs exist that can be procced by them, then they can be added to the "proccable" list.
+# Buffs that have "Buff:" conditions need to be last, as they evaluate the presence of buffs.
+def compare_buffs(a, b):
+    # If a.type is "Dmg" and b.type is not, a comes first
+    if (a.type == "dmg" or "Hl" in a.classifications) and (b.type != "dmg" and "Hl" not in b.classifications):
+        return -1
+    # If b.type is "Dmg" and a.type is not, b comes first
+    elif (a.type != "dmg" and "Hl" not in a.classifications) and (b.type == "dmg" or "Hl" in b.classifications):
+        return 1
+    # If a.triggered_by contains "Buff:" and b does not, b comes first
+    elif "Buff:" in a.triggered_by and "Buff:" not in b.triggered_by:
+        return 1
+    # If b.triggered_by contains "Buff:" and a does not, a comes first
+    elif "Buff:" not in a.triggered_by and "Buff:" in b.triggered_by:
+        return -1
+    # Both have the same type or either both are "Dmg" types, or both have the same trigger condition
+    # Retain their relative positions
+    else:
+        return 0
+
+def filter_team_buffs(active_buff, current_time):
+    end_time = (
+        active_buff.stack_time if active_buff.buff.type == "stacking_buff" else active_buff.start_time
+    ) + active_buff.buff.duration
+    return current_time <= end_time  # Keep the buff if the current time is less than or equal to the end time
+
+def remove_text_within_parentheses(input_string):
+    while '(' in input_string and ')' in input_string:
+        start = input_string.find('(')
+        end = input_string.find(')', start) + 1
+        input_string = input_string[:start] + input_string[end:]
+    return input_string.strip()
+
+def extract_number_after_x(input_string):
+    x_index = input_string.find('x')
+    
+    if x_index == -1:
+        return None
+
+    number_start_index = x_index + 1
+
+    # Check if the character after 'x' is a digit
+    if number_start_index < len(input_string) and input_string[number_start_index].isdigit():
+        number_end_index = number_start_index
+
+        # Find the end of the digit sequence
+        while number_end_index < len(input_string) and input_string[number_end_index].isdigit():
+            number_end_index += 1
+
+        return int(input_string[number_start_index:number_end_index])
+
+    return None
+
+"""
+Updates the total buff map.
+@buff_category - The base type of the buff (All , AllEle, Fu, Sp, etc)
+@buff_type - The specific type of the buff (Bonus, Attack, Additive)
+@buff_amount - The amount of the buff to add
+@buff_max - The maximum buff value for the stack, for particular buffs have multiple different variations contributing to the same cap (e.g. Jinhsi Incandesence)
+"""
+def update_total_buff_map(buff_category, buff_type, buff_amount, buff_max, total_buff_map, char_data, active_character, skill_ref):
+    if buff_category == "All":
+        for buff in STANDARD_BUFF_TYPES:
+            new_key = translate_classification_code(buff)
+            new_key = f'{new_key} ({buff_type})' if buff_type == "Deepen" else f'{new_key}'
+            if new_key not in total_buff_map:
+                return
+            total_buff_map[new_key] += buff_amount # Update the total amount
+    elif buff_category == "AllEle":
+        for buff in ELEMENTAL_BUFF_TYPES:
+            new_key = translate_classification_code(buff)
+            if new_key not in total_buff_map:
+                return
+            total_buff_map[new_key] += buff_amount # Update the total amount
+    else:
+        categories = buff_category.split(",")
+        for category in categories:
+            new_key = translate_classification_code(category)
+            base_key = remove_text_within_parentheses(new_key)
+            new_key = f'{new_key} ({buff_type})' if buff_type == "Deepen" else f'{new_key}'
+            additional_condition = None
+            if "*" in buff_type: # this is a dynamic buff value that multiplies by a certain condition
+                split = buff_type.split("*")
+                buff_type = split[0]
+                buff_amount *= char_data[active_character]["d_cond"][split[1]]
+            if "&" in buff_type: # this is a dual condition buff
+                split = buff_type.split("&")
+                buff_type = split[0]
+                additional_condition = split[1]
+                logger.debug(f'found dual condition for buff type: {additional_condition}')
+            buff_key = "Specific" if buff_type == "Bonus" else ("Deepen" if buff_type == "Deepen" else "Multiplier")
+            if buff_type == "Additive": # an additive value to a skill multiplier
+                buff_key = "Additive"
+                new_key = f'{base_key} ({buff_key})'
+                if new_key in total_buff_map:
+                    current_bonus = total_buff_map[new_key]
+                    max_value = 99999
+                    if buff_max > 0:
+                        max_value = buff_max
+                    total_buff_map[new_key] = min(max_value, current_bonus + buff_amount) # Update the total amount
+                else: # add the skill key as a new value for potential procs
+                    total_buff_map[new_key] = buff_amount
+            elif buff_key == "Deepen" and base_key not in STANDARD_BUFF_TYPES: # apply element-specific deepen effects IF MATCH
+                if (len(category) == 2 and category in skill_ref["classifications"]) or (len(category) > 2 and category in skill_ref["name"]):
+                    new_key = "Deepen"
+                    total_buff_map[new_key] += buff_amount # Update the total amount
+            elif buff_type == "Resistance": # apply resistance effects IF MATCH
+                if (len(category) == 2 and category in skill_ref["classifications"]) or (len(category) > 2 and category in skill_ref["name"]):
+                    new_key = "Resistance"
+                    total_buff_map[new_key] += buff_amount # Update the total amount
+            elif buff_type == "Ignore Defense": # ignore defense IF MATCH
+                if (len(category) == 2 and category in skill_ref["classifications"]) or (len(category) > 2 and category in skill_ref["name"]):
+                    new_key = "Ignore Defense"
+                    total_buff_map[new_key] += buff_amount # Update the total amount
+            else:
+                if new_key not in total_buff_map: # skill-specific buff
+                    if new_key in skill_ref["name"]:
+                        current_bonus = total_buff_map[buff_key]
+                        total_buff_map[buff_key] = current_bonus + buff_amount # Update the total amount
+                    else: # add the skill key as a new value for potential procs
+                        total_buff_map[f'{new_key} ({buff_key})'] = buff_amount
+                else:
+                    total_buff_map[new_key] += buff_amount # Update the total amount
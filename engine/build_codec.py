@@ -0,0 +1,425 @@
+"""
+Build Codec
+===========
+
+by @HikariTenshi
+original script by @Maygi
+
+This module converts build strings to builds and back. A build is the character lineup and the
+rotation of a calculation, the inputs of the simulation. Two formats are supported:
+
+- The legacy format of the spreadsheet and the export button, consisting of a name, three character
+  sections with 29 comma separated values each and the rotation as Character&Skill entries, all
+  separated by ";".
+- The compact format, a versioned, zlib compressed and URL-safe base64 encoded JSON payload with the
+  prefix "v2.", which can be shared as a link.
+
+The parser only reads the reference configuration, it doesn't need the GUI or the calculator database,
+so many builds can be decoded at once with decode_builds.
+
+Usage Example:
+
+    from engine.build_codec import Build, parse_build, decode_builds
+
+    build = parse_build(build_string)
+    simulate(build.lineup, build.rotation, settings)
+    link = build.to_compact_string()
+
+    for decoded in decode_builds(build_strings, skip_malformed=True):
+        if decoded is not None:
+            name, lineup, rotation = decoded
+"""
+
+import base64
+import binascii
+import json
+import logging
+import math
+import re
+import zlib
+from engine.game_data import get_table_config
+from config.constants import logger, CALCULATOR_DB_PATH
+
+logger = logging.getLogger(__name__)
+
+# The legacy format has no version, it is counted as version 1; the compact format starts with "v" and its version
+COMPACT_FORMAT_VERSION = 2
+COMPACT_PREFIX = f"v{COMPACT_FORMAT_VERSION}."
+COMPACT_PREFIX_PATTERN = re.compile(r"v(\d+)\.")
+COMPACT_PAYLOAD_PATTERN = re.compile(r"[A-Za-z0-9_-]*")
+
+# The largest decompressed payload of a compact build string, so a crafted string can't exhaust the memory
+MAX_PAYLOAD_SIZE = 1 << 20
+
+# The types of the CharacterLineup columns, the lineup of a build has all of them as keys
+LINEUP_COLUMN_TYPES = get_table_config(CALCULATOR_DB_PATH, "CharacterLineup")["db_columns"]
+
+# The index of each CharacterLineup column in a character section of a legacy build string
+BUILD_VALUE_INDICES = {
+    "Character": 0,
+    "ResonanceChain": 1,
+    "Weapon": 2,
+    "Rank": 4,
+    "Echo": 5,
+    "Build": 6,
+    "Attack": 7,
+    "AttackPercent": 25,
+    "Health": 8,
+    "HealthPercent": 26,
+    "Defense": 9,
+    "DefensePercent": 27,
+    "CritRate": 10,
+    "CritDamage": 11,
+    "EnergyRegen": 28,
+    "NormalBonus": 12,
+    "HeavyBonus": 13,
+    "SkillBonus": 14,
+    "LiberationBonus": 15
+}
+
+# The amount of values of a character section, the unused ones are written as the values of FILLER_VALUES
+BUILD_VALUE_COUNT = 29
+FILLER_VALUES = {3: "", 16: 0, 17: 0, 18: 0, 19: 0, 20: 0, 21: 0, 22: 0, 23: "", 24: ""}
+
+# The column of each value of a character section in the order of the legacy format, None for the filler values
+LEGACY_LAYOUT = [
+    next((column for column, column_index in BUILD_VALUE_INDICES.items() if column_index == index), None)
+    for index in range(BUILD_VALUE_COUNT)]
+
+# The characters that separate the values of the legacy format
+LEGACY_SEPARATORS = (";", ",", "&")
+
+class MalformedBuildError(ValueError):
+    """
+    Exception raised when a build string cannot be decoded or a build cannot be encoded.
+
+    :param message: A message describing what is wrong with the build.
+    :type message: str
+    """
+
+def coerce_value(value, column_type):
+    """
+    Convert a value of a build string the way SQLite would store it in a column of the given type.
+
+    :param value: The value as it appears in the build string.
+    :type value: str
+    :param column_type: The type of the column, e.g. "INTEGER", "REAL" or "TEXT".
+    :type column_type: str
+    :return: The converted value, or the value itself if it isn't numeric.
+    :rtype: int, float or str
+    """
+    if column_type not in ("INTEGER", "REAL"):
+        return value
+    try:
+        number = float(value)
+    except ValueError:
+        return value
+    if column_type == "INTEGER" and number.is_integer():
+        return int(number)
+    return number
+
+def format_value(value):
+    """
+    Format a value for the legacy format, zero floats are written as "0" like in the spreadsheet.
+
+    :param value: The value of a CharacterLineup column.
+    :type value: int, float or str
+    :return: The formatted value.
+    :rtype: str
+    """
+    return "0" if isinstance(value, float) and math.isclose(value, 0.0) else str(value)
+
+def check_legacy_value(value):
+    """
+    Check that a value can be written in the legacy format.
+
+    :param value: The formatted value.
+    :type value: str
+    :raises MalformedBuildError: If the value contains one of the separators of the format.
+    """
+    if any(separator in value for separator in LEGACY_SEPARATORS):
+        raise MalformedBuildError(f'{value!r} contains a separator of the legacy format, one of {" ".join(LEGACY_SEPARATORS)}')
+
+def get_build_name(lineup):
+    """
+    Get the name of a build the export uses, e.g. "S0R1 Jiyan + Verdant Summit (5☆) / ...".
+
+    :param lineup: The lineup, with the CharacterLineup column names as keys.
+    :type lineup: list
+    :return: The name.
+    :rtype: str
+    """
+    return " / ".join(
+        f'S{character_row["ResonanceChain"]}R{character_row["Rank"]} {character_row["Character"]} + {character_row["Weapon"]}'
+        for character_row in lineup)
+
+class Build:
+    """
+    The inputs of a calculation, the lineup and the rotation.
+
+    :param lineup: The lineup, with the CharacterLineup column names as keys.
+    :type lineup: list
+    :param rotation: The rotation as (character, skill) pairs.
+    :type rotation: list
+    :param name: The name of the build, defaults to the name of get_build_name.
+    :type name: str, optional
+    """
+    def __init__(self, lineup, rotation, name=None):
+        self.lineup = lineup
+        self.rotation = rotation
+        self.name = get_build_name(lineup) if name is None else name
+
+    def __eq__(self, other):
+        if not isinstance(other, Build):
+            return NotImplemented
+        return (self.name, self.lineup, list(map(tuple, self.rotation))) == (other.name, other.lineup, list(map(tuple, other.rotation)))
+
+    def __repr__(self):
+        return f"Build({self.name!r}, {len(self.rotation)} steps)"
+
+    def get_characters(self):
+        """
+        Get the names of the characters of the lineup.
+
+        :return: The names.
+        :rtype: list
+        """
+        return [character_row["Character"] for character_row in self.lineup]
+
+    def to_legacy_string(self):
+        """
+        Encode the build in the legacy format, the rotation ends at its first empty step like the export.
+
+        :return: The build string.
+        :rtype: str
+        :raises MalformedBuildError: If a value contains one of the separators of the format.
+        """
+        if ";" in self.name:
+            raise MalformedBuildError(f"The name {self.name!r} contains a ';', it can't be written in the legacy format")
+        sections = [self.name]
+        for character_row in self.lineup:
+            values = [
+                format_value(character_row[column]) if column is not None else format_value(FILLER_VALUES[index])
+                for index, column in enumerate(LEGACY_LAYOUT)]
+            for value in values:
+                check_legacy_value(value)
+            sections.append(",".join(values))
+        entries = []
+        for character, skill in self.rotation:
+            if not character or not skill:
+                break
+            check_legacy_value(character)
+            check_legacy_value(skill)
+            entries.append(f"{character}&{skill}")
+        sections.append(",".join(entries))
+        return ";".join(sections)
+
+    def to_compact_string(self):
+        """
+        Encode the build in the compact format, a URL-safe string starting with COMPACT_PREFIX.
+
+        :return: The build string.
+        :rtype: str
+        """
+        slots = {character: slot for slot, character in reversed(list(enumerate(self.get_characters())))}
+        payload = [
+            self.name,
+            [[character_row[column] for column in BUILD_VALUE_INDICES] for character_row in self.lineup],
+            # The characters of the rotation are stored as their slot in the lineup, the name if they aren't in it
+            [[slots.get(character, character) for character, _ in self.rotation], [skill for _, skill in self.rotation]]
+        ]
+        data = zlib.compress(json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8"), 9)
+        return COMPACT_PREFIX + base64.urlsafe_b64encode(data).decode("ascii").rstrip("=")
+
+    @classmethod
+    def from_string(cls, build_string, strict=True):
+        """
+        Decode a build string, see parse_build.
+        """
+        return parse_build(build_string, strict)
+
+def make_converter(column_type, strict):
+    """
+    Make the function converting the text of a legacy value to the value of a CharacterLineup column.
+
+    :param column_type: The type of the column.
+    :type column_type: str
+    :param strict: Whether values that aren't numbers are rejected for numeric columns.
+    :type strict: bool
+    :return: The converter.
+    :rtype: callable
+    """
+    if column_type not in ("INTEGER", "REAL"):
+        return str
+    fast_type = int if column_type == "INTEGER" else float
+
+    def convert(text):
+        try:
+            return fast_type(text)
+        except ValueError:
+            pass
+        value = coerce_value(text, column_type)
+        if strict and isinstance(value, str):
+            raise MalformedBuildError(f"{text!r} is not a number")
+        return value
+    return convert
+
+# The (column, index, converter) of each column of a character section, by strictness
+LEGACY_FIELDS = {
+    strict: [(column, index, make_converter(LINEUP_COLUMN_TYPES[column], strict)) for column, index in BUILD_VALUE_INDICES.items()]
+    for strict in (True, False)
+}
+
+# The types a value of each column may have in the compact format, by strictness
+COMPACT_VALUE_TYPES = {
+    strict: [
+        ({int, float} if strict else {int, float, str}) if LINEUP_COLUMN_TYPES[column] in ("INTEGER", "REAL") else {str}
+        for column in BUILD_VALUE_INDICES]
+    for strict in (True, False)
+}
+
+def parse_legacy_build(build_string, strict=True):
+    """
+    Decode a build string of the legacy format.
+
+    :param build_string: The build string.
+    :type build_string: str
+    :param strict: Whether a character section needs exactly 29 values and numeric values need to be numbers,
+        otherwise additional values are ignored and other values are kept as text like import_build used to, defaults to True.
+    :type strict: bool, optional
+    :return: The build.
+    :rtype: Build
+    :raises MalformedBuildError: If the build string doesn't have the expected sections or values.
+    """
+    sections = build_string.split(";")
+    if len(sections) != 5:
+        raise MalformedBuildError(f"Found {len(sections)} sections; expected 5")
+
+    fields = LEGACY_FIELDS[strict]
+    lineup = []
+    for row_index, row in enumerate(sections[1:4]):
+        values = row.split(",")
+        if len(values) < BUILD_VALUE_COUNT or strict and len(values) != BUILD_VALUE_COUNT:
+            raise MalformedBuildError(f"Row {row_index + 1} contains {len(values)} values; expected {BUILD_VALUE_COUNT}")
+        character_row = dict.fromkeys(LINEUP_COLUMN_TYPES)
+        try:
+            for column, index, convert in fields:
+                character_row[column] = convert(values[index])
+        except MalformedBuildError as e:
+            raise MalformedBuildError(f"Row {row_index + 1}, {column}: {e}") from None
+        lineup.append(character_row)
+
+    rotation = [tuple(entry.split("&")) for entry in sections[4].split(",")] if sections[4] else []
+    if rotation and set(map(len, rotation)) != {2}:
+        entry = next(step for step in rotation if len(step) != 2)
+        raise MalformedBuildError(f'Rotation entry {"&".join(entry)!r} is not in the format Character&Skill')
+
+    return Build(lineup, rotation, sections[0])
+
+def parse_compact_build(build_string, strict=True):
+    """
+    Decode a build string of the compact format.
+
+    :param build_string: The build string, starting with COMPACT_PREFIX.
+    :type build_string: str
+    :param strict: Whether numeric values need to be numbers, defaults to True.
+    :type strict: bool, optional
+    :return: The build.
+    :rtype: Build
+    :raises MalformedBuildError: If the build string has another version or its payload is invalid.
+    """
+    match = COMPACT_PREFIX_PATTERN.match(build_string)
+    if match is None:
+        raise MalformedBuildError("The build string doesn't start with a format version")
+    if int(match.group(1)) != COMPACT_FORMAT_VERSION:
+        raise MalformedBuildError(f"Unsupported build format version {match.group(1)}; expected {COMPACT_FORMAT_VERSION}")
+    encoded = build_string[match.end():].strip()
+    if not COMPACT_PAYLOAD_PATTERN.fullmatch(encoded):
+        raise MalformedBuildError("The build string contains characters that aren't URL-safe base64")
+
+    try:
+        data = base64.urlsafe_b64decode(encoded + "=" * (-len(encoded) % 4))
+        decompressor = zlib.decompressobj()
+        text = decompressor.decompress(data, MAX_PAYLOAD_SIZE)
+        if decompressor.unconsumed_tail:
+            raise MalformedBuildError(f"The payload is larger than {MAX_PAYLOAD_SIZE} bytes")
+        name, rows, entries = json.loads(text.decode("utf-8"))
+    except (binascii.Error, zlib.error, UnicodeDecodeError, ValueError, TypeError) as e:
+        if isinstance(e, MalformedBuildError):
+            raise
+        raise MalformedBuildError(f"The payload can't be decoded: {e}") from None
+
+    if not isinstance(name, str) or not isinstance(rows, list) or len(rows) != 3 or not isinstance(entries, list) or len(entries) != 2:
+        raise MalformedBuildError("The payload doesn't contain a name, three characters and a rotation")
+    lineup = []
+    for row_index, values in enumerate(rows):
+        if not isinstance(values, list) or len(values) != len(BUILD_VALUE_INDICES):
+            raise MalformedBuildError(f"Row {row_index + 1} does not contain the required {len(BUILD_VALUE_INDICES)} values")
+        for column, value, value_types in zip(BUILD_VALUE_INDICES, values, COMPACT_VALUE_TYPES[strict]):
+            if type(value) not in value_types:
+                raise MalformedBuildError(f"Row {row_index + 1}, {column}: {value!r} is not a valid value")
+        character_row = dict.fromkeys(LINEUP_COLUMN_TYPES)
+        character_row.update(zip(BUILD_VALUE_INDICES, values))
+        lineup.append(character_row)
+
+    slots, skills = entries
+    if not isinstance(slots, list) or not isinstance(skills, list) or len(slots) != len(skills):
+        raise MalformedBuildError("The rotation doesn't contain a character for every skill")
+    # A slot is the index of a character in the lineup or the name of a character, bool isn't accepted as an index
+    if not set(map(type, slots)) <= {int, str}:
+        raise MalformedBuildError("The rotation contains a character slot that isn't an index or a name")
+    slot_characters = {slot: character_row["Character"] for slot, character_row in enumerate(lineup)}
+    characters = list(map(slot_characters.get, slots, slots))
+    if slots and not set(map(type, characters)) | set(map(type, skills)) == {str}:
+        raise MalformedBuildError("The rotation contains a step that isn't a character and a skill")
+
+    return Build(lineup, list(zip(characters, skills)), name)
+
+def parse_build(build_string, strict=True):
+    """
+    Decode a build string of either format.
+
+    :param build_string: The build string.
+    :type build_string: str
+    :param strict: Whether the values are checked strictly, see parse_legacy_build, defaults to True.
+    :type strict: bool, optional
+    :return: The build.
+    :rtype: Build
+    :raises MalformedBuildError: If the build string can't be decoded.
+    """
+    if not build_string:
+        raise MalformedBuildError("The build string is empty")
+    if ";" not in build_string and COMPACT_PREFIX_PATTERN.match(build_string):
+        return parse_compact_build(build_string, strict)
+    return parse_legacy_build(build_string, strict)
+
+def decode_builds(build_strings, strict=True, skip_malformed=False):
+    """
+    Decode many build strings into the inputs of the simulation.
+
+    :param build_strings: The build strings, in either format.
+    :type build_strings: iterable
+    :param strict: Whether the values are checked strictly, see parse_legacy_build, defaults to True.
+    :type strict: bool, optional
+    :param skip_malformed: Whether a build string that can't be decoded is returned as None
+        instead of raising the error, defaults to False.
+    :type skip_malformed: bool, optional
+    :return: The decoded builds as (name, lineup, rotation) tuples, in the order of the build strings.
+    :rtype: list
+    :raises MalformedBuildError: If a build string can't be decoded and skip_malformed is False.
+    """
+    decoded = []
+    malformed = 0
+    for build_string in build_strings:
+        try:
+            build = parse_build(build_string, strict)
+        except MalformedBuildError:
+            if not skip_malformed:
+                raise
+            decoded.append(None)
+            malformed += 1
+            continue
+        decoded.append((build.name, build.lineup, build.rotation))
+    if malformed:
+        logger.warning(f"Skipped {malformed} of {len(decoded)} malformed builds")
+    return decoded
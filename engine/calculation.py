@@ -0,0 +1,211 @@
+"""
+Calculation
+===========
+
+by @HikariTenshi
+original script by @Maygi
+
+This module runs a calculation on the tables of the calculator database without the GUI.
+It reads the lineup, the rotation and the settings, simulates the rotation and writes the
+results back to the tables the GUI shows. The GUI calls calculate in its worker thread and
+write_results once the worker is done, the benchmark runs both against a copy of the database.
+
+Usage Example:
+
+    from engine.calculation import calculate, write_build, write_results
+
+    write_build(lineup, rotation, db_name)
+    result = calculate(db_name)
+    write_results(result, db_name)
+"""
+
+import logging
+from utils import instrumentation
+from utils.database_io import BatchWriter, fetch_data_from_database, clear_and_initialize_table, overwrite_table_data, overwrite_table_data_by_columns, overwrite_table_data_by_row_ids, set_unspecified_columns_to_null
+from engine.build_codec import BUILD_VALUE_INDICES
+from engine.game_data import pad_and_insert_rows, get_table_config, get_active_char_rows, get_active_effect_rows
+from engine.result_cache import get_result_key
+from engine.simulation import LINEUP_COLUMNS, Simulation
+from config.constants import logger, CALCULATOR_DB_PATH
+
+logger = logging.getLogger(__name__)
+
+SETTINGS_COLUMNS = list(get_table_config(CALCULATOR_DB_PATH, "Settings")["db_columns"].keys())
+STAT_COLUMNS = [
+    "AttackMultiplier",
+    "HealthMultiplier",
+    "DefenseMultiplier",
+    "CritRateMultiplier",
+    "CritDmgMultiplier",
+    "NormalBonus",
+    "HeavyBonus",
+    "SkillBonus",
+    "LiberationBonus",
+    "NormalAmp",
+    "HeavyAmp",
+    "SkillAmp",
+    "LiberationAmp",
+    "PhysicalBonus",
+    "GlacioBonus",
+    "FusionBonus",
+    "ElectroBonus",
+    "AeroBonus",
+    "SpectroBonus",
+    "HavocBonus",
+    "Bonus",
+    "Amplify",
+    "Multiplier",
+    "MinusRes",
+    "IgnoreDefense"
+]
+
+def write_build(lineup, rotation, db_name=CALCULATOR_DB_PATH):
+    """
+    Replace the lineup and the rotation of the calculator database with the ones of a build.
+
+    :param lineup: The three characters of the lineup, as dictionaries with the column names of the
+        CharacterLineup table as keys.
+    :type lineup: list
+    :param rotation: The rotation steps as (character, skill) pairs.
+    :type rotation: list
+    :param db_name: The calculator database, defaults to CALCULATOR_DB_PATH.
+    :type db_name: str, optional
+    """
+    rotation_builder_table = get_table_config(CALCULATOR_DB_PATH, "RotationBuilder")
+    clear_and_initialize_table(db_name, rotation_builder_table["table_name"], rotation_builder_table["db_columns"])
+
+    # import the base character details and the rotation
+    overwrite_table_data_by_row_ids(db_name, "CharacterLineup", [
+        {"ID": row_index + 1, **{column: character_row[column] for column in BUILD_VALUE_INDICES}}
+        for row_index, character_row in enumerate(lineup)])
+
+    overwrite_table_data_by_columns(db_name, "RotationBuilder", "Character", [character for character, _ in rotation])
+    overwrite_table_data_by_columns(db_name, "RotationBuilder", "Skill", [skill for _, skill in rotation])
+    overwrite_table_data_by_row_ids(db_name, "RotationBuilder", [{"ID": 1, "InGameTime": 0.0}])
+
+def simulate_active_char_sheet(characters, echoes, db_name=CALCULATOR_DB_PATH):
+    db_columns = get_table_config("characters", "Skills")["db_columns"]
+    forte_pos = list(db_columns.keys()).index("Forte")
+    items = list(db_columns.items())
+    items.insert(forte_pos, ("Character", "TEXT"))
+    db_columns = dict(items)
+
+    overwrite_table_data(db_name, "ActiveChar", db_columns, get_active_char_rows(characters, echoes))
+
+def simulate_active_effects_sheet(characters, db_name=CALCULATOR_DB_PATH):
+    db_columns = get_table_config("characters", "InherentSkills")["db_columns"]
+    overwrite_table_data(db_name, "ActiveEffects", db_columns, get_active_effect_rows(characters))
+
+def calculate(db_name=CALCULATOR_DB_PATH, simulation_cache=None, result_cache=None, progress_callback=None):
+    """
+    Simulate the rotation of the calculator database, without writing the results back.
+
+    :param db_name: The calculator database, defaults to CALCULATOR_DB_PATH.
+    :type db_name: str, optional
+    :param simulation_cache: Recalculates the last simulation if only the stats of the lineup changed,
+        defaults to simulating the rotation every time.
+    :type simulation_cache: SimulationCache, optional
+    :param result_cache: Reuses the stored results of identical calculations, defaults to not storing them.
+    :type result_cache: ResultCache, optional
+    :param progress_callback: Called with the amount of simulated steps and the total amount of steps, see Simulation.run.
+    :type progress_callback: callable, optional
+    :return: The results of the simulation.
+    :rtype: SimulationResult
+    :raises IncompleteInputError: If the lineup or the rotation is incomplete.
+    """
+    lineup = [dict(zip(LINEUP_COLUMNS, row)) for row in fetch_data_from_database(db_name, "CharacterLineup", columns=LINEUP_COLUMNS)]
+    settings = dict(zip(SETTINGS_COLUMNS, fetch_data_from_database(db_name, "Settings", columns=SETTINGS_COLUMNS)[0]))
+
+    characters = [character_row["Character"] for character_row in lineup]
+    with instrumentation.phase("active_char_sheet"):
+        simulate_active_char_sheet(characters, [character_row["Echo"] for character_row in lineup], db_name)
+    with instrumentation.phase("active_effects_sheet"):
+        simulate_active_effects_sheet(characters, db_name)
+
+    # The simulation keeps the timeline in memory, the in-game times and time delays are written back once it is done
+    rotation = fetch_data_from_database(db_name, "RotationBuilder", columns=["Character", "Skill", "InGameTime"])
+    steps = [(character, skill) for character, skill, _ in rotation]
+    start_time = (rotation[0][2] or 0.0) if rotation else 0.0
+
+    if result_cache is not None:
+        with instrumentation.phase("result_cache"):
+            key = get_result_key(lineup, steps, settings, start_time)
+            result = result_cache.get(key)
+        if result is not None:
+            logger.info(
+                "Reusing the cached result of an identical calculation. The rotation isn't simulated again, "
+                "so no progress is reported and no trace is recorded")
+            instrumentation.count("result_cache_hits")
+            return result
+        instrumentation.count("result_cache_misses")
+
+    with instrumentation.phase("simulation"):
+        if simulation_cache is not None:
+            result = simulation_cache.simulate(lineup, steps, settings, start_time=start_time, progress_callback=progress_callback)
+        else:
+            result = Simulation(lineup, steps, settings, start_time=start_time).run(progress_callback)
+    if result_cache is not None:
+        with instrumentation.phase("result_cache"):
+            result_cache.put(key, result)
+    return result
+
+def write_results(result, db_name=CALCULATOR_DB_PATH):
+    """
+    Write the results of a calculation to the tables of the calculator database, all in one transaction.
+
+    :param result: The results of the simulation.
+    :type result: SimulationResult
+    :param db_name: The calculator database, defaults to CALCULATOR_DB_PATH.
+    :type db_name: str, optional
+    """
+    old_damage = fetch_data_from_database(db_name, "TotalDamage", columns="TotalDamage")[0]
+    overwrite_table_data_by_columns(db_name, "TotalDamage", "PreviousTotal", [old_damage])
+
+    # clear the content
+    set_unspecified_columns_to_null(db_name, "RotationBuilder", ["Character", "Skill", "InGameTime"])
+
+    logger.debug("updating cells...")
+
+    # Collect all results and write them in one transaction, so the tables are never partially updated
+    writes_start = instrumentation.start_timer()
+    writer = BatchWriter(db_name)
+    writer.overwrite_table_data_by_columns("RotationBuilder", ["InGameTime", "TimeDelay"], list(zip(result.in_game_times, result.time_delays)))
+    writer.overwrite_table_data_by_columns("RotationBuilder", "Resonance", result.resonance)
+    writer.overwrite_table_data_by_columns("RotationBuilder", "Concerto", result.concerto)
+    writer.overwrite_table_data_by_columns("RotationBuilder", "LocalBuffs", result.local_buffs)
+    writer.overwrite_table_data_by_columns("RotationBuilder", "GlobalBuffs", result.global_buffs)
+    writer.overwrite_table_data_by_columns("RotationBuilder", STAT_COLUMNS, result.stats)
+    writer.overwrite_table_data_by_columns("RotationBuilder", "DMG", result.damage)
+
+    writer.overwrite_table_data_by_columns("TotalDamage", ["OpenerDPS", "LoopDPS", "Complexity", "DPS2Mins"], [
+        (result.opener_dps, result.loop_dps, result.complexity, f'{result.dps_2_mins:.2f}')])
+
+    db_columns = get_table_config(CALCULATOR_DB_PATH, "NextSubstatValue")["db_columns"]
+    total_columns = len(db_columns.keys())
+    table_data = []
+    for character in result.characters:
+        substat_gains = result.substat_gains[character]
+        data_row = list(substat_gains.values()) if substat_gains is not None else None
+        table_data.append([character] + pad_and_insert_rows([data_row], total_columns=total_columns - 1)[0])
+
+    writer.overwrite_table_data("NextSubstatValue", db_columns, table_data)
+
+    writer.overwrite_table_data_by_columns("TotalDamage", ["Normal", "Heavy", "Skill", "Liberation", "Intro", "Outro", "Echo"], [list(result.total_damage_map.values())])
+    writer.overwrite_table_data_by_columns("TotalDamage", ["Character1", "Character2", "Character3"], [
+        [result.character_damage[character] for character in result.characters]])
+
+    # write initial and final dconds
+
+    writer.overwrite_table_data_by_row_ids("EnergyCalculation", [{
+        "ID": i + 1, 
+        "Character": character, 
+        "ForteInitial": result.initial_d_cond[character]["forte"], 
+        "ResonanceInitial": result.initial_d_cond[character]["resonance"], 
+        "ConcertoInitial": result.initial_d_cond[character]["concerto"], 
+        "ForteFinal": result.final_d_cond[character]["forte"],
+        "ResonanceFinal": result.final_d_cond[character]["resonance"], 
+        "ConcertoFinal": result.final_d_cond[character]["concerto"]
+    } for i, character in enumerate(result.characters)])
+
+    writer.flush()
+    instrumentation.stop_timer("writes", writes_start)
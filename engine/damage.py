@@ -0,0 +1,337 @@
+"""
+Damage
+======
+
+by @HikariTenshi
+original script by @Maygi
+
+This module calculates the damage of skills and passive damage effects and keeps
+track of the damage distribution and the substat gains.
+"""
+
+import copy
+import logging
+from engine import trace
+from engine.buff_map import Stat, STAT_INDICES
+from engine.buffs import STANDARD_BUFF_TYPES, translate_classification_code, reverse_translate_classification_code
+from config.constants import logger
+
+logger = logging.getLogger(__name__)
+
+# Handles resonance energy sharing between the party for the given skillRef and value.
+def handle_energy_share(value, active_character, characters, char_data, weapon_data, bonus_stats):
+    for character in characters: # energy share
+        # Determine main stat amount if it is "Energy Regen"
+        main_stat_amount = (
+            weapon_data[character]["main_stat_amount"] if weapon_data[character]["main_stat"] == "Energy Regen" else 0
+        )
+        # Get the energy recharge from bonus stats
+        bonus_energy_recharge = bonus_stats[character]["energy_recharge"]
+        # Find the additional energy recharge from character data's bonus stats
+        additional_energy_recharge = next(
+            (amount for stat, amount in char_data[character]["bonus_stats"] if stat == "Energy Regen"), 0
+        )
+        # Calculate the total energy recharge
+        energy_recharge = main_stat_amount + bonus_energy_recharge + additional_energy_recharge
+        char_data[character]["d_cond"]["resonance"] = char_data[character]["d_cond"]["resonance"] + value * (1 + energy_recharge) * (1 if character == active_character else 0.5)
+        if trace.recorder is not None:
+            trace.recorder.record("d_cond", character=character, name="resonance", value=value, result=char_data[character]["d_cond"]["resonance"], energy_recharge=energy_recharge, shared=character != active_character)
+
+# Collects the parts of the damage multiplier: the damage bonus terms of the classifications (as (stat index, value) pairs,
+# the stat index is -1 for skill-specific keys), the damage deepen, and the resistance and defense multipliers.
+def get_damage_multiplier_factors(classification, total_buff_map, level_cap, enemy_level, res):
+    stats = total_buff_map.values
+    bonus_terms = []
+    damage_deepen = 0
+    enemy_defense = 792 + 8 * enemy_level
+    def_pen = stats[Stat.IGNORE_DEFENSE]
+    defense_multiplier = (800 + level_cap * 8) / (enemy_defense * (1 - def_pen) + 800 + level_cap * 8)
+    res_shred = stats[Stat.RESISTANCE]
+    # loop through each pair of characters in the classification string
+    for i in range(0, len(classification), 2):
+        code = classification[i:i + 2]
+        classification_name = translate_classification_code(code)
+        # if classification is in the total_buff_map, apply its buff amount to the damage multiplier
+        if classification_name in total_buff_map:
+            if classification_name in STANDARD_BUFF_TYPES: # check for deepen effects as well
+                damage_deepen += stats[STAT_INDICES[f'{classification_name}_(deepen)']]
+            bonus_terms.append((STAT_INDICES.get(classification_name, -1), total_buff_map[classification_name]))
+    res_multiplier = 1
+    if res <= 0: # resistance multiplier calculation
+        res_multiplier = 1 - (res - res_shred) / 2
+    elif res < .8:
+        res_multiplier = 1 - (res - res_shred)
+    else:
+        res_multiplier = 1 / (1 + (res - res_shred) * 5)
+    damage_deepen += stats[Stat.DEEPEN]
+    return bonus_terms, damage_deepen, res_multiplier, defense_multiplier
+
+def get_damage_multiplier(classification, total_buff_map, level_cap, enemy_level, res, damage_factors=None):
+    stats = total_buff_map.values
+    bonus_terms, damage_deepen, res_multiplier, defense_multiplier = damage_factors or get_damage_multiplier_factors(classification, total_buff_map, level_cap, enemy_level, res)
+    damage_multiplier = 1
+    damage_bonus = 1
+    for _, value in bonus_terms:
+        damage_bonus += value
+    damage_bonus += stats[Stat.SPECIFIC]
+    return damage_multiplier * damage_bonus * (1 + stats[Stat.MULTIPLIER]) * (1 + damage_deepen) * res_multiplier * defense_multiplier
+
+# Updates the damage values in the substat estimator as well as the total damage distribution.
+# Has an additional 'damage_mult_extra' field for any additional multipliers added on by... hardcoding.
+def update_damage(name, classifications, active_character, damage, total_damage, total_buff_map, char_entries, damage_by_character, mode, opener_damage, loop_damage, char_data, weapon_data, bonus_stats, level_cap, enemy_level, res, substat_sensitivity, total_damage_map, damage_mult_extra=0, bonus_attack=0, damage_factors=None):
+    char_entries[active_character] += 1
+    damage_by_character[active_character] += total_damage
+    if mode == "opener":
+        opener_damage += total_damage
+    else:
+        loop_damage += total_damage
+    if total_damage > 0:
+        # the substat gains are evaluated for all damage instances at once after the rotation
+        substat_sensitivity.add(
+            active_character, classifications, damage, total_damage, total_buff_map, 
+            damage_factors or get_damage_multiplier_factors(classifications, total_buff_map, level_cap, enemy_level, res), 
+            char_data, weapon_data, bonus_stats, damage_mult_extra, bonus_attack, mode)
+
+    # update damage distribution tracking chart
+    for j in range(0, len(classifications), 2):
+        code = classifications[j:j + 2]
+        key = translate_classification_code(code)
+        if "Intro" in name:
+            key = "intro"
+        if "Outro" in name:
+            key = "outro"
+        if key in total_damage_map:
+            current_amount = total_damage_map[key]
+            total_damage_map[key] = current_amount + total_damage # Update the total amount
+        if key in ["intro", "outro"]:
+            break
+
+    return opener_damage, loop_damage
+
+# Creates a passive damage instance that's actively procced by certain attacks.
+class PassiveDamage:
+    def __init__(self, name, classifications, type, damage, duration, start_time, limit, interval, triggered_by, owner, slot, d_cond):
+        self.name = name
+        self.classifications = classifications
+        self.type = type
+        self.damage = damage
+        self.duration = duration
+        self.start_time = start_time
+        self.limit = limit
+        self.interval = interval
+        self.triggered_by = triggered_by.split(';')[1]
+        self.owner = owner
+        self.slot = slot
+        self.last_proc = -999
+        self.num_procs = 0
+        self.proc_multiplier = 1
+        self.total_damage = 0
+        self.total_buff_map = []
+        self.proccable_buffs = []
+        self.d_cond = d_cond
+        self.activated = False # an activation flag for TickOverTime-based effects
+        self.remove = False # a flag for if a passive damage instance needs to be removed (e.g. when a new instance is added)
+        self.last_time = 0 # the last time this passive damage checked time
+
+    def __deepcopy__(self, memo):
+        # the total buff map is replaced instead of changed when the damage procs again, so the copy can share it
+        passive_damage = copy.copy(self)
+        passive_damage.proccable_buffs = list(self.proccable_buffs)
+        return passive_damage
+
+    def __repr__(self):
+        return (f"PassiveDamage(name={self.name!r}, classifications={self.classifications!r}, "
+                f"type={self.type!r}, damage={self.damage}, duration={self.duration}, "
+                f"start_time={self.start_time}, limit={self.limit}, interval={self.interval}, "
+                f"triggered_by={self.triggered_by!r}, owner={self.owner!r}, slot={self.slot}, "
+                f"last_proc={self.last_proc}, num_procs={self.num_procs}, total_damage={self.total_damage})")
+
+    def add_buff(self, buff):
+        self.proccable_buffs.append(buff)
+
+    # Handles and updates the current proc time according to the skill reference info.
+    def handle_procs(self, current_time, cast_time, number_of_hits, jinhsi_outro_active, queued_buffs):
+        self.last_time = current_time
+        procs = 0
+        time_between_hits = cast_time / (number_of_hits - 1 if number_of_hits > 1 else 1)
+        self.activated = True
+        if self.interval > 0:
+            if self.type == "tick_over_time":
+                time = self.last_proc if self.last_proc >= 0 else current_time
+                while time <= current_time + cast_time:
+                    procs += 1
+                    self.last_proc = time
+                    time += self.interval
+            else:
+                for hit_index in range(number_of_hits):
+                    hit_time = current_time + time_between_hits * hit_index
+                    if hit_time - self.last_proc >= self.interval:
+                        procs += 1
+                        self.last_proc = hit_time
+        else:
+            procs = number_of_hits
+        if self.limit > 0:
+            procs = min(procs, self.limit - self.num_procs)
+        self.num_procs += procs
+        self.proc_multiplier = procs
+        if procs > 0:
+            for buff in self.proccable_buffs:
+                buff_object = buff.buff
+                if buff_object.type == "stacking_buff":
+                    stacks_to_add = 1
+                    stack_mult = 1 + (1 if "Passive" in buff_object.triggered_by and buff_object.name.startswith("Incandescence") else 0)
+                    effective_interval = buff_object.stack_interval
+                    if buff_object.name.startswith("Incandescence") and jinhsi_outro_active:
+                        effective_interval = 1
+                    if effective_interval < cast_time: # potentially add multiple stacks
+                        max_stacks_by_time = (number_of_hits if effective_interval == 0 else cast_time // effective_interval)
+                        stacks_to_add = min(max_stacks_by_time, number_of_hits)
+                    buff.stacks = min(stacks_to_add * stack_mult, buff_object.stack_limit)
+                    buff.stack_time = self.last_proc
+                buff.start_time = self.last_proc
+                queued_buffs.append(buff)
+        return procs
+
+    def can_remove(self, current_time, remove_buff):
+        return (
+            self.num_procs >= self.limit > 0
+            or current_time - self.start_time > self.duration
+            or (remove_buff and remove_buff in self.name)
+            or self.remove
+        )
+
+    def can_proc(self, current_time, skill_ref):
+        return current_time + skill_ref["cast_time"] - self.last_proc >= self.interval - .01
+
+    # Updates the total buff map to the latest local buffs.
+    def update_total_buff_map(self, last_total_buff_map, sequences):
+        if last_total_buff_map[self.owner]:
+            self.set_total_buff_map(last_total_buff_map[self.owner], sequences)
+        else:
+            logger.debug("undefined last_total_buff_map")
+
+    # Sets the total buff map, updating with any skill-specific buffs.
+    def set_total_buff_map(self, total_buff_map, sequences):
+        self.total_buff_map = total_buff_map.copy()
+        stats = self.total_buff_map.values
+
+        # these may have been set from the skill proccing it
+        stats[Stat.SPECIFIC] = 0
+        stats[Stat.DEEPEN] = 0
+        stats[Stat.MULTIPLIER] = 0
+
+        for stat, value in self.total_buff_map.items():
+            if self.name in stat:
+                if "Specific" in stat:
+                    current = stats[Stat.SPECIFIC]
+                    stats[Stat.SPECIFIC] = current + value
+                    logger.debug(f'updating damage bonus for {self.name} to {current} + {value}')
+                elif "Multiplier" in stat:
+                    current = stats[Stat.MULTIPLIER]
+                    stats[Stat.MULTIPLIER] = current + value
+                    logger.debug(f'updating damage multiplier for {self.name} to {current} + {value}')
+                elif "Deepen" in stat:
+                    element = reverse_translate_classification_code(stat.split("(")[0].trim())
+                    if element in self.classifications:
+                        current = stats[Stat.DEEPEN]
+                        stats[Stat.DEEPEN] = current + value
+                        logger.debug(f'updating damage Deepen for {self.name} to {current} + {value}')
+
+        # the tech to apply buffs like this to passive damage effects would be a 99% unnecessary loop so i'm hardcoding this (for now) surely it's not more than a case or two
+        if "Marcato" in self.name and sequences["Mortefi"] >= 3:
+            stats[Stat.CRIT_DMG] += 0.3
+
+    def check_proc_conditions(self, skill_ref):
+        if not self.triggered_by:
+            return False
+        if (self.activated and self.type == "TickOverTime") or self.triggered_by == "Any" or (len(self.triggered_by) > 2 and (skill_ref["name"] in self.triggered_by or self.triggered_by in skill_ref["name"])) or (len(self.triggered_by) == 2 and self.triggered_by in skill_ref["classifications"]):
+            return True
+        triggered_by_conditions = self.triggered_by.split(",")
+        for condition in triggered_by_conditions:
+            if (len(condition) == 2 and condition in skill_ref["classifications"]) or (len(condition) > 2 and (condition in skill_ref["name"] or skill_ref["name"] in condition)):
+                return True
+        return False
+
+    # Adds the dynamic conditions of a proc.
+    def apply_d_cond(self, active_character, characters, char_data, weapon_data, bonus_stats):
+        if self.d_cond is not None:
+            for condition, value in self.d_cond.items():
+                if value > 0:
+                    if condition == "Resonance":
+                        handle_energy_share(value, active_character, characters, char_data, weapon_data, bonus_stats)
+                    else:
+                        char_data[active_character]["d_cond"][condition] += value
+                        if trace.recorder is not None:
+                            trace.recorder.record("d_cond", character=active_character, name=condition, value=value, result=char_data[active_character]["d_cond"][condition], skill=self.name)
+
+    # Gets the attack bonus and the additional damage multiplier of a proc, which depend on the state of the rotation rather than the stats.
+    def get_proc_modifiers(self, active_character, char_data, weapon_data, last_seen, rythmic_vibrato):
+        bonus_attack = 0
+        if active_character != self.owner:
+            if "Stringmaster" in char_data[self.owner]["weapon"]: # sorry... hardcoding just this once
+                if self.last_time - last_seen[self.owner] > 5 or self.owner != "Yinlin":
+                    bonus_attack -= (0.12 + weapon_data[self.owner]["rank"] * 0.03) * 2
+        extra_multiplier = 0
+        if "Marcato" in self.name:
+            extra_multiplier += rythmic_vibrato * 0.015
+        return bonus_attack, extra_multiplier
+
+    # Calculates a proc's damage, and adds it to the total. The dynamic conditions have to be added with apply_d_cond beforehand.
+    def calculate_proc(self, char_data, weapon_data, bonus_stats, bonus_attack, extra_multiplier, level_cap, enemy_level, res, skill_level_multiplier, opener_damage, loop_damage, char_entries, damage_by_character, substat_sensitivity, total_damage_map):
+        extra_crit_dmg = 0
+
+        total_buff_map = self.total_buff_map
+        stats = total_buff_map.values
+        attack = (char_data[self.owner]["attack"] + weapon_data[self.owner]["attack"]) * (1 + stats[Stat.ATTACK] + bonus_stats[self.owner]["attack"] + bonus_attack) + stats[Stat.FLAT_ATTACK]
+        health = (char_data[self.owner]["health"]) * (1 + stats[Stat.HEALTH] + bonus_stats[self.owner]["health"]) + stats[Stat.FLAT_HEALTH]
+        defense = (char_data[self.owner]["defense"]) * (1 + stats[Stat.DEFENSE] + bonus_stats[self.owner]["defense"]) + stats[Stat.FLAT_DEFENSE]
+        crit_multiplier = (1 - min(1, (char_data[self.owner]["crit_rate"] + stats[Stat.CRIT_RATE]))) * 1 + min(1, (char_data[self.owner]["crit_rate"] + stats[Stat.CRIT_RATE])) * (char_data[self.owner]["crit_dmg"] + stats[Stat.CRIT_DMG] + extra_crit_dmg)
+        damage_factors = get_damage_multiplier_factors(self.classifications, total_buff_map, level_cap, enemy_level, res)
+        damage_multiplier = get_damage_multiplier(self.classifications, total_buff_map, level_cap, enemy_level, res, damage_factors) + extra_multiplier
+
+        additive_value_key = f'{self.name} (Additive)'
+        raw_damage = self.damage * (1 if self.name.startswith("Jué") else skill_level_multiplier) + (total_buff_map[additive_value_key] if additive_value_key in total_buff_map else 0)
+
+        scale_factor = defense if "Df" in self.classifications else (health if "Hp" in self.classifications else attack)
+        total_damage = raw_damage * scale_factor * crit_multiplier * damage_multiplier * (0 if weapon_data[self.owner]["weapon"]["name"] == "Nullify Damage" else 1)
+        if trace.recorder is not None:
+            trace.recorder.record(
+                "proc_damage", character=self.owner, row=self.slot, name=self.name, damage=raw_damage * self.proc_multiplier, total_damage=total_damage * self.proc_multiplier, 
+                attack=attack, crit_multiplier=crit_multiplier, damage_multiplier=damage_multiplier)
+        self.total_damage += total_damage * self.proc_multiplier
+        opener_damage, loop_damage = update_damage(
+            name=self.name, 
+            classifications=self.classifications, 
+            active_character=self.owner, 
+            damage=(raw_damage * self.proc_multiplier), 
+            total_damage=(total_damage * self.proc_multiplier), 
+            total_buff_map=total_buff_map, 
+            char_entries=char_entries, 
+            damage_by_character=damage_by_character, 
+            mode=None, # the proc damage is not added to the opener or loop damage
+            opener_damage=opener_damage, 
+            loop_damage=loop_damage, 
+            char_data=char_data, 
+            weapon_data=weapon_data, 
+            bonus_stats=bonus_stats, 
+            level_cap=level_cap, 
+            enemy_level=enemy_level, 
+            res=res, 
+            substat_sensitivity=substat_sensitivity, 
+            total_damage_map=total_damage_map, 
+            damage_mult_extra=extra_multiplier,
+            bonus_attack=bonus_attack, 
+            damage_factors=damage_factors)
+        self.proc_multiplier = 1
+        return total_damage
+
+    # Returns a note to place on the cell.
+    def get_note(self, skill_level_multiplier):
+        additive_value_key = f'{self.name} (Additive)'
+        if self.limit == 1:
+            return f'This skill triggered an additional damage effect: {self.name}, dealing {self.total_damage:.2f} DMG (Base Ratio: {(self.damage * 100):.2f}%  x {skill_level_multiplier:.2f} + {(self.total_buff_map[additive_value_key] * 100 if additive_value_key in self.total_buff_map else 0)}%).'
+        if self.type == "TickOverTime":
+            if self.name.startswith("Jué"):
+                return f'This skill triggered a passive DOT effect: {self.name}, which has ticked {self.num_procs} times for {self.total_damage:.2f} DMG in total (Base Ratio: {(self.damage * 100):.2f}% + {(self.total_buff_map[additive_value_key] * 100 if additive_value_key in self.total_buff_map else 0):.2f}%).'
+            return f'This skill triggered a passive DOT effect: {self.name}, which has ticked {self.num_procs} times for {self.total_damage:.2f} DMG in total (Base Ratio: {(self.damage * 100):.2f}% x {skill_level_multiplier:.2f} + {(self.total_buff_map[additive_value_key] * 100 if additive_value_key in self.total_buff_map else 0):.2f}%).'
+        return f'This skill triggered a passive damage effect: {self.name}, which has procced {self.num_procs} times for {self.total_damage:.2f} DMG in total (Base Ratio: {(self.damage * 100):.2f}% x {skill_level_multiplier:.2f} + {(self.total_buff_map[additive_value_key] * 100 if additive_value_key in self.total_buff_map else 0):.2f}%).'
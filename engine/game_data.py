@@ -0,0 +1,547 @@
+"""
+Game Data
+=========
+
+by @HikariTenshi
+original script by @Maygi
+
+This module loads the reference data the calculations are based on from the
+constants and character databases, and converts the raw rows into dictionaries.
+
+The data is loaded once into a read-only GameData snapshot, which is only reloaded
+once import_sheets.py has updated the metadata of the constants database or a table
+of the constants or character databases has been edited in the GUI.
+"""
+
+import logging
+import os
+from datetime import datetime
+from types import MappingProxyType
+from utils.database_io import table_exists, fetch_data_from_database, set_metadata_value
+from utils.config_io import load_config
+from utils.naming_case import camel_to_snake
+from config.constants import logger, CONFIG_PATH, CONSTANTS_DB_PATH, CHARACTERS_DB_PATH, DB_TIME_FORMAT
+
+logger = logging.getLogger(__name__)
+
+def get_weapon_multipliers(db_name=CONSTANTS_DB_PATH, table_name="WeaponMultipliers"):
+    """
+    Retrieve weapon multipliers from the specified database table.
+
+    :param db_name: The name of the database.
+    :type db_name: str
+    :param table_name: The name of the table.
+    :type table_name: str
+    :return: A dictionary of weapon multipliers with levels as keys.
+    :rtype: dict
+    """
+    data = fetch_data_from_database(db_name, table_name, columns=["Level", "ATK", "MainStat"])
+    
+    return {column[0]: [column[1], column[2]] for column in data}
+
+def row_to_character_constants(row):
+    """
+    Convert a row of data into character constants.
+
+    :param row: The data row to convert.
+    :type row: list
+    :return: A dictionary representing character constants.
+    :rtype: dict
+    """
+    return {
+        "name": row[0],
+        "weapon": row[1],
+        "base_health": row[2],
+        "base_attack": row[3],
+        "base_def": row[4],
+        "minor_forte1": row[5],
+        "minor_forte2": row[6],
+        "element": row[8],
+        "max_forte": row[9]
+    }
+
+def get_character_constants(db_name=CONSTANTS_DB_PATH, table_name="CharacterConstants"):
+    """
+    Retrieve character constants from the specified database table.
+
+    :param db_name: The name of the database.
+    :type db_name: str
+    :param table_name: The name of the table.
+    :type table_name: str
+    :return: A dictionary of character constants with character names as keys.
+    :rtype: dict
+    """
+    data = fetch_data_from_database(db_name, table_name)
+
+    char_constants = {}
+    
+    for row in data:
+        if row[0]:  # check if the row actually contains a name
+            char_info = row_to_character_constants(row)
+            char_constants[char_info["name"]] = char_info  # use character name as the key for lookup
+        else:
+            break
+
+    return char_constants
+
+def get_game_data_key(db_name=CONSTANTS_DB_PATH):
+    """
+    Retrieve the version, the last update timestamp and the last edit timestamp of the reference data from the metadata table.
+
+    :param db_name: The name of the database.
+    :type db_name: str
+    :return: The version, the last update timestamp of import_sheets.py and the last time a table has been
+        edited in the GUI, all None if the metadata table doesn't exist.
+    :rtype: tuple
+    """
+    if not table_exists(db_name, "metadata"):
+        return (None, None, None)
+    metadata = dict(fetch_data_from_database(db_name, "metadata", columns=["key", "value"]))
+    return (metadata.get("version"), metadata.get("last_updated"), metadata.get("last_edited"))
+
+def mark_game_data_edited(db_name=CONSTANTS_DB_PATH):
+    """
+    Record that a table of the constants or character databases has been edited, which changes the key of the
+    reference data, so the snapshot is reloaded and the cached results of the old data aren't reused.
+    The last update timestamp isn't changed, import_sheets.py compares it to the spreadsheet.
+
+    :param db_name: The database that stores the metadata, defaults to CONSTANTS_DB_PATH.
+    :type db_name: str, optional
+    """
+    set_metadata_value(db_name, "last_edited", datetime.now().strftime(DB_TIME_FORMAT))
+
+def get_skill_timings(character_tables, echo_skill_rows):
+    """
+    Index the cast time and freeze time of every skill, the same way the rotation builder looks them up.
+
+    Skills starting with "Intro:" or "Outro:" are taken from the Intro and Outro tables, the other skills
+    from the Skills table and the echo skills from the Echoes table, which is shared by all characters.
+    Only the Skills table has a freeze time, it is 0 for the other skills.
+
+    :param character_tables: The Intro, Outro and Skills rows of every character.
+    :type character_tables: dict
+    :param echo_skill_rows: The rows of the Echoes table, starting with the Echo, DMGPercent and Time columns.
+    :type echo_skill_rows: tuple
+    :return: The cast time and freeze time of every skill by (character, skill), or by (None, skill) for the echo skills.
+    :rtype: MappingProxyType
+    """
+    skill_columns = list(get_table_config("characters", "Skills")["db_columns"].keys())
+    time_index = skill_columns.index("Time")
+    freeze_time_index = skill_columns.index("FreezeTime")
+
+    timings = {}
+    for row in echo_skill_rows:
+        if row[0] is not None and row[2] is not None:
+            timings.setdefault((None, row[0]), (row[2], 0))
+    for character, tables in character_tables.items():
+        intro_outro = {}
+        for table_name in ("Intro", "Outro"):
+            for row in tables[table_name]:
+                if row[0] and row[0].startswith(f"{table_name}:") and row[time_index] is not None:
+                    intro_outro.setdefault((character, row[0]), (row[time_index], 0))
+        for row in tables["Skills"]:
+            if row[0] and row[time_index] is not None:
+                timings.setdefault((character, row[0]), (row[time_index], row[freeze_time_index] or 0))
+        timings.update(intro_outro)
+    return MappingProxyType(timings)
+
+def get_character_names(db_path=CHARACTERS_DB_PATH):
+    return [os.path.splitext(f)[0] for f in os.listdir(db_path) if f.endswith(".db")]
+
+class GameData:
+    """
+    A read-only snapshot of the reference data in the constants database and the character databases.
+
+    Every table the calculations need is loaded once and indexed by character, so repeated
+    calculations don't have to query the databases again. The raw rows are kept as tuples and 
+    only converted into dictionaries when they are requested, so a calculation can never change 
+    the snapshot for the next one.
+
+    :param key: The version, last update and last edit timestamps of the data, defaults to the current key of the constants database.
+    :type key: tuple, optional
+    """
+    def __init__(self, key=None):
+        data = {
+            "key": get_game_data_key() if key is None else key,
+            "weapon_multipliers": MappingProxyType({level: tuple(values) for level, values in get_weapon_multipliers().items()}),
+            "char_constants": MappingProxyType({
+                name: MappingProxyType(constants) 
+                for name, constants in get_character_constants().items()}),
+            "skill_level_multipliers": MappingProxyType(dict(fetch_data_from_database(CONSTANTS_DB_PATH, "SkillLevels", columns=["Level", "Value"]))),
+            "weapon_rows": tuple(fetch_data_from_database(CONSTANTS_DB_PATH, "Weapons")),
+            "echo_rows": tuple(fetch_data_from_database(CONSTANTS_DB_PATH, "Echoes")),
+            "echo_skill_rows": tuple(fetch_data_from_database(
+                CONSTANTS_DB_PATH, "Echoes", 
+                columns=["Echo", "DMGPercent", "Time", "EchoSet", "Modifier", "Hits", "Concerto", "Resonance"])),
+            "weapon_buff_rows": tuple(fetch_data_from_database(CONSTANTS_DB_PATH, "WeaponBuffs")),
+            "echo_buff_rows": tuple(fetch_data_from_database(CONSTANTS_DB_PATH, "EchoBuffs")),
+            "character_tables": MappingProxyType({
+                character: MappingProxyType({
+                    "Intro": tuple(fetch_data_from_database(f"{CHARACTERS_DB_PATH}/{character}.db", "Intro")),
+                    "Outro": tuple(fetch_data_from_database(f"{CHARACTERS_DB_PATH}/{character}.db", "Outro")),
+                    "Skills": tuple(fetch_data_from_database(f"{CHARACTERS_DB_PATH}/{character}.db", "Skills")),
+                    "InherentSkills": tuple(fetch_data_from_database(f"{CHARACTERS_DB_PATH}/{character}.db", "InherentSkills", where_clause="(Type LIKE '%Buff%' OR Type LIKE '%Dmg%' OR Type LIKE '%Debuff%') AND ActiveBoolean != 'FALSE' AND InherentSkill IS NOT NULL"))
+                })
+                for character in get_character_names()})
+        }
+        data["skill_timings"] = get_skill_timings(data["character_tables"], data["echo_skill_rows"])
+        for name, value in data.items():
+            object.__setattr__(self, name, value)
+        logger.debug(f"Game data {self.key} loaded")
+
+    def __setattr__(self, name, value):
+        raise AttributeError("GameData is read-only")
+
+    def __delattr__(self, name):
+        raise AttributeError("GameData is read-only")
+
+    # The snapshot is read-only, so copies of a simulation can share it
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def get_character_table(self, character, table_name):
+        """
+        Get the rows of a table of a character database.
+
+        :param character: The name of the character.
+        :type character: str
+        :param table_name: The name of the table, one of "Intro", "Outro", "Skills" or "InherentSkills".
+        :type table_name: str
+        :return: The rows of the table, only the active buffs and damage effects for "InherentSkills".
+        :rtype: tuple
+        """
+        return self.character_tables[character][table_name]
+
+    def get_skill_timing(self, character, skill):
+        """
+        Get the cast time and freeze time of a skill, see get_skill_timings.
+
+        :param character: The name of the character.
+        :type character: str
+        :param skill: The name of the skill.
+        :type skill: str
+        :return: The cast time and the freeze time, or None if the skill doesn't exist.
+        :rtype: tuple
+        """
+        return self.skill_timings.get((character, skill)) or self.skill_timings.get((None, skill))
+
+# The snapshot shared by all calculations
+shared_game_data = None
+
+def get_game_data():
+    """
+    Get the shared snapshot of the reference data, reloading it if import_sheets.py has updated the data
+    or a table has been edited in the GUI since it was loaded.
+
+    :return: The current reference data.
+    :rtype: GameData
+    """
+    global shared_game_data
+    key = get_game_data_key()
+    if shared_game_data is None or shared_game_data.key != key:
+        if shared_game_data is not None:
+            logger.info(f"Game data has been updated from {shared_game_data.key} to {key}, reloading")
+        shared_game_data = GameData(key)
+    return shared_game_data
+
+def get_skill_level_multiplier(skill_level, game_data=None):
+    """
+    Retrieve the skill level multiplier depending on the skill level chosen.
+
+    :param skill_level: The skill level chosen in the settings.
+    :type skill_level: int
+    :param game_data: The reference data to use, defaults to the shared snapshot.
+    :type game_data: GameData, optional
+    :return: The skill level multiplier.
+    :rtype: float
+    """
+    game_data = game_data or get_game_data()
+    return game_data.skill_level_multipliers[int(skill_level)]
+
+
+def row_to_weapon_info(row):
+    """
+    Convert a row of data into weapon information.
+
+    :param row: The data row to convert.
+    :type row: list
+    :return: A dictionary representing weapon information.
+    :rtype: dict
+    """
+    return {
+        "name": row[0],
+        "type": camel_to_snake(row[1]),
+        "base_attack": row[2],
+        "base_main_stat": row[3],
+        "base_main_stat_amount": row[4],
+        "buff": row[5]
+    }
+
+def row_to_echo_info(row):
+    """
+    Convert a row of data into echo information.
+
+    :param row: The data row to convert.
+    :type row: list
+    :return: A dictionary representing echo information.
+    :rtype: dict
+    """
+    return {
+        "name": row[0],
+        "damage": row[1],
+        "cast_time": row[2],
+        "echo_set": row[3],
+        "classifications": row[4],
+        "number_of_hits": row[5],
+        "has_buff": row[6],
+        "cooldown": row[7],
+        "d_cond": {
+            "concerto": row[8] or 0,
+            "resonance": row[9] or 0
+        }
+    }
+
+def row_to_echo_buff_info(row):
+    """
+    Convert a row of data into echo buff information.
+
+    :param row: The data row to convert.
+    :type row: list
+    :return: A dictionary representing echo buff information.
+    :rtype: dict
+    """
+    triggered_by_parsed = row[6]
+    parsed_condition2 = None
+    if "&" in triggered_by_parsed:
+        split = triggered_by_parsed.split("&")
+        triggered_by_parsed = split[0]
+        parsed_condition2 = split[1]
+        logger.debug(f'conditions for echo buff {row[0]}; {triggered_by_parsed}, {parsed_condition2}')
+    return {
+        "name": row[0],
+        "type": camel_to_snake(row[1]), # The type of buff 
+        "classifications": row[2], # The classifications this buff applies to, or All if it applies to all.
+        "buff_type": camel_to_snake(row[3]), # The type of buff - standard, ATK buff, crit buff, elemental buff, etc
+        "amount": row[4], # The value of the buff
+        "duration": row[5] if row[5] == "Passive" else float(row[5]), # How long the buff lasts - a duration is 0 indicates a passive
+        "triggered_by": triggered_by_parsed, # The Skill, or Classification type, this buff is triggered by.
+        "stack_limit": row[7], # The maximum stack limit of this buff.
+        "stack_interval": row[8], # The minimum stack interval of gaining a new stack of this buff.
+        "applies_to": row[9], # The character this buff applies to, or Team in the case of a team buff
+        "additionalCondition": parsed_condition2
+    }
+
+def row_to_weapon_buff_raw_info(row):
+    """
+    Convert a row of data into raw weapon buff information.
+
+    :param row: The data row to convert.
+    :type row: list
+    :return: A dictionary representing raw weapon buff information.
+    :rtype: dict
+    """
+    triggered_by_parsed = row[6]
+    parsed_condition = None
+    parsed_condition2 = None
+    if ";" in triggered_by_parsed:
+        triggered_by_parsed = row[6].split(";")[0]
+        parsed_condition = row[6].split(";")[1]
+        logger.debug(f'found a special condition for {row[0]}: {parsed_condition}')
+    if "&" in triggered_by_parsed:
+        split = triggered_by_parsed.split("&")
+        triggered_by_parsed = split[0]
+        parsed_condition2 = split[1]
+        logger.debug(f'conditions for weapon buff {row[0]}; {triggered_by_parsed}, {parsed_condition2}')
+    return {
+        "name": row[0], # buff  name
+        "type": camel_to_snake(row[1]), # the type of buff 
+        "classifications": row[2], # the classifications this buff applies to, or All if it applies to all.
+        "buff_type": camel_to_snake(row[3]), # the type of buff - standard, ATK buff, crit buff, deepen, etc
+        "amount": row[4], # slash delimited - the value of the buff
+        "duration": row[5], # slash delimited - how long the buff lasts - a duration is 0 indicates a passive. for BuffEnergy, this is the Cd between procs
+        "triggered_by": triggered_by_parsed, # The Skill, or Classification type, this buff is triggered by.
+        "stack_limit": row[7], # slash delimited - the maximum stack limit of this buff.
+        "stack_interval": row[8], # slash delimited - the minimum stack interval of gaining a new stack of this buff.
+        "applies_to": row[9], # The character this buff applies to, or Team in the case of a team buff
+        "special_condition": parsed_condition,
+        "additional_condition": parsed_condition2
+    }
+
+def get_weapons(game_data=None):
+    values = (game_data or get_game_data()).weapon_rows
+
+    return {
+        weapon_info["name"]: weapon_info # Use weapon name as the key for lookup
+        for row in values[1:] # Skip header row
+        if row[0] # Check if the row actually contains a weapon name
+        if (weapon_info := row_to_weapon_info(row)) # Process the row
+    }
+
+def get_echoes(game_data=None):
+    values = (game_data or get_game_data()).echo_rows
+
+    return {
+        echo_info["name"]: echo_info # Use echo name as the key for lookup
+        for row in values[1:] # Skip header row
+        if row[0] # Check if the row actually contains an echo name
+        if (echo_info := row_to_echo_info(row)) # Process the row
+    }
+
+def pad_and_insert_rows(rows, total_columns=None, pos=None, insert_value=None, is_echo=False):
+    for row in rows:
+        # If is_echo is True and pos is provided, insert None at the specified position
+        if is_echo and pos is not None:
+            row.insert(pos, None)
+        # If pos and insert_value are provided, insert insert_value at the specified position
+        if pos is not None and insert_value is not None:
+            row.insert(pos, insert_value)
+        # Pad the row with None values if it's too short
+        if total_columns is not None and len(row) < total_columns:
+            row.extend([None] * (total_columns - len(row)))
+    return rows
+
+def get_weapon_buff_data(game_data=None):
+    weapon_buffs_range = (game_data or get_game_data()).weapon_buff_rows
+    weapon_buffs_range = [row for row in weapon_buffs_range if row[0].strip() != ""] # Ensure that the name is not empty
+    return [row_to_weapon_buff_raw_info(row) for row in weapon_buffs_range]
+
+def get_echo_buff_data(game_data=None):
+    echo_buffs_range = (game_data or get_game_data()).echo_buff_rows
+    echo_buffs_range = [row for row in echo_buffs_range if row[0].strip() != ""] # Ensure that the name is not empty
+    return [row_to_echo_buff_info(row) for row in echo_buffs_range]
+
+def get_table_config(db_name, table_name):
+    """
+    Retrieve the configuration of a table from the table configuration file.
+
+    :param db_name: The key of the database in the configuration, e.g. "characters".
+    :type db_name: str
+    :param table_name: The name of the table.
+    :type table_name: str
+    :return: The table configuration.
+    :rtype: dict
+    :raises ValueError: If the table is not found in the configuration.
+    """
+    config = load_config(CONFIG_PATH)
+    for table in config[db_name]["tables"]:
+        if table["table_name"] == table_name:
+            return table
+    raise ValueError(f"{table_name} table not found in the configuration.")
+
+def get_active_char_rows(characters, echoes, game_data=None):
+    """
+    Collect the skill rows of the given characters, in the layout of the "ActiveChar" table.
+
+    For each character the Intro, Outro, Echo and Skills rows are concatenated, with the
+    character name inserted in front of the Forte column.
+
+    :param characters: The names of the characters in the lineup.
+    :type characters: list
+    :param echoes: The echo chosen for each character, in the same order.
+    :type echoes: list
+    :param game_data: The reference data to use, defaults to the shared snapshot.
+    :type game_data: GameData, optional
+    :return: The skill rows of all characters.
+    :rtype: list
+    """
+    game_data = game_data or get_game_data()
+    db_columns = get_table_config("characters", "Skills")["db_columns"]
+    total_columns = len(db_columns.keys()) + 1
+    forte_pos = list(db_columns.keys()).index("Forte")
+
+    table_data = []
+    for character, echo_name in zip(characters, echoes):
+        intro = game_data.get_character_table(character, "Intro")
+        outro = game_data.get_character_table(character, "Outro")
+        echo = []
+        if echo_name is not None:
+            # Same as Echo LIKE 'echo_name%', which also matches the (Swap) variants
+            echo = [row for row in game_data.echo_skill_rows if row[0] is not None and row[0].lower().startswith(echo_name.lower())]
+        skills = game_data.get_character_table(character, "Skills")
+        
+        intro = [list(row) for row in intro]
+        outro = [list(row) for row in outro]
+        echo = [list(row) for row in echo]
+        skills = [list(row) for row in skills]
+        
+        intro = pad_and_insert_rows(intro, total_columns=total_columns, pos=forte_pos, insert_value=character)
+        outro = pad_and_insert_rows(outro, total_columns=total_columns, pos=forte_pos, insert_value=character)
+        echo = pad_and_insert_rows(echo, total_columns=total_columns, pos=forte_pos, insert_value=character, is_echo=True)
+        skills = pad_and_insert_rows(skills, total_columns=total_columns, pos=forte_pos, insert_value=character)
+
+        table_data.extend(intro + outro + echo + skills)
+    return table_data
+
+def get_skill_names(character, echo_name, game_data=None):
+    """
+    Get the names of the skills a character can use in a rotation, in the order of the skill dropdown.
+
+    :param character: The name of the character.
+    :type character: str
+    :param echo_name: The echo of the character in the lineup, or None if there is none.
+    :type echo_name: str
+    :param game_data: The reference data to use, defaults to the shared snapshot.
+    :type game_data: GameData, optional
+    :return: The names of the Intro, Outro, Echo and Skills rows of the character.
+    :rtype: list
+    """
+    game_data = game_data or get_game_data()
+    echo = []
+    if echo_name is not None:
+        # Same as Echo LIKE 'echo_name%', which also matches the (Swap) variants
+        echo = [row[0] for row in game_data.echo_skill_rows if row[0] is not None and row[0].lower().startswith(echo_name.lower())]
+    return (
+        [row[0] for row in game_data.get_character_table(character, "Intro")] +
+        [row[0] for row in game_data.get_character_table(character, "Outro")] +
+        echo +
+        [row[0] for row in game_data.get_character_table(character, "Skills")])
+
+def get_active_effect_rows(characters, game_data=None):
+    """
+    Collect the inherent skill rows of the given characters that are buffs or damage effects, 
+    in the layout of the "ActiveEffects" table.
+
+    :param characters: The names of the characters in the lineup.
+    :type characters: list
+    :param game_data: The reference data to use, defaults to the shared snapshot.
+    :type game_data: GameData, optional
+    :return: The inherent skill rows of all characters.
+    :rtype: list
+    """
+    game_data = game_data or get_game_data()
+    total_columns = len(get_table_config("characters", "InherentSkills")["db_columns"].keys())
+
+    table_data = []
+    for character in characters:
+        inherent_skills = game_data.get_character_table(character, "InherentSkills")
+        inherent_skills = [list(row) for row in inherent_skills]
+        inherent_skills = pad_and_insert_rows(inherent_skills, total_columns=total_columns)
+        table_data.extend(inherent_skills)
+    return table_data
+
+# Turns a row from "ActiveChar" - aka, the skill data -into a skill data dict.
+def row_to_active_skill_object(row):
+    concerto = row[8] or 0
+    if row[0].startswith("Outro"):
+        concerto = -100
+    return {
+        "name": row[0], # + " (" + row[6] +")",
+        "type": "",
+        "damage": row[1],
+        "cast_time": row[2],
+        "dps": row[3],
+        "classifications": row[4],
+        "number_of_hits": row[5],
+        "source": row[6], # the name of the character this skill belongs to
+        "d_cond": {
+            "forte": row[7] or 0,
+            "concerto": concerto,
+            "resonance": row[9] or 0
+        },
+        "freeze_time": row[10] or 0,
+        "cooldown": row[11] or 0,
+        "max_charges": row[12] or 1
+    }
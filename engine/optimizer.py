@@ -0,0 +1,276 @@
+"""
+Optimizer
+=========
+
+by @HikariTenshi
+original script by @Maygi
+
+This module searches the echo main stat layouts and substat roll distributions of a lineup
+that maximize the 2 minute DPS of the current rotation.
+
+Every combination of main stat layouts (the Build column) is simulated once, in a process pool.
+The substats don't change the buffs or procs of the rotation and every character only scales
+their own damage, so the substat distributions of each character are then evaluated separately,
+all at once with NumPy over the damage instances recorded by the simulation. The best
+allocations are finally recalculated exactly with Simulation.recalculate.
+"""
+
+import logging
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import product
+from utils.database_io import fetch_data_from_database
+from engine.batch import init_worker
+from engine.buff_map import Stat
+from engine.simulation import STAT_CHECK_MAP, Simulation, lineup_row_to_list, row_to_character_info
+from engine.substats import FORMULA_STATS, RECORD_FIELDS, calculate_damage
+from config.constants import logger, CONSTANTS_DB_PATH
+
+logger = logging.getLogger(__name__)
+
+# The substats that can be rolled, with the CharacterLineup column they are entered in.
+# The skill type bonuses aren't included because the lineup columns for them aren't used by the calculations.
+SUBSTAT_COLUMNS = {
+    "attack": "AttackPercent",
+    "flat_attack": "Attack",
+    "health": "HealthPercent",
+    "defense": "DefensePercent",
+    "crit_rate": "CritRate",
+    "crit_dmg": "CritDamage"
+}
+
+# The recorded damage inputs that are replaced by the stats of each substat distribution
+RECORD_STAT_FIELDS = {
+    "base_crit_rate": "crit_rate",
+    "base_crit_dmg": "crit_dmg",
+    "bonus_attack_stat": "attack",
+    "bonus_health": "health",
+    "bonus_defense": "defense"
+}
+
+# The maximum amount of rolls of a substat, one per echo
+MAX_ROLLS = 5
+
+def get_echo_layouts(db_name=CONSTANTS_DB_PATH):
+    """
+    Get the echo main stat layouts that can be chosen in the Build column.
+
+    :param db_name: The constants database, defaults to CONSTANTS_DB_PATH.
+    :type db_name: str, optional
+    :return: The names of the layouts.
+    :rtype: list
+    """
+    return fetch_data_from_database(db_name, "EchoBuilds", columns="Build")
+
+def get_roll_counts(character_row):
+    """
+    Get the amount of rolls of each substat that make up the stats of a character.
+
+    :param character_row: The character, with the CharacterLineup column names as keys.
+    :type character_row: dict
+    :return: The amount of rolls of each substat in SUBSTAT_COLUMNS.
+    :rtype: dict
+    """
+    return {
+        stat: round((character_row[column] or 0) / STAT_CHECK_MAP[stat])
+        for stat, column in SUBSTAT_COLUMNS.items()}
+
+def get_roll_distributions(budget, max_rolls=MAX_ROLLS, stat_count=len(SUBSTAT_COLUMNS)):
+    """
+    Get all ways to distribute an amount of rolls over the substats.
+
+    :param budget: The total amount of rolls.
+    :type budget: int
+    :param max_rolls: The maximum amount of rolls of a single substat, defaults to MAX_ROLLS.
+    :type max_rolls: int, optional
+    :param stat_count: The amount of substats, defaults to the amount of SUBSTAT_COLUMNS.
+    :type stat_count: int, optional
+    :return: The amount of rolls per substat of every distribution.
+    :rtype: list
+    """
+    if stat_count == 1:
+        return [(budget,)] if budget <= max_rolls else []
+    return [
+        (rolls,) + rest
+        for rolls in range(min(budget, max_rolls) + 1)
+        for rest in get_roll_distributions(budget - rolls, max_rolls, stat_count - 1)]
+
+def apply_rolls(character_row, rolls):
+    """
+    Create a copy of a character with the stats of the given substat rolls.
+
+    :param character_row: The character, with the CharacterLineup column names as keys.
+    :type character_row: dict
+    :param rolls: The amount of rolls per substat, in the order of SUBSTAT_COLUMNS.
+    :type rolls: tuple
+    :return: The character with the new stats.
+    :rtype: dict
+    """
+    character_row = dict(character_row)
+    for (stat, column), count in zip(SUBSTAT_COLUMNS.items(), rolls):
+        character_row[column] = count * STAT_CHECK_MAP[stat]
+    return character_row
+
+def evaluate_distributions(simulation, result, character_index, character_row, distributions):
+    """
+    Evaluate the 2 minute DPS a character contributes with each substat distribution, for all distributions at once.
+
+    The damage instances of the character recorded by the simulation are recalculated with the
+    stats of every distribution, the buffs, procs and timings of the rotation stay the same.
+
+    :param simulation: The simulation of the rotation.
+    :type simulation: Simulation
+    :param result: The results of the simulation.
+    :type result: SimulationResult
+    :param character_index: The index of the character in the lineup.
+    :type character_index: int
+    :param character_row: The character as it was simulated, with the CharacterLineup column names as keys.
+    :type character_row: dict
+    :param distributions: The amount of rolls per substat of every distribution, in the order of SUBSTAT_COLUMNS.
+    :type distributions: list
+    :return: The 2 minute DPS of the character with each distribution.
+    :rtype: numpy.ndarray
+    """
+    character = simulation.characters[character_index]
+    sensitivity = simulation.substat_sensitivity
+    selected = np.array([
+        record_character == character and mode is not None
+        for record_character, mode in zip(sensitivity.record_characters, sensitivity.modes)], dtype=bool)
+    if not selected.any():
+        return np.zeros(len(distributions))
+
+    # the stats of every distribution, as the calculator would derive them from the lineup
+    crit_cache = {}
+    columns = {key: [] for key in ("attack", "health", "defense", "crit_rate", "crit_dmg", "flat_attack")}
+    for rolls in distributions:
+        rolled_row = apply_rolls(character_row, rolls)
+        crit_key = (rolled_row["CritRate"], rolled_row["CritDamage"])
+        if crit_key not in crit_cache:
+            character_info = row_to_character_info(
+                lineup_row_to_list(rolled_row), simulation.level_cap, simulation.weapon_data, False, simulation.game_data)
+            crit_cache[crit_key] = (character_info["crit_rate"], character_info["crit_dmg"])
+        crit_rate, crit_dmg = crit_cache[crit_key]
+        columns["attack"].append(rolled_row["AttackPercent"])
+        columns["health"].append(rolled_row["HealthPercent"])
+        columns["defense"].append(rolled_row["DefensePercent"])
+        columns["crit_rate"].append(crit_rate)
+        columns["crit_dmg"].append(crit_dmg)
+        columns["flat_attack"].append(rolled_row["Attack"] - simulation.recorded_flat_stats[character][0])
+    columns = {key: np.array(values, dtype=float)[None, :] for key, values in columns.items()}
+
+    records = [column[selected, None] for column in np.array(sensitivity.records, dtype=float).T]
+    for field, key in RECORD_STAT_FIELDS.items():
+        records[RECORD_FIELDS.index(field)] = columns[key]
+    stats = np.array(sensitivity.stats, dtype=float)[selected]
+    formula_stats = [stats[:, i, None] for i in range(len(FORMULA_STATS))]
+    formula_stats[FORMULA_STATS.index(Stat.FLAT_ATTACK)] = formula_stats[FORMULA_STATS.index(Stat.FLAT_ATTACK)] + columns["flat_attack"]
+    damage_bonus = sensitivity.get_damage_bonus()[selected, None]
+    damage = calculate_damage(
+        tuple(records), tuple(formula_stats), damage_bonus,
+        records[RECORD_FIELDS.index("res_multiplier")], records[RECORD_FIELDS.index("defense_multiplier")])
+
+    loops = (120 - result.opener_time) / (result.final_time - result.opener_time)
+    weights = np.array([1 if mode == "opener" else loops for mode in np.array(sensitivity.modes, dtype=object)[selected]])
+    return weights @ damage / 120
+
+def optimize_layout(lineup, rotation, settings, layouts, budgets, max_rolls=MAX_ROLLS, start_time=0.0):
+    """
+    Find the best substat distribution of every character for a combination of main stat layouts.
+
+    :param lineup: The three characters of the lineup, as dictionaries with the column names of the
+        CharacterLineup table as keys.
+    :type lineup: list
+    :param rotation: The rotation steps as (character, skill) pairs.
+    :type rotation: list
+    :param settings: The settings, as a dictionary with the column names of the Settings table as keys.
+    :type settings: dict
+    :param layouts: The main stat layout of every character.
+    :type layouts: tuple
+    :param budgets: The amount of substat rolls of every character.
+    :type budgets: list
+    :param max_rolls: The maximum amount of rolls of a single substat, defaults to MAX_ROLLS.
+    :type max_rolls: int, optional
+    :param start_time: The in-game time of the first rotation step, defaults to 0.0.
+    :type start_time: float, optional
+    :return: The allocation, with the keys "Builds", "Rolls", "Lineup", "DPS2Mins" and "MarginalGains".
+    :rtype: dict
+    """
+    lineup = [dict(character_row, Build=layout) for character_row, layout in zip(lineup, layouts)]
+    simulation = Simulation(lineup, rotation, settings, start_time=start_time)
+    result = simulation.run()
+
+    best_lineup = []
+    rolls = {}
+    marginal_gains = {}
+    for i, character_row in enumerate(lineup):
+        character = character_row["Character"]
+        distributions = get_roll_distributions(budgets[i], max_rolls)
+        dps = evaluate_distributions(simulation, result, i, character_row, distributions)
+        best = distributions[int(np.argmax(dps))]
+        best_lineup.append(apply_rolls(character_row, best))
+        rolls[character] = dict(zip(SUBSTAT_COLUMNS, best))
+
+        # the DPS of one more roll of each substat on top of the best distribution
+        extra_rolls = [tuple(count + (j == k) for j, count in enumerate(best)) for k in range(len(best))]
+        extra_dps = evaluate_distributions(simulation, result, i, character_row, [best] + extra_rolls)
+        marginal_gains[character] = dict(zip(SUBSTAT_COLUMNS, (extra_dps[1:] - extra_dps[0]).tolist()))
+
+    return {
+        "Builds": list(layouts),
+        "Rolls": rolls,
+        "Lineup": best_lineup,
+        "DPS2Mins": simulation.recalculate(best_lineup).dps_2_mins,
+        "MarginalGains": marginal_gains
+    }
+
+def optimize_echoes(lineup, rotation, settings, top_n=5, layouts=None, budgets=None, max_rolls=MAX_ROLLS, start_time=0.0, max_workers=None):
+    """
+    Search the main stat layouts and substat distributions of a lineup that maximize the 2 minute DPS of a rotation.
+
+    :param lineup: The three characters of the lineup, as dictionaries with the column names of the
+        CharacterLineup table as keys.
+    :type lineup: list
+    :param rotation: The rotation steps as (character, skill) pairs.
+    :type rotation: list
+    :param settings: The settings, as a dictionary with the column names of the Settings table as keys.
+    :type settings: dict
+    :param top_n: The amount of allocations to return, defaults to 5.
+    :type top_n: int, optional
+    :param layouts: The main stat layouts to consider, defaults to all layouts of the EchoBuilds table.
+    :type layouts: list, optional
+    :param budgets: The amount of substat rolls of every character, defaults to the rolls the lineup currently has.
+    :type budgets: list, optional
+    :param max_rolls: The maximum amount of rolls of a single substat, defaults to MAX_ROLLS.
+    :type max_rolls: int, optional
+    :param start_time: The in-game time of the first rotation step, defaults to 0.0.
+    :type start_time: float, optional
+    :param max_workers: The amount of worker processes, defaults to the amount of CPU cores.
+    :type max_workers: int, optional
+    :return: The best allocations, ordered by their 2 minute DPS. Every allocation also contains
+        the gain over the current lineup under the key "Gain".
+    :rtype: list
+    :raises IncompleteInputError: If the lineup or the rotation is incomplete.
+    """
+    current_dps = Simulation(lineup, rotation, settings, start_time=start_time).run().dps_2_mins
+    layouts = layouts or get_echo_layouts()
+    if budgets is None:
+        budgets = [sum(get_roll_counts(character_row).values()) for character_row in lineup]
+    combinations = list(product(layouts, repeat=len(lineup)))
+    logger.info(f"Optimizing {len(combinations)} main stat layouts with {budgets} substat rolls...")
+
+    allocations = []
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=init_worker) as executor:
+        futures = {
+            executor.submit(optimize_layout, lineup, rotation, settings, combination, budgets, max_rolls, start_time): combination
+            for combination in combinations}
+        for future in as_completed(futures):
+            try:
+                allocation = future.result()
+            except Exception as e:
+                logger.warning(f"Skipping the layouts {futures[future]}: {type(e).__name__}: {e}")
+                continue
+            allocation["Gain"] = allocation["DPS2Mins"] - current_dps
+            allocations.append(allocation)
+
+    allocations.sort(key=lambda allocation: allocation["DPS2Mins"], reverse=True)
+    return allocations[:top_n]
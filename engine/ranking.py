@@ -0,0 +1,167 @@
+"""
+Ranking
+=======
+
+by @HikariTenshi
+original script by @Maygi
+
+This module ranks the weapons and echoes each character of a lineup could use in a rotation.
+Every weapon of the character's weapon type is tried at every rank and every echo that fits the
+echo skills of the rotation is tried, one character at a time, with the rest of the lineup unchanged.
+The candidates are simulated in a process pool whose workers load the reference data only once,
+and the results are sorted by how much they change the 2 minute DPS of the current loadout.
+"""
+
+import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import product
+from engine.batch import init_worker
+from engine.game_data import get_game_data, get_echoes
+from engine.simulation import simulate
+from config.constants import logger
+
+logger = logging.getLogger(__name__)
+
+# The ranks a weapon can be refined to
+WEAPON_RANKS = (1, 2, 3, 4, 5)
+
+def get_weapon_options(character, game_data=None):
+    """
+    Get the weapons a character can equip, like the weapon dropdown of the lineup does.
+
+    :param character: The name of the character.
+    :type character: str
+    :param game_data: The reference data to use, defaults to the shared snapshot.
+    :type game_data: GameData, optional
+    :return: The names of the weapons of the character's weapon type.
+    :rtype: list
+    """
+    game_data = game_data or get_game_data()
+    weapon_type = game_data.char_constants[character]["weapon"]
+    return [row[0] for row in game_data.weapon_rows if row[0] and row[1] == weapon_type]
+
+def get_echo_options(character, rotation, game_data=None):
+    """
+    Get the echoes a character can equip without breaking the rotation.
+
+    If the character uses echo skills in the rotation, only the echoes these skills belong to are
+    compatible, the same way the skill dropdown of the rotation matches the echo of the lineup.
+
+    :param character: The name of the character.
+    :type character: str
+    :param rotation: The rotation steps as (character, skill) pairs.
+    :type rotation: list
+    :param game_data: The reference data to use, defaults to the shared snapshot.
+    :type game_data: GameData, optional
+    :return: The names of the compatible echoes.
+    :rtype: list
+    """
+    game_data = game_data or get_game_data()
+    echo_skills = {row[0].lower() for row in game_data.echo_skill_rows if row[0]}
+    used_skills = [skill.lower() for step_character, skill in rotation if step_character == character and skill and skill.lower() in echo_skills]
+    return [
+        echo for echo in get_echoes(game_data)
+        if not echo.endswith("(Swap)") and all(skill.startswith(echo.lower()) for skill in used_skills)]
+
+def get_loadout_candidates(lineup, rotation, ranks=WEAPON_RANKS, combine=False, game_data=None):
+    """
+    Get the weapon and echo changes to evaluate for every character of a lineup.
+
+    :param lineup: The three characters of the lineup, as dictionaries with the column names of the
+        CharacterLineup table as keys.
+    :type lineup: list
+    :param rotation: The rotation steps as (character, skill) pairs.
+    :type rotation: list
+    :param ranks: The weapon ranks to try, defaults to WEAPON_RANKS.
+    :type ranks: iterable, optional
+    :param combine: Whether to try every weapon with every echo instead of changing one of them at a time, defaults to False.
+    :type combine: bool, optional
+    :param game_data: The reference data to use, defaults to the shared snapshot.
+    :type game_data: GameData, optional
+    :return: The candidates as (slot, changes) tuples, where the changes are a dictionary of the
+        Weapon, Rank and Echo columns. The current loadouts are not included.
+    :rtype: list
+    """
+    candidates = []
+    for slot, character_row in enumerate(lineup):
+        weapons = get_weapon_options(character_row["Character"], game_data)
+        echoes = get_echo_options(character_row["Character"], rotation, game_data)
+        current = (character_row["Weapon"], character_row["Rank"], character_row["Echo"])
+        if combine:
+            loadouts = product(weapons, ranks, echoes)
+        else:
+            loadouts = [(weapon, rank, current[2]) for weapon, rank in product(weapons, ranks)]
+            loadouts += [(current[0], current[1], echo) for echo in echoes]
+        for loadout in dict.fromkeys(loadouts): # drops the duplicates while keeping the order
+            if loadout != current:
+                candidates.append((slot, dict(zip(("Weapon", "Rank", "Echo"), loadout))))
+    return candidates
+
+def evaluate_loadout(lineup, rotation, settings, slot, changes, start_time=0.0):
+    """
+    Simulate a rotation with the weapon and echo of one character changed.
+
+    :param lineup: The three characters of the lineup, as dictionaries with the column names of the
+        CharacterLineup table as keys.
+    :type lineup: list
+    :param rotation: The rotation steps as (character, skill) pairs.
+    :type rotation: list
+    :param settings: The settings, as a dictionary with the column names of the Settings table as keys.
+    :type settings: dict
+    :param slot: The index of the character in the lineup.
+    :type slot: int
+    :param changes: The new values of the Weapon, Rank and Echo columns.
+    :type changes: dict
+    :param start_time: The in-game time of the first rotation step, defaults to 0.0.
+    :type start_time: float, optional
+    :return: The 2 minute DPS of the changed lineup.
+    :rtype: float
+    """
+    lineup = [dict(character_row, **changes) if i == slot else character_row for i, character_row in enumerate(lineup)]
+    return simulate(lineup, rotation, settings, start_time=start_time).dps_2_mins
+
+def rank_loadouts(lineup, rotation, settings, ranks=WEAPON_RANKS, combine=False, start_time=0.0, max_workers=None):
+    """
+    Rank the weapons and echoes of every character of a lineup by the DPS they would add to a rotation.
+
+    :param lineup: The three characters of the lineup, as dictionaries with the column names of the
+        CharacterLineup table as keys.
+    :type lineup: list
+    :param rotation: The rotation steps as (character, skill) pairs.
+    :type rotation: list
+    :param settings: The settings, as a dictionary with the column names of the Settings table as keys.
+    :type settings: dict
+    :param ranks: The weapon ranks to try, defaults to WEAPON_RANKS.
+    :type ranks: iterable, optional
+    :param combine: Whether to try every weapon with every echo instead of changing one of them at a time, defaults to False.
+    :type combine: bool, optional
+    :param start_time: The in-game time of the first rotation step, defaults to 0.0.
+    :type start_time: float, optional
+    :param max_workers: The amount of worker processes, defaults to the amount of CPU cores.
+    :type max_workers: int, optional
+    :return: One dictionary per candidate with the keys Character, Weapon, Rank, Echo, DPS2Mins, Delta and Error,
+        ordered by the delta to the current DPS. Candidates that could not be simulated come last.
+    :rtype: list
+    :raises IncompleteInputError: If the lineup or the rotation is incomplete.
+    """
+    current_dps = simulate(lineup, rotation, settings, start_time=start_time).dps_2_mins
+    candidates = get_loadout_candidates(lineup, rotation, ranks, combine)
+    logger.info(f"Ranking {len(candidates)} weapons and echoes against {current_dps:.2f} DPS...")
+
+    table = []
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=init_worker) as executor:
+        futures = {
+            executor.submit(evaluate_loadout, lineup, rotation, settings, slot, changes, start_time): (slot, changes)
+            for slot, changes in candidates}
+        for future in as_completed(futures):
+            slot, changes = futures[future]
+            entry = dict(Character=lineup[slot]["Character"], **changes, DPS2Mins=None, Delta=None, Error=None)
+            try:
+                entry["DPS2Mins"] = future.result()
+                entry["Delta"] = entry["DPS2Mins"] - current_dps
+            except Exception as e:
+                entry["Error"] = f"{type(e).__name__}: {e}"
+            table.append(entry)
+
+    table.sort(key=lambda entry: (entry["Delta"] is None, -(entry["Delta"] or 0)))
+    return table
@@ -0,0 +1,257 @@
+"""
+Result Cache
+============
+
+by @HikariTenshi
+original script by @Maygi
+
+This module keeps the results of previous calculations in a local SQLite file, so calculating a build
+that has been calculated before, e.g. after reopening the calculator or switching between two builds
+of the execution history, doesn't have to simulate it again. The results are stored under a hash of
+everything they depend on: the source code of the engine, the version, the last update and the
+last edit of the reference data, the lineup, the rotation and the settings. Changing the engine or the reference data
+therefore never reuses the results of the previous version. The least recently used results are
+removed once the file grows too large.
+
+Usage Example:
+
+    from engine.result_cache import ResultCache, get_result_key
+
+    result_cache = ResultCache()
+    key = get_result_key(lineup, rotation, settings)
+    result = result_cache.get(key)
+    if result is None:
+        result = simulate(lineup, rotation, settings)
+        result_cache.put(key, result)
+"""
+
+import glob
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import time
+import zlib
+from utils.database_io import connect_to_database
+from engine.game_data import get_game_data_key
+from engine.simulation import SimulationResult
+from config.constants import logger, RESULT_CACHE_DB_PATH
+
+logger = logging.getLogger(__name__)
+
+# Increased whenever the format of the stored results changes, changes of the engine are detected by get_engine_version
+RESULT_CACHE_VERSION = 1
+
+# The hash of the engine source code, computed once by get_engine_version
+engine_version = None
+
+# The total size of the stored results in bytes the cache is shrunk to
+DEFAULT_MAX_SIZE = 64 * 1024 * 1024
+
+def get_engine_version():
+    """
+    Get a hash of the source code of the engine, so results calculated by a different version of the
+    engine aren't reused. The source files are only read the first time.
+
+    :return: The hash as a hexadecimal SHA-256 hash, or None if the source files can't be found, e.g. in a frozen build.
+    :rtype: str
+    """
+    global engine_version
+    if engine_version is None:
+        paths = sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), "*.py")))
+        if not paths:
+            logger.warning("Could not find the engine source code, the result cache only depends on RESULT_CACHE_VERSION")
+            return None
+        content_hash = hashlib.sha256()
+        for path in paths:
+            with open(path, "rb") as file:
+                content_hash.update(os.path.basename(path).encode("utf-8"))
+                content_hash.update(file.read())
+        engine_version = content_hash.hexdigest()
+    return engine_version
+
+def get_result_key(lineup, rotation, settings, start_time=0.0, game_data_key=None):
+    """
+    Get the key of the result of a calculation, a hash of everything the result depends on.
+
+    :param lineup: The three characters of the lineup, as dictionaries with the column names of the
+        CharacterLineup table as keys.
+    :type lineup: list
+    :param rotation: The rotation steps as (character, skill) pairs.
+    :type rotation: list
+    :param settings: The settings, as a dictionary with the column names of the Settings table as keys.
+    :type settings: dict
+    :param start_time: The in-game time of the first rotation step, defaults to 0.0.
+    :type start_time: float, optional
+    :param game_data_key: The version, last update and last edit timestamps of the reference data,
+        defaults to the current ones of the constants database.
+    :type game_data_key: tuple, optional
+    :return: The key, as a hexadecimal SHA-256 hash.
+    :rtype: str
+    """
+    if game_data_key is None:
+        game_data_key = get_game_data_key()
+    content = [
+        RESULT_CACHE_VERSION,
+        get_engine_version(),
+        list(game_data_key),
+        [sorted(character_row.items()) for character_row in lineup],
+        [list(step) for step in rotation],
+        sorted(settings.items()),
+        start_time
+    ]
+    return hashlib.sha256(json.dumps(content, default=str).encode("utf-8")).hexdigest()
+
+def encode_result(result):
+    """
+    Serialize a simulation result as compressed JSON.
+
+    :param result: The result.
+    :type result: SimulationResult
+    :return: The serialized result.
+    :rtype: bytes
+    """
+    return zlib.compress(json.dumps(vars(result), separators=(",", ":")).encode("utf-8"))
+
+def decode_result(data):
+    """
+    Deserialize a simulation result serialized with encode_result.
+
+    :param data: The serialized result.
+    :type data: bytes
+    :return: The result.
+    :rtype: SimulationResult
+    """
+    return SimulationResult(**json.loads(zlib.decompress(data).decode("utf-8")))
+
+class ResultCache:
+    """
+    Stores simulation results in an SQLite database, evicting the least recently used ones once they
+    take up more than max_size bytes. The cache is only an optimization, so if the database can't be
+    read or written, the error is logged and the result is treated as missing.
+
+    :param db_name: The database to store the results in, defaults to RESULT_CACHE_DB_PATH.
+    :type db_name: str, optional
+    :param max_size: The total size of the stored results in bytes, defaults to DEFAULT_MAX_SIZE.
+    :type max_size: int, optional
+    """
+    def __init__(self, db_name=RESULT_CACHE_DB_PATH, max_size=DEFAULT_MAX_SIZE):
+        self.db_name = db_name
+        self.max_size = max_size
+        self.table_created = False
+
+    def connect(self):
+        conn = connect_to_database(self.db_name)
+        if not self.table_created:
+            conn.execute("""
+            CREATE TABLE IF NOT EXISTS results (
+                key TEXT PRIMARY KEY,
+                result BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                last_used REAL NOT NULL
+            )
+            """)
+            conn.commit()
+            self.table_created = True
+        return conn
+
+    def get(self, key):
+        """
+        Get a stored result and mark it as recently used.
+
+        :param key: The key of the result, see get_result_key.
+        :type key: str
+        :return: The result, or None if it isn't stored.
+        :rtype: SimulationResult
+        """
+        try:
+            conn = self.connect()
+            try:
+                row = conn.execute("SELECT result FROM results WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    return None
+                try:
+                    result = decode_result(row[0])
+                except (zlib.error, ValueError, TypeError) as e:
+                    logger.warning(f"Removing the unreadable cached result {key}: {e}")
+                    conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                    conn.commit()
+                    return None
+                conn.execute("UPDATE results SET last_used = ? WHERE key = ?", (time.time(), key))
+                conn.commit()
+                return result
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.warning(f"Could not read the result cache {self.db_name}: {e}")
+            return None
+
+    def put(self, key, result):
+        """
+        Store a result, evicting the least recently used results if the cache has become too large.
+
+        :param key: The key of the result, see get_result_key.
+        :type key: str
+        :param result: The result.
+        :type result: SimulationResult
+        """
+        data = encode_result(result)
+        if len(data) > self.max_size:
+            logger.debug(f"The result {key} is larger than the result cache, not storing it")
+            return
+        try:
+            conn = self.connect()
+            try:
+                conn.execute(
+                    "REPLACE INTO results (key, result, size, last_used) VALUES (?, ?, ?, ?)",
+                    (key, data, len(data), time.time()))
+                self.evict(conn)
+                conn.commit()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.warning(f"Could not write the result cache {self.db_name}: {e}")
+
+    def evict(self, conn):
+        """
+        Remove the least recently used results until the stored results fit into max_size.
+
+        :param conn: The connection to the cache database.
+        :type conn: sqlite3.Connection
+        """
+        total_size = conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        if total_size <= self.max_size:
+            return
+        evicted = []
+        for key, size in conn.execute("SELECT key, size FROM results ORDER BY last_used, rowid"):
+            if total_size <= self.max_size:
+                break
+            evicted.append((key,))
+            total_size -= size
+        conn.executemany("DELETE FROM results WHERE key = ?", evicted)
+        logger.debug(f"Evicted {len(evicted)} results from the result cache")
+
+    def get_size(self):
+        """
+        Get the amount and the total size of the stored results.
+
+        :return: The amount of results and their size in bytes.
+        :rtype: tuple
+        """
+        conn = self.connect()
+        try:
+            return conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results").fetchone()
+        finally:
+            conn.close()
+
+    def clear(self):
+        """
+        Remove all stored results.
+        """
+        conn = self.connect()
+        try:
+            conn.execute("DELETE FROM results")
+            conn.commit()
+        finally:
+            conn.close()
@@ -0,0 +1,264 @@
+"""
+Rotation Search
+===============
+
+by @HikariTenshi
+original script by @Maygi
+
+This module searches rotations for a character lineup instead of writing them by hand.
+Rotations are built step by step from the skills of the characters with a beam search, which
+only keeps the prefixes with the highest DPS so far at every step, until they reach the time budget.
+
+A step is only kept if the simulation considers it legal, i.e. the skill isn't on cooldown and
+its Forte, Concerto and Resonance requirements are met. On top of that, an Intro has to follow an
+Outro of another character, an Outro has to be followed by an Intro and a swap-cancelled skill
+has to be followed by another character. Requirements the simulation doesn't track, e.g. skills
+that are only available during a Liberation, aren't checked either, so the skill pool can be
+restricted to the skills that should be considered.
+
+The state of the simulation after every prefix is memoized, so a prefix that is shared by several
+rotations is only simulated once and every extension continues from a copy of its state.
+"""
+
+import copy
+import heapq
+import logging
+from collections import OrderedDict
+from engine.simulation import Simulation, get_skill_reference, get_skill_time
+from config.constants import logger
+
+logger = logging.getLogger(__name__)
+
+def get_skill_pool(simulation):
+    """
+    Get the skills every character of a simulation can use, i.e. their Intro, Outro, echo and Skills rows.
+
+    :param simulation: The simulation of the lineup.
+    :type simulation: Simulation
+    :return: The names of the skills of each character.
+    :rtype: dict
+    """
+    skill_pool = {character: [] for character in simulation.characters}
+    for name, skill_ref in simulation.skill_data.items():
+        if skill_ref["source"] in skill_pool:
+            skill_pool[skill_ref["source"]].append(name)
+    return skill_pool
+
+def is_allowed_after(last_step, character, skill):
+    """
+    Check if a skill may follow the previous step of a rotation, apart from the checks of the simulation itself.
+
+    :param last_step: The previous step as a (character, skill) pair, or None for the first step.
+    :type last_step: tuple
+    :param character: The character of the next step.
+    :type character: str
+    :param skill: The skill of the next step.
+    :type skill: str
+    :return: True if the skill may follow, False otherwise.
+    :rtype: bool
+    """
+    if last_step is None:
+        return not skill.startswith("Intro")
+    last_character, last_skill = last_step
+    if last_skill.startswith("Outro"):
+        return character != last_character and skill.startswith("Intro")
+    if skill.startswith("Intro"):
+        return False
+    if last_skill.endswith("(Swap)"):
+        return character != last_character
+    return True
+
+def get_end_time(simulation):
+    """
+    Get the in-game time at which the last step of a simulation ends, including the time delays.
+
+    :param simulation: The simulation.
+    :type simulation: Simulation
+    :return: The end time of the rotation so far.
+    :rtype: float
+    """
+    if not simulation.rotation:
+        return simulation.times[0]
+    character, skill = simulation.rotation[-1]
+    return simulation.times[-1] + simulation.bonus_time_total + get_skill_time(get_skill_reference(simulation.skill_data, skill, character))
+
+class PrefixCache:
+    """
+    Memoizes the state of a simulation after each rotation prefix.
+
+    The least recently used states are dropped once there are more than max_size of them,
+    a dropped state is simulated again from the longest prefix that is still cached.
+
+    :param root: The simulation before the first step, with an empty rotation.
+    :type root: Simulation
+    :param max_size: The maximum amount of cached states, defaults to 2048.
+    :type max_size: int, optional
+    """
+    def __init__(self, root, max_size=2048):
+        self.root = root
+        self.max_size = max_size
+        self.states = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, prefix):
+        """
+        Get the state of the simulation after a rotation prefix, simulating only the steps that aren't cached yet.
+
+        The returned simulation is shared with the cache, so it must be copied before it is changed.
+
+        :param prefix: The rotation prefix as a tuple of (character, skill) pairs.
+        :type prefix: tuple
+        :return: The simulation after the prefix, or None if a step of the prefix is illegal,
+            and whether all steps of the prefix are legal.
+        :rtype: tuple
+        """
+        if not prefix:
+            return self.root, True
+        if prefix in self.states:
+            self.hits += 1
+            self.states.move_to_end(prefix)
+            return self.states[prefix]
+
+        parent, legal = self.get(prefix[:-1])
+        if not legal:
+            return None, False
+        self.misses += 1
+        simulation = copy.deepcopy(parent)
+        try:
+            legal = simulation.add_step(*prefix[-1])
+        except Exception as e:
+            logger.debug(f"Step {prefix[-1]} can't be simulated after {len(prefix) - 1} steps: {type(e).__name__}: {e}")
+            legal = False
+
+        # the state after an illegal step is never continued, so it isn't kept
+        self.states[prefix] = (simulation, True) if legal else (None, False)
+        if len(self.states) > self.max_size:
+            self.states.popitem(last=False)
+        return (simulation, True) if legal else (None, False)
+
+class RotationSearch:
+    """
+    Searches the rotations of a character lineup with the highest DPS over a time budget.
+
+    :param lineup: The three characters of the lineup, as dictionaries with the column names of the
+        CharacterLineup table as keys.
+    :type lineup: list
+    :param settings: The settings, as a dictionary with the column names of the Settings table as keys.
+    :type settings: dict
+    :param skill_pool: The skills each character may use, defaults to all of their skills, see get_skill_pool.
+    :type skill_pool: dict, optional
+    :param start_time: The in-game time of the first rotation step, defaults to 0.0.
+    :type start_time: float, optional
+    :param game_data: The reference data to use, defaults to the shared snapshot.
+    :type game_data: GameData, optional
+    :param max_states: The maximum amount of memoized prefix states, defaults to 2048.
+    :type max_states: int, optional
+    :raises IncompleteInputError: If the lineup is incomplete.
+    """
+    def __init__(self, lineup, settings, skill_pool=None, start_time=0.0, game_data=None, max_states=2048):
+        # The simulation needs a rotation to be set up, the placeholder step is removed before anything is simulated
+        root = Simulation(lineup, [(lineup[0]["Character"], "Search")], settings, start_time=start_time, game_data=game_data)
+        root.clear_rotation()
+        self.start_time = start_time
+        self.skill_pool = skill_pool or get_skill_pool(root)
+        self.cache = PrefixCache(root, max_states)
+
+    def get_steps(self, prefix):
+        """
+        Get the steps that may follow a rotation prefix.
+
+        :param prefix: The rotation prefix as a tuple of (character, skill) pairs.
+        :type prefix: tuple
+        :return: The next steps as (character, skill) pairs.
+        :rtype: list
+        """
+        last_step = prefix[-1] if prefix else None
+        return [
+            (character, skill)
+            for character, skills in self.skill_pool.items()
+            for skill in skills
+            if is_allowed_after(last_step, character, skill)]
+
+    def evaluate(self, prefix):
+        """
+        Get the damage, the end time and the DPS of a rotation prefix.
+
+        :param prefix: The rotation prefix as a tuple of (character, skill) pairs.
+        :type prefix: tuple
+        :return: The damage, the time and the DPS of the prefix, or None if the prefix is illegal.
+        :rtype: tuple
+        """
+        simulation, legal = self.cache.get(prefix)
+        if not legal:
+            return None
+        damage = sum(simulation.write_damage)
+        time = get_end_time(simulation) - self.start_time
+        # at least one second, so a first step without a cast time doesn't get an infinite DPS
+        return damage, time, damage / max(time, 1)
+
+    def search(self, time_budget, beam_width=10, top_n=5, max_steps=200):
+        """
+        Search the rotations with the highest DPS that last at least the time budget.
+
+        :param time_budget: The length of the rotations in seconds.
+        :type time_budget: float
+        :param beam_width: The amount of prefixes that are extended at every step, defaults to 10.
+        :type beam_width: int, optional
+        :param top_n: The amount of rotations to return, defaults to 5.
+        :type top_n: int, optional
+        :param max_steps: The maximum amount of steps of a rotation, defaults to 200.
+        :type max_steps: int, optional
+        :return: The best rotations, ordered by their DPS, as dictionaries with the keys Rotation, Damage, Time and DPS.
+        :rtype: list
+        """
+        beam = [()]
+        finished = []
+        for _ in range(max_steps):
+            candidates = []
+            for prefix in beam:
+                for step in self.get_steps(prefix):
+                    child = prefix + (step,)
+                    values = self.evaluate(child)
+                    if values is None:
+                        continue
+                    if values[1] >= time_budget:
+                        finished.append((values, child))
+                    else:
+                        candidates.append((values, child))
+            if not candidates:
+                break
+            beam = [child for _, child in heapq.nlargest(beam_width, candidates, key=lambda candidate: candidate[0][2])]
+        logger.debug(f"Rotation search done, {self.cache.misses} prefixes simulated and {self.cache.hits} reused")
+
+        finished.sort(key=lambda candidate: candidate[0][2], reverse=True)
+        return [
+            {"Rotation": list(rotation), "Damage": damage, "Time": time, "DPS": dps}
+            for (damage, time, dps), rotation in finished[:top_n]]
+
+def search_rotation(lineup, settings, time_budget, beam_width=10, top_n=5, skill_pool=None, start_time=0.0, game_data=None):
+    """
+    Search the rotations of a character lineup with the highest DPS over a time budget.
+
+    :param lineup: The three characters of the lineup, as dictionaries with the column names of the
+        CharacterLineup table as keys.
+    :type lineup: list
+    :param settings: The settings, as a dictionary with the column names of the Settings table as keys.
+    :type settings: dict
+    :param time_budget: The length of the rotations in seconds.
+    :type time_budget: float
+    :param beam_width: The amount of prefixes that are extended at every step, defaults to 10.
+    :type beam_width: int, optional
+    :param top_n: The amount of rotations to return, defaults to 5.
+    :type top_n: int, optional
+    :param skill_pool: The skills each character may use, defaults to all of their skills.
+    :type skill_pool: dict, optional
+    :param start_time: The in-game time of the first rotation step, defaults to 0.0.
+    :type start_time: float, optional
+    :param game_data: The reference data to use, defaults to the shared snapshot.
+    :type game_data: GameData, optional
+    :return: The best rotations, ordered by their DPS, as dictionaries with the keys Rotation, Damage, Time and DPS.
+    :rtype: list
+    :raises IncompleteInputError: If the lineup is incomplete.
+    """
+    return RotationSearch(lineup, settings, skill_pool, start_time, game_data).search(time_budget, beam_width, top_n)
@@ -0,0 +1,1742 @@
+"""
+Simulation
+==========
+
+by @HikariTenshi
+original script by @Maygi
+
+This module simulates a rotation of a character lineup and calculates the damage,
+buffs, dynamic conditions and DPS values of every rotation step. It only reads the
+reference data from the constants and character databases and has no dependency
+on the GUI or the calculator database, so it can be called headlessly:
+
+>>> result = simulate(lineup, rotation, settings)
+>>> result.dps_2_mins
+"""
+
+import logging
+import math
+from copy import deepcopy
+from functools import cmp_to_key
+from utils import instrumentation
+from utils.expand_list import set_value_at_index, add_to_list
+from engine.game_data import get_game_data, get_skill_level_multiplier, get_weapons, get_echoes, get_weapon_buff_data, get_echo_buff_data, get_table_config, get_active_char_rows, get_active_effect_rows, row_to_active_skill_object
+from engine.buff_map import Stat, BuffMap
+from engine.buffs import create_echo_buff, row_to_weapon_buff, create_active_buff, create_active_stacking_buff, row_to_active_effect_object, compare_buffs, filter_team_buffs, update_total_buff_map
+from engine.damage import PassiveDamage, handle_energy_share, get_damage_multiplier_factors, get_damage_multiplier, update_damage
+from engine.substats import SubstatSensitivity
+from engine import trace
+from config.constants import logger, CALCULATOR_DB_PATH
+
+logger = logging.getLogger(__name__)
+
+# globals
+jinhsi_outro_active = False
+rythmic_vibrato = 0
+
+LINEUP_COLUMNS = list(get_table_config(CALCULATOR_DB_PATH, "CharacterLineup")["db_columns"].keys())
+
+# The columns of the CharacterLineup table that only change the stats of a character, not the buffs, procs or energy of the rotation
+LINEUP_STAT_COLUMNS = [
+    "Attack", 
+    "AttackPercent", 
+    "Health", 
+    "HealthPercent", 
+    "Defense", 
+    "DefensePercent", 
+    "CritRate", 
+    "CritDamage", 
+    "AvgHP", 
+    "NormalBonus", 
+    "HeavyBonus", 
+    "SkillBonus", 
+    "LiberationBonus"
+]
+
+# The flat stats of the lineup, they are part of the total buff map of every step
+FLAT_STATS = {
+    "flat_attack": Stat.FLAT_ATTACK,
+    "flat_health": Stat.FLAT_HEALTH,
+    "flat_defense": Stat.FLAT_DEFENSE
+}
+
+# Data for stat analysis
+STAT_CHECK_MAP = {
+    "attack": 0.086,
+    "health": 0.086,
+    "defense": 0.109,
+    "crit_rate": 0.081,
+    "crit_dmg": 0.162,
+    "normal": 0.086,
+    "heavy": 0.086,
+    "skill": 0.086,
+    "liberation": 0.086,
+    "flat_attack": 40
+}
+
+# The amount of rotation steps between two checkpoints of the simulation cache
+CHECKPOINT_INTERVAL = 20
+
+class IncompleteInputError(Exception):
+    """
+    Exception raised when the lineup or the rotation is incomplete and no calculation can be performed.
+
+    :param message: A message describing what is missing.
+    :type message: str
+    """
+
+def get_dps(opener_damage, opener_time, loop_damage, final_time):
+    """
+    Calculate the DPS of a rotation from the damage of its opener and its loop.
+
+    :param opener_damage: The damage dealt before the main DPS executes their outro for the first time.
+    :type opener_damage: float
+    :param opener_time: The in-game time the opener ends at.
+    :type opener_time: float
+    :param loop_damage: The damage dealt after the opener.
+    :type loop_damage: float
+    :param final_time: The in-game time of the last rotation step.
+    :type final_time: float
+    :return: The opener DPS, the loop DPS and the DPS over 2 minutes of repeating the loop.
+    :rtype: tuple
+    """
+    opener_dps = opener_damage / opener_time if opener_time > 0 else 0
+    loop_dps = loop_damage / (final_time - opener_time)
+    w_dps_loop_time = 120 - opener_time
+    w_dps_loops = w_dps_loop_time / (final_time - opener_time)
+    return opener_dps, loop_dps, (opener_damage + loop_damage * w_dps_loops) / 120
+
+class SimulationResult:
+    """
+    The results of a simulated rotation.
+
+    The per-row lists are ordered like the rotation and correspond to the result columns
+    of the RotationBuilder table, the remaining values correspond to the TotalDamage,
+    NextSubstatValue and EnergyCalculation tables.
+
+    :param characters: The names of the characters in the lineup.
+    :type characters: list
+    :param in_game_times: The in-game time of every rotation step, including the time delays.
+    :type in_game_times: list
+    :param time_delays: The time delay that was added to every rotation step, or None if there was none.
+    :type time_delays: list
+    :param resonance: The formatted resonance energy of the active character after every step.
+    :type resonance: list
+    :param concerto: The formatted concerto energy of the active character after every step.
+    :type concerto: list
+    :param local_buffs: The description of the active personal buffs of every step.
+    :type local_buffs: list
+    :param global_buffs: The description of the active team buffs of every step.
+    :type global_buffs: list
+    :param stats: The first 25 values of the total buff map of every step.
+    :type stats: list
+    :param damage: The damage of every step, including the passive damage procced on it.
+    :type damage: list
+    :param damage_notes: The passive damage note of every step, or an empty string if there is none.
+    :type damage_notes: list
+    :param cell_notes: The notes to place on the cells of the rotation, as dictionaries with the keys
+        "column_name", "row", "note" and "font_color".
+    :type cell_notes: list
+    :param opener_damage: The damage dealt before the main DPS executes their outro for the first time.
+    :type opener_damage: float
+    :param opener_time: The in-game time the opener ends at.
+    :type opener_time: float
+    :param loop_damage: The damage dealt after the opener.
+    :type loop_damage: float
+    :param final_time: The in-game time of the last rotation step.
+    :type final_time: float
+    :param total_swaps: The amount of character swaps in the rotation.
+    :type total_swaps: int
+    :param total_damage_map: The damage dealt per damage type.
+    :type total_damage_map: dict
+    :param character_damage: The damage dealt in the rotation steps of each character.
+    :type character_damage: dict
+    :param substat_gains: The relative damage gain of an additional substat roll per stat for each character,
+        or None for characters without any damage.
+    :type substat_gains: dict
+    :param initial_d_cond: The dynamic conditions each character needs to start the rotation with.
+    :type initial_d_cond: dict
+    :param final_d_cond: The dynamic conditions each character ends the rotation with.
+    :type final_d_cond: dict
+    """
+    def __init__(self, characters, in_game_times, time_delays, resonance, concerto, local_buffs, global_buffs, stats, damage, damage_notes, cell_notes, opener_damage, opener_time, loop_damage, final_time, total_swaps, total_damage_map, character_damage, substat_gains, initial_d_cond, final_d_cond):
+        self.characters = characters
+        self.in_game_times = in_game_times
+        self.time_delays = time_delays
+        self.resonance = resonance
+        self.concerto = concerto
+        self.local_buffs = local_buffs
+        self.global_buffs = global_buffs
+        self.stats = stats
+        self.damage = damage
+        self.damage_notes = damage_notes
+        self.cell_notes = cell_notes
+        self.opener_damage = opener_damage
+        self.opener_time = opener_time
+        self.loop_damage = loop_damage
+        self.final_time = final_time
+        self.total_swaps = total_swaps
+        self.total_damage_map = total_damage_map
+        self.character_damage = character_damage
+        self.substat_gains = substat_gains
+        self.initial_d_cond = initial_d_cond
+        self.final_d_cond = final_d_cond
+
+    def __repr__(self):
+        return (f"SimulationResult(characters={self.characters!r}, opener_dps={self.opener_dps}, "
+                f"loop_dps={self.loop_dps}, dps_2_mins={self.dps_2_mins})")
+
+    @property
+    def opener_dps(self):
+        return get_dps(self.opener_damage, self.opener_time, self.loop_damage, self.final_time)[0]
+
+    @property
+    def loop_dps(self):
+        return get_dps(self.opener_damage, self.opener_time, self.loop_damage, self.final_time)[1]
+
+    @property
+    def dps_2_mins(self):
+        return get_dps(self.opener_damage, self.opener_time, self.loop_damage, self.final_time)[2]
+
+    @property
+    def complexity(self):
+        return self.total_swaps + (len(self.in_game_times) - 1) / (self.final_time / 60)
+
+def character_weapon(p_weapon, p_level_cap, p_rank, weapon_multipliers):
+    """
+    Create a character weapon dictionary.
+
+    :param p_weapon: The weapon information.
+    :type p_weapon: dict
+    :param p_level_cap: The level cap of the weapon.
+    :type p_level_cap: int
+    :param p_rank: The rank of the weapon.
+    :type p_rank: int
+    :param weapon_multipliers: The weapon multipliers with levels as keys.
+    :type weapon_multipliers: dict
+    :return: A dictionary representing the character weapon.
+    :rtype: dict
+    """
+    return {
+        "weapon": p_weapon,
+        "attack": p_weapon["base_attack"] * weapon_multipliers[p_level_cap][0],
+        "main_stat": p_weapon["base_main_stat"],
+        "main_stat_amount": p_weapon["base_main_stat_amount"] * weapon_multipliers[p_level_cap][1],
+        "rank": p_rank - 1
+    }
+
+# Gets the percentage bonus stats from the stats input.
+def get_bonus_stats(lineup):
+    # Stats order should correspond to the columns AttackPercent, HealthPercent, DefensePercent, EnergyRegen
+    stats_order = ["attack", "health", "defense", "energy_recharge"]
+    stats_columns = ["AttackPercent", "HealthPercent", "DefensePercent", "EnergyRegen"]
+
+    bonus_stats = {}
+
+    # Loop through each character row
+    for character_row in lineup:
+        # Loop through each stat column
+        stats = {stats_order[j]: character_row[stats_columns[j]] for j in range(len(stats_order))}
+        # Assign the stats object to the corresponding character
+        bonus_stats[character_row["Character"]] = stats
+
+    return bonus_stats
+
+def lineup_row_to_list(character_row):
+    """
+    Convert a character of the lineup into a row in the column order of the CharacterLineup table.
+
+    :param character_row: The character, with the CharacterLineup column names as keys.
+    :type character_row: dict
+    :return: The values of the character in the column order of the CharacterLineup table.
+    :rtype: list
+    """
+    return [character_row.get(column) for column in LINEUP_COLUMNS]
+
+def get_lineup_structure(lineup):
+    """
+    Get the values of a lineup that change the buffs, procs or energy of a rotation, i.e. all columns except the stat columns.
+
+    :param lineup: The characters, with the CharacterLineup column names as keys.
+    :type lineup: list
+    :return: The values of the non-stat columns of every character.
+    :rtype: tuple
+    """
+    return tuple(
+        tuple(character_row.get(column) for column in LINEUP_COLUMNS if column not in LINEUP_STAT_COLUMNS)
+        for character_row in lineup)
+
+def adjust_flat_stats(event, flat_deltas):
+    """
+    Apply a change of the flat stats of the lineup to the total buff map of a damage event.
+
+    :param event: The damage event, see Simulation.process_damage_event.
+    :type event: tuple
+    :param flat_deltas: The change of each flat stat in FLAT_STATS for every character.
+    :type flat_deltas: dict
+    :return: The event with a copy of its total buff map with the new flat stats, or the event itself if they didn't change.
+    :rtype: tuple
+    """
+    match event[0]:
+        case "proc":
+            character, index = event[2].owner, 3
+        case "skill":
+            character, index = event[5], 4
+        case _:
+            return event
+    deltas = flat_deltas[character]
+    if not any(deltas):
+        return event
+    total_buff_map = event[index].copy()
+    for stat, delta in zip(FLAT_STATS.values(), deltas):
+        total_buff_map.values[stat] += delta
+    return event[:index] + (total_buff_map,) + event[index + 1:]
+
+def update_bonus_stats(dict, key, value):
+    # Find the index of the element where the first item matches the key
+    for index, element in enumerate(dict):
+        if element[0] == key:
+            # Update the value at the found index
+            dict[index][1] += value
+            return  # Exit after updating to prevent unnecessary iterations
+
+def row_to_character_info(row, level_cap, weapon_data, start_full_reso, game_data):
+    # Map bonus names to their corresponding row values
+    bonus_stats_dict = {
+        "flat_attack": row[6],
+        "flat_health": row[8],
+        "flat_defense": row[10],
+        "crit_rate": 0,
+        "crit_dmg": 0,
+        "normal": 0,
+        "heavy": 0,
+        "skill": 0,
+        "liberation": 0,
+        "physical": 0,
+        "glacio": 0,
+        "fusion": 0,
+        "electro": 0,
+        "aero": 0,
+        "spectro": 0,
+        "havoc": 0
+    }
+    logger.debug(row)
+
+    crit_rate_base = min(row[12] + 0.05, 1)
+    crit_dmg_base = row[13] + 1.5
+    crit_rate_base_weapon = 0
+    crit_dmg_base_weapon = 0
+    build = row[5]
+    char_element = game_data.char_constants[row[0]]["element"]
+
+    character_name = row[0]
+
+    match weapon_data[character_name]["main_stat"]:
+        case "crit_rate":
+            crit_rate_base_weapon += weapon_data[character_name]["main_stat_amount"]
+        case "crit_dmg":
+            crit_dmg_base_weapon += weapon_data[character_name]["main_stat_amount"]
+    crit_rate_conditional = 0
+    if character_name == "Changli" and row[1] >= 2:
+        crit_rate_conditional = 0.25
+    match build:
+        case "43311 (ER/ER)":
+            update_bonus_stats(bonus_stats_dict, "flat_attack", 350)
+            update_bonus_stats(bonus_stats_dict, "flat_health", 2280 * 2)
+            bonus_stats_dict["attack"] = 0.18 * 2
+            bonus_stats_dict["energy_regen"] = 0.32 * 2
+            if (
+                crit_rate_base + crit_rate_base_weapon + crit_rate_conditional
+            ) * 2 < (crit_dmg_base + crit_dmg_base_weapon) - 1:
+                crit_rate_base += 0.22
+            else:
+                crit_dmg_base += 0.44
+        case "43311 (Ele/Ele)":
+            update_bonus_stats(bonus_stats_dict, "flat_attack", 350)
+            update_bonus_stats(bonus_stats_dict, "flat_health", 2280 * 2)
+            char_element_value = next((element[1] for element in bonus_stats_dict if element[0] == char_element), 0)
+            update_bonus_stats(bonus_stats_dict, char_element, 0.6 - char_element_value)
+            bonus_stats_dict["attack"] = 0.18 * 2
+            if (
+                crit_rate_base + crit_rate_base_weapon + crit_rate_conditional
+            ) * 2 < (crit_dmg_base + crit_dmg_base_weapon) - 1:
+                crit_rate_base += 0.22
+            else:
+                crit_dmg_base += 0.44
+        case "43311 (Ele/Atk)":
+            update_bonus_stats(bonus_stats_dict, "flat_attack", 350)
+            update_bonus_stats(bonus_stats_dict, "flat_health", 2280 * 2)
+            char_element_value = next((element[1] for element in bonus_stats_dict if element[0] == char_element), 0)
+            update_bonus_stats(bonus_stats_dict, char_element, 0.3 - char_element_value)
+            bonus_stats_dict["attack"] = 0.18 * 2 + 0.3
+            if (
+                crit_rate_base + crit_rate_base_weapon + crit_rate_conditional
+            ) * 2 < (crit_dmg_base + crit_dmg_base_weapon) - 1:
+                crit_rate_base += 0.22
+            else:
+                crit_dmg_base += 0.44
+        case "43311 (Atk/Atk)":
+            update_bonus_stats(bonus_stats_dict, "flat_attack", 350)
+            update_bonus_stats(bonus_stats_dict, "flat_health", 2280 * 2)
+            bonus_stats_dict["attack"] = 0.18 * 2 + 0.6
+            if (
+                crit_rate_base + crit_rate_base_weapon + crit_rate_conditional
+            ) * 2 < (crit_dmg_base + crit_dmg_base_weapon) - 1:
+                crit_rate_base += 0.22
+            else:
+                crit_dmg_base += 0.44
+        case "44111 (Adaptive)":
+            update_bonus_stats(bonus_stats_dict, "flat_attack", 300)
+            update_bonus_stats(bonus_stats_dict, "flat_health", 2280 * 3)
+            bonus_stats_dict["attack"] = 0.18 * 3
+            for _ in range(2):
+                logger.debug(
+                    f'crit rate base: {crit_rate_base_weapon}; crit rate conditional: '
+                    f'{crit_rate_conditional}; crit dmg base: {crit_dmg_base_weapon}'
+                )
+                if (
+                    crit_rate_base + crit_rate_base_weapon + crit_rate_conditional
+                ) * 2 < (crit_dmg_base + crit_dmg_base_weapon) - 1:
+                    crit_rate_base += 0.22
+                else:
+                    crit_dmg_base += 0.44
+    logger.debug(f'minor fortes: {game_data.char_constants[row[0]]["minor_forte1"]}, {game_data.char_constants[row[0]]["minor_forte2"]}; level cap: {level_cap}')
+    for stat_array in bonus_stats_dict:
+        if game_data.char_constants[row[0]]["minor_forte1"] == stat_array[0]: # unlocks at rank 2/4, aka lv50/70
+            if level_cap >= 70:
+                stat_array[1] += 0.084 * (2 / 3 if game_data.char_constants[row[0]]["minor_forte1"] == "crit_rate" else 1)
+            if level_cap >= 50:
+                stat_array[1] += 0.036 * (2 / 3 if game_data.char_constants[row[0]]["minor_forte1"] == "crit_rate" else 1)
+        if game_data.char_constants[row[0]]["minor_forte2"] == stat_array[0]: # unlocks at rank 3/5, aka lv60/80
+            if level_cap >= 80:
+                stat_array[1] += 0.084 * (2 / 3 if game_data.char_constants[row[0]]["minor_forte2"] == "crit_rate" else 1)
+            if level_cap >= 60:
+                stat_array[1] += 0.036 * (2 / 3 if game_data.char_constants[row[0]]["minor_forte2"] == "crit_rate" else 1)
+    logger.debug(f'build was: {build}; bonus stats array:')
+    logger.debug(bonus_stats_dict)
+
+    return {
+        "name": row[0],
+        "resonance_chain": row[1],
+        "weapon": row[2],
+        "weapon_rank": row[3],
+        "echo": row[4],
+        "attack": game_data.char_constants[row[0]]["base_attack"] * game_data.weapon_multipliers[level_cap][0],
+        "health": game_data.char_constants[row[0]]["base_health"] * game_data.weapon_multipliers[level_cap][0],
+        "defense": game_data.char_constants[row[0]]["base_def"] * game_data.weapon_multipliers[level_cap][0],
+        "crit_rate": crit_rate_base,
+        "crit_dmg": crit_dmg_base,
+        "bonus_stats": bonus_stats_dict,
+        "d_cond": {
+            "forte": 0,
+            "concerto": 0,
+            "resonance": 200 if start_full_reso else 0
+        }
+    }
+
+# Loads skills from the rows of the "ActiveChar" table.
+def get_skills(active_char_rows):
+    # filter rows where the first cell is not empty
+    filtered_values = [row for row in active_char_rows if row[0].strip() != ""] # Ensure that the name is not empty
+
+    return [row_to_active_skill_object(row) for row in filtered_values]
+
+def get_active_effects(active_effect_rows, skill_data):
+    return [row_to_active_effect_object(row, skill_data) for row in active_effect_rows if row_to_active_effect_object(row, skill_data) is not None]
+
+
+# Extracts the skill reference from the skillData object provided, with the name of the current character.
+# Skill data objects have a (Character) name at the end of them to avoid duplicates. Jk, now they don't, but all names MUST be unique.
+def get_skill_reference(skill_data, name, character):
+    return skill_data[name] # + " (" + character + ")"
+
+def filter_active_buffs(active_buff, swapped, current_time, buffs_to_remove):
+    global jinhsi_outro_active
+    end_time = (
+        active_buff.stack_time if active_buff.buff.type == "stacking_buff" 
+        else active_buff.start_time
+    ) + active_buff.buff.duration
+    if active_buff.buff.type == "buff_until_swap" and swapped:
+        if trace.recorder is not None:
+            trace.recorder.record("buff_expired", current_time, active_buff.buff.applies_to, name=active_buff.buff.name, reason="swap")
+        return False
+    if "Off-Field" in active_buff.buff.name:
+        if trace.recorder is not None:
+            trace.recorder.record("buff_expired", current_time, active_buff.buff.applies_to, name=active_buff.buff.name, reason="off-field")
+        return False
+    if current_time > end_time and active_buff.buff.name == "Outro: Temporal Bender":
+        jinhsi_outro_active = False
+    if current_time > end_time and active_buff.buff.type == "reset_buff":
+        buffs_to_remove.append(active_buff.buff.classifications)
+    if current_time > end_time and trace.recorder is not None:
+        trace.recorder.record("buff_expired", current_time, active_buff.buff.applies_to, name=active_buff.buff.name, reason="duration", end_time=end_time)
+    return current_time <= end_time  # Keep the buff if the current time is less than or equal to the end time
+
+
+def add_cell_note(cell_notes, column_name, row, note, font_color=None):
+    """
+    Add a note for a cell of the rotation to the list of cell notes.
+
+    :param cell_notes: The list of cell notes to add the note to.
+    :type cell_notes: list
+    :param column_name: The name of the column of the cell.
+    :type column_name: str
+    :param row: The index of the row of the cell.
+    :type row: int
+    :param note: The note to place on the cell.
+    :type note: str
+    :param font_color: The font color of the cell, defaults to None.
+    :type font_color: str, optional
+    """
+    cell_notes.append({
+        "column_name": column_name,
+        "row": row,
+        "note": note,
+        "font_color": font_color
+    })
+
+def evaluate_d_cond(value, condition, i, active_character, characters, char_data, weapon_data, bonus_stats, buff_names, skill_ref, initial_d_cond, total_buff_map, cell_notes, char_constants):
+    if value and value != 0:
+        if value < 0:
+            if active_character == "Jinhsi" and condition == "Concerto" and "Unison" in buff_names:
+                add_cell_note(
+                    cell_notes, "Skill", i, 
+                    note="The Unison condition has covered the Concerto cost for this Outro.")
+            else:
+                ignore_condition = False
+                if char_data[active_character]["d_cond"][condition] + value < 0: # ILLEGAL INPUT
+                    if condition == "Resonance":
+                        # Determine main stat amount if it is "Energy Regen"
+                        main_stat_amount = (
+                            weapon_data[active_character]["main_stat_amount"] if weapon_data[active_character]["main_stat"] == "Energy Regen" else 0
+                        )
+                        # Get the energy recharge from bonus stats
+                        bonus_energy_recharge = bonus_stats[active_character]["energy_recharge"]
+                        # Find the additional energy recharge from character data's bonus stats
+                        additional_energy_recharge = next(
+                            (amount for stat, amount in char_data[active_character]["bonus_stats"] if stat == "Energy Regen"), 0
+                        )
+                        # Calculate the total energy recharge
+                        energy_recharge = main_stat_amount + bonus_energy_recharge + additional_energy_recharge
+                        base_energy = char_data[active_character]["d_cond"][condition] / (1 + energy_recharge)
+                        required_recharge = ((value * -1) / base_energy - energy_recharge - 1) * 100
+                        add_cell_note(
+                            cell_notes, "Skill", i, 
+                            note=f'Illegal rotation! At this point, you have {char_data[active_character]["d_cond"][condition]:.2f} out of the required {(value * -1)} {condition} (Requires an additional {required_recharge:.1f}% ER)', 
+                            font_color="#FF0000")
+                    else:
+                        if active_character == "Jiyan" and "Windqueller" in skill_ref["name"] or active_character == "Zhezhi" and "Depiction" in skill_ref["name"]:
+                            ignore_condition = True
+                        if not ignore_condition:
+                            add_cell_note(
+                                cell_notes, "Skill", i, 
+                                note=f'Illegal rotation! At this point, you have {char_data[active_character]["d_cond"][condition]:.2f} out of the required {(value * -1)} {condition}', 
+                                font_color="#FF0000")
+                    if not ignore_condition:
+                        initial_d_cond[active_character][condition] = (value * -1) - char_data[active_character]["d_cond"][condition]
+                else:
+                    add_cell_note(
+                        cell_notes, "Skill", i, 
+                        note=f'At this point, you have generated {char_data[active_character]["d_cond"][condition]:.2f} out of the required {(value * -1)} {condition}')
+                if not ignore_condition:
+                    if active_character == "Danjin" or skill_ref["name"].startswith("Outro") or skill_ref["name"].startswith("Liberation"):
+                        char_data[active_character]["d_cond"][condition] = 0; # consume all
+                    elif active_character == "Jiyan" and "Qingloong Mode" in buff_names and "Windqueller" in skill_ref["name"]: # increase skill damage bonus for this action if forte was consumed, but only if ult is NOT active
+                        total_buff_map.values[Stat.SPECIFIC] += 0.2
+                    else: # adjust the dynamic condition as expected
+                        char_data[active_character]["d_cond"][condition] = max(0, char_data[active_character]["d_cond"][condition] + value)
+        else:
+            if not char_data[active_character]["d_cond"][condition]:
+                logger.debug("EH? NaN condition " + condition + " for character " + active_character)
+                char_data[active_character]["d_cond"][condition] = 0
+            if condition == "Resonance":
+                handle_energy_share(value, active_character, characters, char_data, weapon_data, bonus_stats)
+            else:
+                if condition == "Forte":
+                    char_data[active_character]["d_cond"][condition] = min(char_data[active_character]["d_cond"][condition] + value, char_constants[active_character]["max_forte"])
+                else:
+                    char_data[active_character]["d_cond"][condition] = char_data[active_character]["d_cond"][condition] + value
+        if trace.recorder is not None:
+            trace.recorder.record("d_cond", character=active_character, name=condition, value=value, result=char_data[active_character]["d_cond"][condition], skill=skill_ref["name"])
+
+# Process buff array
+def process_buffs(buffs, current_time, char_data, active_character, total_buff_map, skill_ref, available_in):
+    global rythmic_vibrato
+    for buff_wrapper in buffs:
+        buff = buff_wrapper.buff
+        if buff.name == "Rythmic Vibrato": # we don't re-poll buffs for passive damage instances currently so it needs to keep track of this lol
+            rythmic_vibrato = buff_wrapper.stacks
+
+        if buff.type == "buff_energy" and current_time >= available_in.get(buff, 0): # add energy instead of adding the buff
+            available_in[buff] = current_time + buff.stack_interval
+            char_data[active_character]["d_cond"][buff.buff_type] = float(char_data[active_character]["d_cond"][buff.buff_type]) + float(buff.amount) * max(float(buff_wrapper.stacks), 1)
+            if trace.recorder is not None:
+                trace.recorder.record("d_cond", current_time, active_character, name=buff.buff_type, value=float(buff.amount) * max(float(buff_wrapper.stacks), 1), result=char_data[active_character]["d_cond"][buff.buff_type], skill=buff.name)
+
+        nullify = False
+        if "Off-Field" in buff.name and ("Outro" not in skill_ref["name"] and "Swap" not in skill_ref["name"]):
+            nullify = True
+
+        if not nullify:
+            # special buff types are handled slightly differently
+            special_buff_types = ["Attack", "Health", "Defense", "Crit", "Crit Dmg"]
+            if buff.buff_type in special_buff_types:
+                update_total_buff_map(buff.buff_type, "", buff.amount * (buff_wrapper.stacks if buff.type == "stacking_buff" else 1), buff.amount * buff.stack_limit, total_buff_map, char_data, active_character, skill_ref)
+            else: # for other buffs, just use classifications as is
+                update_total_buff_map(buff.classifications, buff.buff_type, buff.amount * (buff_wrapper.stacks if buff.type == "stacking_buff" else 1), buff.amount * buff.stack_limit, total_buff_map, char_data, active_character, skill_ref)
+
+def write_buffs_to_sheet(buff_values, bonus_stats, char_data, active_character, write_stats):
+    values = buff_values[:]
+    values[Stat.ATTACK] += bonus_stats[active_character]["attack"]
+    values[Stat.HEALTH] += bonus_stats[active_character]["health"]
+    values[Stat.DEFENSE] += bonus_stats[active_character]["defense"]
+    values[Stat.CRIT_RATE] += char_data[active_character]["crit_rate"]
+    values[Stat.CRIT_DMG] += char_data[active_character]["crit_dmg"]
+    write_stats.append(values)
+
+def get_rotation_steps(rotation):
+    """
+    Get the steps of a rotation up to the first step without a skill, where the rotation ends.
+
+    :param rotation: The rotation steps as (character, skill) pairs.
+    :type rotation: list
+    :return: The steps as (character, skill) tuples.
+    :rtype: list
+    """
+    steps = []
+    for character, skill in rotation:
+        if not skill:
+            break
+        steps.append((character, skill))
+    return steps
+
+def get_skill_time(skill_ref):
+    """
+    Get the time a skill takes until the next skill of the rotation can be used.
+
+    :param skill_ref: The skill data.
+    :type skill_ref: dict
+    :return: The cast time of the skill without its freeze time.
+    :rtype: float
+    """
+    return skill_ref["cast_time"] - skill_ref["freeze_time"]
+
+# Runs all the calculations for a rotation, step by step.
+# It's still basically the former 800 line method, just split into the setup, the rotation steps and the results.
+class Simulation:
+    def __init__(self, lineup, rotation, settings, start_time=0.0, game_data=None, checkpoint_interval=None):
+        global jinhsi_outro_active, rythmic_vibrato
+
+        if len(lineup) != 3 or any(not character_row.get("Character") or not character_row.get("Weapon") for character_row in lineup):
+            raise IncompleteInputError("no characters or weapons have been chosen")
+
+        self.game_data = game_data or get_game_data()
+        self.rotation = get_rotation_steps(rotation)
+        if len(self.rotation) == 0:
+            raise IncompleteInputError("the rotation is empty")
+        self.passive_damage_instances = []
+        self.weapon_data = {}
+        self.char_data = {}
+        self.sequences = {}
+        self.last_total_buff_map = {} # the last updated total buff maps for each character
+        self.queued_buffs = []
+        self.cell_notes = []
+
+        self.skill_level_multiplier = get_skill_level_multiplier(settings["SkillLevel"], self.game_data)
+
+        # The "Opener" damage is the total damage dealt before the first main DPS (first character) executes their Outro for the first time.
+        self.opener_damage = 0
+        self.opener_row = None
+        self.loop_damage = 0
+        self.mode = "opener"
+
+        jinhsi_outro_active = False
+        rythmic_vibrato = 0
+        # the values of the module level flags above after the last simulated step, see add_step
+        self.global_state = (jinhsi_outro_active, rythmic_vibrato)
+
+        # copies of the state before every checkpoint_interval-th step, by the index of the step, see resume
+        self.checkpoint_interval = checkpoint_interval
+        self.checkpoints = {}
+        self.next_row = 0
+
+        self.level_cap = settings["LevelCap"]
+        self.enemy_level = settings["EnemyLevel"]
+        self.res = settings["Resistance"]
+
+        self.char_entries = {}
+        self.total_damage_map = {
+            "normal": 0,
+            "heavy": 0,
+            "skill": 0,
+            "liberation": 0,
+            "intro": 0,
+            "outro": 0,
+            "echo": 0
+        }
+        self.damage_by_character = {}
+
+        lineup_rows = [lineup_row_to_list(character_row) for character_row in lineup]
+        self.characters = [row[0] for row in lineup_rows]
+        self.lineup_structure = get_lineup_structure(lineup)
+        self.substat_sensitivity = SubstatSensitivity(self.characters, STAT_CHECK_MAP)
+        start_full_reso = settings["TOABoolean"] in ("TRUE", True)
+        self.active_buffs = {}
+        self.write_buffs_personal = []
+        self.write_buffs_team = []
+        self.write_stats = []
+        self.write_resonance = []
+        self.write_concerto = []
+        self.write_damage = []
+        self.write_damage_note = []
+        self.damage_events = []
+
+        self.total_swaps = 0
+
+        self.active_buffs["team"] = []
+        for character in self.characters:
+            self.active_buffs[character] = []
+
+        self.last_seen = {}
+        self.initial_d_cond = {}
+        self.cooldown_map = {}
+
+        self.bonus_stats = get_bonus_stats(lineup)
+
+        for character in self.characters:
+            self.damage_by_character[character] = 0
+            self.char_entries[character] = 0
+
+        weapons = get_weapons(self.game_data)
+
+        # load echo data into the echo parameter
+        echoes = get_echoes(self.game_data)
+
+        for i, character in enumerate(self.characters):
+            row = lineup_rows[i]
+            self.weapon_data[character] = character_weapon(weapons[row[2]], self.level_cap, row[3], self.game_data.weapon_multipliers)
+            self.char_data[character] = row_to_character_info(row, self.level_cap, self.weapon_data, start_full_reso, self.game_data)
+            self.sequences[character] = self.char_data[character]["resonance_chain"]
+
+            echo_name = self.char_data[character]["echo"]
+            self.char_data[character]["echo"] = echoes[echo_name]
+            logger.debug(f'setting skill data for echo {echo_name}; echo cd is {self.char_data[character]["echo"]["cooldown"]}')
+            self.initial_d_cond[character] = {
+                "forte": 0,
+                "concerto": 0,
+                "resonance": 0
+            }
+            self.last_seen[character] = -1
+        # the flat stats the damage events are recorded with, see recalculate
+        self.recorded_flat_stats = {
+            character: [self.char_data[character]["bonus_stats"][stat] for stat in FLAT_STATS]
+            for character in self.characters}
+
+        load_start = instrumentation.start_timer()
+        self.skill_data = {}
+        effect_objects = get_skills(get_active_char_rows(self.characters, [row[4] for row in lineup_rows], self.game_data))
+        for effect in effect_objects:
+            self.skill_data[effect["name"]] = effect
+
+        # Outro buffs are special, and are saved to be applied to the NEXT character swapped into.
+        self.queued_buffs_for_next = []
+        self.last_character = None
+        self.available_in = {} # cooltime tracker for proc-based effects, by buff definition
+
+        all_buffs = get_active_effects(get_active_effect_rows(self.characters, self.game_data), self.skill_data) # retrieves all buffs "in play" from the inherent skills.
+
+        weapon_buff_data = get_weapon_buff_data(self.game_data)
+        echo_buff_data = get_echo_buff_data(self.game_data)
+
+        for i in range(3): # loop through characters and add buff data if applicable
+            for echo_buff in echo_buff_data:
+                if (self.char_data[self.characters[i]]["echo"]["name"] in echo_buff["name"] or 
+                self.char_data[self.characters[i]]["echo"]["echo_set"] in echo_buff["name"]):
+                    new_buff = create_echo_buff(echo_buff, self.characters[i])
+                    all_buffs.append(new_buff)
+                    logger.debug(f'adding echo buff {echo_buff["name"]} to {self.characters[i]}')
+                    logger.debug(new_buff)
+
+            for weapon_buff in weapon_buff_data:
+                if self.weapon_data[self.characters[i]]["weapon"]["buff"] in weapon_buff["name"]:
+                    new_buff = row_to_weapon_buff(weapon_buff, self.weapon_data[self.characters[i]]["rank"], self.characters[i])
+                    logger.debug(f'adding weapon buff {new_buff.name} to {self.characters[i]}')
+                    logger.debug(new_buff)
+                    all_buffs.append(new_buff)
+
+        # apply passive buffs
+        for i in range(len(all_buffs) - 1, -1, -1):
+            buff = all_buffs[i]
+            if buff.triggered_by == "Passive" and buff.duration == "Passive" and buff.special_condition is None:
+                match buff.type:
+                    case "stacking_buff":
+                        buff = all_buffs[i] = buff.replace(duration=9999)
+                        logger.debug(f'passive stacking buff {buff.name} applies to: {buff.applies_to}; stack interval aka starting stacks: {buff.stack_interval}')
+                        self.active_buffs[buff.applies_to].append(create_active_stacking_buff(buff, 0, min(buff.stack_interval, buff.stack_limit)))
+                    case "buff":
+                        buff = buff.replace(duration=9999)
+                        logger.debug(f'passive buff {buff.name} applies to: {buff.applies_to}')
+                        self.active_buffs[buff.applies_to].append(create_active_buff(buff, 0))
+                        logger.debug(f'adding passive buff : {buff.name} to {buff.applies_to}')
+
+                        all_buffs.pop(i) # remove passive buffs from the list afterwards
+
+        self.all_buffs = sorted(all_buffs, key=cmp_to_key(compare_buffs))
+        instrumentation.stop_timer("load_buffs", load_start)
+
+        # The in-game times without any time delays, the delays found while simulating are added on top
+        self.times = [start_time]
+        for character, skill in self.rotation[:-1]:
+            self.times.append(self.times[-1] + get_skill_time(get_skill_reference(self.skill_data, skill, character)))
+        self.time_delays = [None] * len(self.rotation)
+
+        self.live_time = 0
+        self.bonus_time_total = 0
+
+        # The buff names and total buff map of the previous step, they are used by dynamic conditions of buffs before they are updated
+        self.buff_names = None
+        self.total_buff_map = None
+
+    def run(self, progress_callback=None):
+        """
+        Simulate all steps of the rotation, or the remaining ones if the simulation was resumed from a checkpoint.
+
+        :param progress_callback: Called with the amount of simulated steps and the total amount of steps after every step.
+            It may raise an exception to stop the simulation, which is then propagated.
+        :type progress_callback: callable, optional
+        :return: The results of the simulation.
+        :rtype: SimulationResult
+        """
+        global jinhsi_outro_active, rythmic_vibrato
+        jinhsi_outro_active, rythmic_vibrato = self.global_state
+        first_row = self.next_row
+        loop_start = instrumentation.start_timer()
+        for i in range(first_row, len(self.rotation)):
+            if self.checkpoint_interval and i % self.checkpoint_interval == 0 and i not in self.checkpoints:
+                self.global_state = (jinhsi_outro_active, rythmic_vibrato)
+                with instrumentation.phase("checkpoints"):
+                    self.checkpoints[i] = deepcopy(self)
+            self.next_row = i + 1
+            if not self.process_row(i):
+                break
+            if progress_callback is not None:
+                progress_callback(i + 1, len(self.rotation))
+        instrumentation.stop_timer("row_loop", loop_start)
+        instrumentation.count("rows_simulated", self.next_row - first_row)
+        self.global_state = (jinhsi_outro_active, rythmic_vibrato)
+        logger.debug("===EXECUTION COMPLETE===")
+        with instrumentation.phase("results"):
+            return self.get_result()
+
+    def resume(self, rotation):
+        """
+        Prepare the simulation of a changed rotation, starting from the last checkpoint before the first changed step.
+
+        The steps before the checkpoint would be simulated exactly the same way again, so only the
+        remaining steps are simulated by run. The checkpoints are only valid as long as the lineup and
+        the settings stay the same.
+
+        :param rotation: The changed rotation steps as (character, skill) pairs.
+        :type rotation: list
+        :return: The simulation at the checkpoint, or None if there is no checkpoint before the first changed step.
+        :rtype: Simulation
+        """
+        rotation = get_rotation_steps(rotation)
+        first_changed = next(
+            (i for i, (old_step, new_step) in enumerate(zip(self.rotation, rotation)) if old_step != new_step), 
+            min(len(self.rotation), len(rotation)))
+        valid_checkpoints = {i: checkpoint for i, checkpoint in self.checkpoints.items() if i <= first_changed and i < len(rotation)}
+        if not valid_checkpoints:
+            return None
+        row = max(valid_checkpoints)
+        logger.debug(f"Resuming the simulation at row {row}, the first changed row is {first_changed}")
+
+        simulation = deepcopy(valid_checkpoints[row])
+        simulation.checkpoints = valid_checkpoints
+        simulation.rotation = rotation
+        simulation.times = simulation.times[:row + 1]
+        for character, skill in rotation[row:-1]:
+            simulation.times.append(simulation.times[-1] + get_skill_time(get_skill_reference(simulation.skill_data, skill, character)))
+        simulation.time_delays = simulation.time_delays[:row] + [None] * (len(rotation) - row)
+        return simulation
+
+    def __deepcopy__(self, memo):
+        """
+        Copy the state of the simulation, so a rotation can be continued in different ways.
+
+        The skill data is never changed after the setup and the damage events, cell notes and 
+        stats are never changed once they have been recorded, so these are shared with the copy. 
+        Only the passive damage of the proc events is copied, as it keeps changing while the rotation goes on.
+        """
+        instrumentation.count("deepcopies")
+        copy = Simulation.__new__(Simulation)
+        memo[id(self)] = copy
+        for name, value in self.__dict__.items():
+            if name == "skill_data":
+                copy.skill_data = value
+            elif name == "checkpoints":
+                copy.checkpoints = {}
+            elif name in ("cell_notes", "write_stats"):
+                setattr(copy, name, list(value))
+            elif name == "damage_events":
+                copy.damage_events = [
+                    event[:2] + (deepcopy(event[2], memo),) + event[3:] if event[0] == "proc" else event
+                    for event in value]
+            else:
+                setattr(copy, name, deepcopy(value, memo))
+        return copy
+
+    def clear_rotation(self):
+        """
+        Remove all steps from the rotation before any of them have been simulated,
+        so the rotation can be built step by step with add_step instead.
+        """
+        self.rotation = []
+        self.times = self.times[:1]
+        self.time_delays = []
+
+    def add_step(self, character, skill):
+        """
+        Append a step to the rotation and simulate it.
+
+        The module level flags are restored to the state of this simulation first, so copies of a
+        simulation can be continued independently of each other, e.g. by the rotation search.
+
+        :param character: The character that performs the skill.
+        :type character: str
+        :param skill: The name of the skill.
+        :type skill: str
+        :return: False if the step is illegal, i.e. the skill is on cooldown or its Forte, Concerto 
+            or Resonance requirement isn't met, True otherwise.
+        :rtype: bool
+        """
+        global jinhsi_outro_active, rythmic_vibrato
+        if self.rotation:
+            last_character, last_skill = self.rotation[-1]
+            self.times.append(self.times[-1] + get_skill_time(get_skill_reference(self.skill_data, last_skill, last_character)))
+        self.rotation.append((character, skill))
+        self.time_delays.append(None)
+        i = len(self.rotation) - 1
+        note_count = len(self.cell_notes)
+
+        jinhsi_outro_active, rythmic_vibrato = self.global_state
+        self.process_row(i)
+        self.global_state = (jinhsi_outro_active, rythmic_vibrato)
+        return not any(note["row"] == i and note["note"].startswith("Illegal rotation!") for note in self.cell_notes[note_count:])
+
+    def add_damage_event(self, event):
+        """
+        Record a damage event of the rotation and process it.
+
+        :param event: The damage event, see process_damage_event.
+        :type event: tuple
+        """
+        self.damage_events.append(event)
+        self.process_damage_event(event)
+
+    def process_damage_event(self, event):
+        """
+        Calculate the damage of a damage event and write it to the results.
+
+        The events contain everything the damage calculation needs that doesn't depend on the stats
+        of the lineup, so they can be processed again after only the stats have changed. An event is one of
+
+        - ("stats", values, active_character): the buffs of a rotation step, written to the stats.
+        - ("buff", i): a rotation step that doesn't deal damage.
+        - ("proc", i, passive_damage, total_buff_map, proc_multiplier, num_procs, procs, bonus_attack, extra_multiplier): 
+          a passive damage that procced on rotation step i.
+        - ("skill", i, skill_ref, damage, total_buff_map, active_character, mode, passive_current_slot): the damage of rotation step i.
+
+        :param event: The damage event.
+        :type event: tuple
+        """
+        char_data = self.char_data
+        weapon_data = self.weapon_data
+        bonus_stats = self.bonus_stats
+        match event[0]:
+            case "stats":
+                _, values, active_character = event
+                write_buffs_to_sheet(values, bonus_stats, char_data, active_character, self.write_stats)
+            case "buff":
+                set_value_at_index(self.write_damage, event[1], 0)
+            case "proc":
+                _, i, passive_damage, total_buff_map, proc_multiplier, num_procs, procs, bonus_attack, extra_multiplier = event
+                passive_damage.total_buff_map = total_buff_map
+                passive_damage.proc_multiplier = proc_multiplier
+                passive_damage.num_procs = num_procs
+                damage_proc = passive_damage.calculate_proc(char_data, weapon_data, bonus_stats, bonus_attack, extra_multiplier, self.level_cap, self.enemy_level, self.res, self.skill_level_multiplier, self.opener_damage, self.loop_damage, self.char_entries, self.damage_by_character, self.substat_sensitivity, self.total_damage_map) * procs
+                if passive_damage.slot == i:
+                    set_value_at_index(self.write_damage, passive_damage.slot, damage_proc)
+                else:
+                    add_to_list(self.write_damage, passive_damage.slot, damage_proc)
+                set_value_at_index(self.write_damage_note, passive_damage.slot, passive_damage.get_note(self.skill_level_multiplier))
+            case "skill":
+                _, i, skill_ref, damage, total_buff_map, active_character, mode, passive_current_slot = event
+                stats = total_buff_map.values
+                attack = (char_data[active_character]["attack"] + weapon_data[active_character]["attack"]) * (1 + stats[Stat.ATTACK] + bonus_stats[active_character]["attack"]) + stats[Stat.FLAT_ATTACK]
+                health = char_data[active_character]["health"] * (1 + stats[Stat.HEALTH] + bonus_stats[active_character]["health"]) + stats[Stat.FLAT_HEALTH]
+                defense = char_data[active_character]["defense"] * (1 + stats[Stat.DEFENSE] + bonus_stats[active_character]["defense"]) + stats[Stat.FLAT_DEFENSE]
+                crit_multiplier = (1 - min(1,(char_data[active_character]["crit_rate"] + stats[Stat.CRIT_RATE]))) * 1 + min(1,(char_data[active_character]["crit_rate"] + stats[Stat.CRIT_RATE])) * (char_data[active_character]["crit_dmg"] + stats[Stat.CRIT_DMG])
+                damage_factors = get_damage_multiplier_factors(skill_ref["classifications"], total_buff_map, self.level_cap, self.enemy_level, self.res)
+                damage_multiplier = get_damage_multiplier(skill_ref["classifications"], total_buff_map, self.level_cap, self.enemy_level, self.res, damage_factors)
+                scale_factor = defense if "Df" in skill_ref["classifications"] else (health if "Hp" in skill_ref["classifications"] else attack)
+                total_damage = damage * scale_factor * crit_multiplier * damage_multiplier * (0 if weapon_data[active_character]["weapon"]["name"] == "Nullify Damage" else 1)
+                if trace.recorder is not None:
+                    trace.recorder.record(
+                        "damage", character=active_character, row=i, name=skill_ref["name"], damage=damage, total_damage=total_damage, 
+                        attack=attack, health=health, defense=defense, crit_multiplier=crit_multiplier, damage_multiplier=damage_multiplier, mode=mode)
+                if passive_current_slot:
+                    add_to_list(self.write_damage, len(self.write_damage) - 1, total_damage)
+                else:
+                    self.write_damage.append(total_damage)
+                self.write_damage_note.append("")
+
+                update_start = instrumentation.start_timer()
+                self.opener_damage, self.loop_damage = update_damage(
+                    name=skill_ref["name"], 
+                    classifications=skill_ref["classifications"], 
+                    active_character=active_character, 
+                    damage=damage, 
+                    total_damage=total_damage, 
+                    total_buff_map=total_buff_map, 
+                    char_entries=self.char_entries, 
+                    damage_by_character=self.damage_by_character, 
+                    mode=mode, 
+                    opener_damage=self.opener_damage, 
+                    loop_damage=self.loop_damage, 
+                    char_data=char_data, 
+                    weapon_data=weapon_data, 
+                    bonus_stats=bonus_stats, 
+                    level_cap=self.level_cap, 
+                    enemy_level=self.enemy_level, 
+                    res=self.res, 
+                    substat_sensitivity=self.substat_sensitivity, 
+                    total_damage_map=self.total_damage_map, 
+                    damage_factors=damage_factors)
+                instrumentation.stop_timer("update_damage", update_start)
+
+    def copy_queued_buff(self, queued_buff, applies_to):
+        """
+        Copy a queued buff into a new active buff for the character it applies to.
+
+        The copy gets its own buff definition, so its cooltime is tracked separately from the queued buff.
+
+        :param queued_buff: The queued buff to copy.
+        :type queued_buff: ActiveBuff
+        :param applies_to: The character the copy applies to, or Team in the case of a team buff.
+        :type applies_to: str
+        :return: The copied active buff.
+        :rtype: ActiveBuff
+        """
+        buff = queued_buff.buff.replace(applies_to=applies_to)
+        if queued_buff.buff in self.available_in:
+            self.available_in[buff] = self.available_in[queued_buff.buff]
+        return queued_buff.copy(buff)
+
+    def process_row(self, i):
+        """
+        Simulate a single step of the rotation.
+
+        :param i: The index of the rotation step.
+        :type i: int
+        :return: False if the rotation ends at this step, True otherwise.
+        :rtype: bool
+        """
+        global jinhsi_outro_active
+
+        char_data = self.char_data
+        active_buffs = self.active_buffs
+        swapped = False
+        heal_found = False
+        remove_buff = None
+        remove_buff_instant = []
+        passive_damage_queue = []
+        passive_damage_queued = None
+        active_character, current_skill = self.rotation[i] # the current skill
+        bonus_time_current = 0
+        current_time = self.times[i] + self.bonus_time_total
+        recorder = trace.recorder
+
+        if self.last_character is not None and active_character != self.last_character: # a swap was performed
+            swapped = True
+            self.total_swaps += 1
+        skill_ref = get_skill_reference(self.skill_data, current_skill, active_character)
+        if recorder is not None:
+            recorder.start_row(i, current_time, active_character, current_skill, skill_ref["cast_time"])
+        if swapped and (current_time - self.last_seen[active_character]) < 1 and not (skill_ref["name"].startswith("Intro") or skill_ref["name"].startswith("Outro")): # add swap-in time
+            extra_to_add = 1 - (current_time - self.last_seen[active_character])
+            if recorder is not None:
+                recorder.record("swap_delay", current_time, active_character, last_seen=self.last_seen[active_character], delay=extra_to_add)
+            self.time_delays[i] = extra_to_add
+            self.bonus_time_total += extra_to_add
+            bonus_time_current += extra_to_add
+        if len(current_skill) == 0:
+            return False
+        self.last_seen[active_character] = current_time + skill_ref["cast_time"] - skill_ref["freeze_time"]
+        classification = skill_ref["classifications"]
+        if "Temporal Bender" in skill_ref["name"]:
+            jinhsi_outro_active = True; # just for the sake of saving some runtime so we don't have to loop through buffs or passive effects...
+        if "Liberation" in skill_ref["name"]: # reset swap-back timers
+            for character in self.characters:
+                self.last_seen[character] = -1
+
+        if skill_ref["cooldown"] > 0:
+            skill_name = skill_ref["name"].split(" (")[0]
+            max_charges = skill_ref.get("max_charges", 1)
+            if skill_name not in self.cooldown_map:
+                self.cooldown_map[skill_name] = {
+                    "next_valid_time": current_time,
+                    "charges": max_charges,
+                    "last_used_time": current_time
+                }
+            skill_track = self.cooldown_map.get(skill_name)
+            elapsed = current_time - skill_track["last_used_time"]
+            restored_charges = min(
+                elapsed // skill_ref["cooldown"],
+                max_charges - skill_track["charges"]
+            )
+            skill_track["charges"] += restored_charges
+            if restored_charges > 0:
+                skill_track["last_used_time"] += restored_charges * skill_ref["cooldown"]
+            skill_track["next_valid_time"] = skill_track["last_used_time"] + skill_ref["cooldown"]
+
+            if skill_track["charges"] > 0:
+                if skill_track["charges"] == max_charges: # only update the timer when you're at max stacks to start regenerating the charge
+                    skill_track["last_used_time"] = current_time
+                skill_track["charges"] -= 1
+                self.cooldown_map[skill_name] = skill_track
+            else:
+                next_valid_time = skill_track["next_valid_time"]
+                if recorder is not None:
+                    recorder.record("cooldown_wait", current_time, active_character, name=skill_name, next_valid_time=next_valid_time, illegal=next_valid_time - current_time > 1)
+                # Handle the case where the skill is on cooldown and there are no available charges
+                if next_valid_time - current_time <= 1:
+                    # If the skill will be available soon (within 1 second), adjust the rotation timing to account for this delay
+                    delay = next_valid_time - current_time
+                    self.time_delays[i] = max(bonus_time_current, delay)
+                    add_cell_note(
+                        self.cell_notes, "In-Game Time", i, 
+                        note=f"This skill is on cooldown until {next_valid_time:.2f}. A waiting time of {delay:.2f} seconds was added to accommodate.", 
+                        font_color="#FF7F50")
+                    self.bonus_time_total += delay
+                else:
+                    # If the skill will not be available soon, mark the rotation as illegal
+                    add_cell_note(
+                        self.cell_notes, "In-Game Time", i, 
+                        note=f"Illegal rotation! This skill is on cooldown until {next_valid_time:.2f}", 
+                        font_color="#FF0000")
+                self.cooldown_map[skill_name] = skill_track
+
+        active_buffs_array = active_buffs[active_character]
+        buffs_to_remove = []
+
+        active_buffs_array = [buff for buff in active_buffs_array if filter_active_buffs(buff, swapped, current_time, buffs_to_remove)]
+        active_buffs[active_character] = active_buffs_array # Convert the array back into a set (doesn't make sense in python)
+
+        for classification in buffs_to_remove:
+            active_buffs[active_character] = [
+                buff for buff in active_buffs[active_character] if classification not in buff.buff.name
+            ]
+            active_buffs["team"] = [
+                buff for buff in active_buffs["team"] if classification not in buff.buff.name
+            ]
+
+        if swapped and len(self.queued_buffs_for_next) > 0: # add outro skills after the buffuntilswap check is performed
+            for queued_buff in self.queued_buffs_for_next:
+                found = False
+                applies_to = active_character if queued_buff.buff.applies_to == "Next" else queued_buff.buff.applies_to
+                active_set = active_buffs["team"] if queued_buff.buff.applies_to == "Team" else active_buffs[applies_to]
+
+                for active_buff in active_set: # loop through and look for if the buff already exists
+                    if active_buff.buff.name == queued_buff.buff.name and active_buff.buff.triggered_by == queued_buff.buff.triggered_by:
+                        found = True
+                        if active_buff.buff.type == "stacking_buff":
+                            effective_interval = active_buff.buff.stack_interval
+                            if active_buff.buff.name.startswith("Incandescence") and jinhsi_outro_active:
+                                effective_interval = 1
+                            if current_time - active_buff.stack_time >= effective_interval:
+                                active_buff.stacks = min(active_buff.stacks + queued_buff.stacks, active_buff.buff.stack_limit)
+                                active_buff.stack_time = current_time
+                                if recorder is not None:
+                                    recorder.record("buff_stacked", current_time, applies_to, name=active_buff.buff.name, stacks=active_buff.stacks, source=self.last_character)
+                        else:
+                            active_buff.start_time = current_time
+                            if recorder is not None:
+                                recorder.record("buff_refreshed", current_time, applies_to, name=active_buff.buff.name, source=self.last_character)
+                if not found: # add a new buff
+                    active_set.append(self.copy_queued_buff(queued_buff, applies_to))
+                    if recorder is not None:
+                        recorder.record("buff_added", current_time, applies_to, name=queued_buff.buff.name, stacks=queued_buff.stacks, source=self.last_character)
+            self.queued_buffs_for_next = []
+        self.last_character = active_character
+        if len(self.queued_buffs) > 0: # add queued buffs procced from passive effects
+            for queued_buff in self.queued_buffs:
+                found = False
+                applies_to = active_character if (queued_buff.buff.applies_to == "Next" or queued_buff.buff.applies_to == "Active") else queued_buff.buff.applies_to
+                active_set = active_buffs["team"] if applies_to == "Team" else active_buffs[applies_to]
+
+                if "consume_buff" in queued_buff.buff.type: # a queued consumebuff will instantly remove said buffs
+                    remove_buff_instant.append(queued_buff.buff.classifications)
+                else:
+                    for active_buff in active_set: # loop through and look for if the buff already exists
+                        if active_buff.buff.name == queued_buff.buff.name and active_buff.buff.triggered_by == queued_buff.buff.triggered_by:
+                            found = True
+                            if active_buff.buff.type == "stacking_buff":
+                                effective_interval = active_buff.buff.stack_interval
+                                if active_buff.buff.name.startswith("Incandescence") and jinhsi_outro_active:
+                                    effective_interval = 1
+                                if current_time - active_buff.stack_time >= effective_interval:
+                                    active_buff.stack_time = queued_buff.start_time # we already calculated the start time based on lastProc
+                                    active_buff.stacks = min(active_buff.stacks + queued_buff.stacks, active_buff.buff.stack_limit)
+                                    active_buff.stack_time = current_time; # this actually is not accurate, will fix later. should move forward on multihits
+                                    if recorder is not None:
+                                        recorder.record("buff_stacked", current_time, applies_to, name=active_buff.buff.name, stacks=active_buff.stacks, source="proc")
+                            else:
+                                # sometimes a passive instance-triggered effect that procced earlier gets processed later. 
+                                # to work around this, check which activated effect procced later
+                                if queued_buff.start_time > active_buff.start_time:
+                                    active_buff.start_time = queued_buff.start_time
+                                    if recorder is not None:
+                                        recorder.record("buff_refreshed", queued_buff.start_time, applies_to, name=active_buff.buff.name, source="proc")
+                    if not found: # add a new buff
+                        active_set.append(self.copy_queued_buff(queued_buff, applies_to))
+                        if recorder is not None:
+                            recorder.record("buff_added", queued_buff.start_time, applies_to, name=queued_buff.buff.name, stacks=queued_buff.stacks, source="proc")
+            self.queued_buffs = []
+
+        active_buffs_array_team = active_buffs["team"]
+
+        active_buffs_array_team = [buff for buff in active_buffs_array_team if filter_team_buffs(buff, current_time)]
+        active_buffs["Team"] = active_buffs_array_team  # Convert the list back into a set (doesn't make sense in python)
+
+        # the buff names and total buff map are still the ones of the previous step until they are updated below
+        buff_names = self.buff_names
+        total_buff_map = self.total_buff_map
+
+        # check for new buffs triggered at this time and add them to the active list
+        trigger_start = instrumentation.start_timer()
+        instrumentation.count("buffs_evaluated", len(self.all_buffs))
+        for buff in self.all_buffs:
+            active_set = active_buffs["team"] if buff.applies_to == "Team" else active_buffs[active_character]
+            triggered_by = buff.triggered_by
+            if ";" in triggered_by: # for cases that have additional conditions, remove them for the initial check
+                triggered_by = triggered_by.split(";")[0]
+            intro_outro = "Outro" in buff.name or "Intro" in buff.name
+            if len(triggered_by) == 0 and intro_outro:
+                triggered_by = buff.name
+            if triggered_by == "Any":
+                triggered_by = skill_ref["name"] # well that's certainly one way to do it
+            triggered_by_conditions = triggered_by.split(',')
+            is_activated = False
+            special_activated = False
+            special_condition_value = 0 # if there is a special >= condition, save this condition for potential proc counts later
+            if buff.special_condition and "OnCast" not in buff.special_condition and (buff.can_activate == "Team" or buff.can_activate == active_character): # special conditional
+                if ">=" in buff.special_condition:
+                    # Extract the key and the value from the condition
+                    key, value = buff.special_condition.split(">=", 1)
+
+                    # Convert the value from string to number to compare
+                    value = float(value)
+
+                    # Check if the property (key) exists in skillRef
+                    if key in char_data[active_character]["d_cond"]:
+                        # Evaluate the condition
+                        is_activated = char_data[active_character]["d_cond"][key] >= value
+                        special_condition_value = char_data[active_character][key]
+                    else:
+                        logger.debug(f'condition not found: {buff.special_condition} for skill {skill_ref["name"]}')
+                elif ":" in buff.special_condition:
+                    key, value = buff.special_condition.split(":", 1)
+                    if "Buff" in key: # check the presence of a buff
+                        is_activated = False
+                        for active_buff in active_set: # loop through and look for if the buff already exists
+                            if active_buff.buff.name == value:
+                                is_activated = True
+                    else:
+                        logger.debug(f'unhandled colon condition: {buff.special_condition} for skill {skill_ref["name"]}')
+                else:
+                    logger.debug(f'unhandled condition: {buff.special_condition} for skill {skill_ref["name"]}')
+                special_activated = is_activated
+            else:
+                special_activated = True
+            # check if any of the conditions in triggered_by_conditions match
+            is_activated = special_activated
+            for condition in triggered_by_conditions:
+                condition = condition.strip()
+                condition_is_skill_name = len(condition) > 2
+                extra_condition = True
+                if buff.additional_condition:
+                    extra_conditions = buff.additional_condition.split(",")
+                    found_extra = False
+                    extra_condition = False
+                    for additional_condition in extra_conditions:
+                        found = additional_condition in skill_ref["classifications"] if len(additional_condition) == 2 else additional_condition in skill_ref["name"]
+                        if found:
+                            found_extra = True
+                    if found_extra:
+                        extra_condition = True
+                if extra_condition:
+                    if "Buff:" in condition: # check for the existence of a buff
+                        buff_name = condition.split(":")[1]
+                        buff_array = active_buffs[active_character]
+                        buff_array_team = active_buffs["team"]
+                        buff_names = [
+                            f'{active_buff.buff.name} x{active_buff.stacks}'
+                            if active_buff.buff.type == "stacking_buff"
+                            else active_buff.buff.name
+                            for active_buff in buff_array] # Extract the name from each object
+                        buff_names_team = [
+                            f'{active_buff.buff.name} x{active_buff.stacks}'
+                            if active_buff.buff.type == "stacking_buff"
+                            else active_buff.buff.name
+                            for active_buff in buff_array_team] # Extract the name from each object
+                        buff_names_string = ", ".join(buff_names)
+                        buff_names_string_team = ", ".join(buff_names_team)
+                        if buff_name in buff_names_string or buff_name in buff_names_string_team:
+                            is_activated = special_activated
+                            break
+                    elif condition_is_skill_name:
+                        for passive_damage_queued in passive_damage_queue:
+                            if (passive_damage_queued is not None
+                                and ((condition in passive_damage_queued.name or passive_damage_queued.name in condition)
+                                or (condition == "Passive" and passive_damage_queued.limit != 1
+                                and (passive_damage_queued.type != "TickOverTime" and buff.can_activate != "Active")))
+                                and (buff.can_activate == passive_damage_queued.owner or buff.can_activate in ["Team", "Active"])):
+                                passive_damage_queued.add_buff(create_active_stacking_buff(buff, current_time, 1) if buff.type == "stacking_buff" else create_active_buff(buff, current_time))
+                        # the condition is a skill name, check if it's included in the currentSkill
+                        application_check = buff.applies_to == active_character or buff.applies_to == "Team" or buff.applies_to == "Active" or intro_outro or skill_ref["source"] == active_character
+                        if condition == "Swap" and "Intro" not in skill_ref["name"] and (skill_ref["cast_time"] == 0 or "(Swap)" in skill_ref["name"]): # this is a swap-out skill
+                            if application_check and ((buff.can_activate == active_character or buff.can_activate == "Team") or (skill_ref["source"] == active_character and intro_outro)):
+                                is_activated = special_activated
+                                break
+                        else:
+                            if condition in current_skill and application_check and (buff.can_activate == active_character or buff.can_activate == "Team" or (skill_ref["source"] == active_character and buff.applies_to == "Next")):
+                                is_activated = special_activated
+                                break
+                    else:
+                        for passive_damage_queued in passive_damage_queue:
+                            if passive_damage_queued is not None and condition in passive_damage_queued.classifications and (buff.can_activate == passive_damage_queued.owner or buff.can_activate == "Team"):
+                                passive_damage_queued.add_buff(create_active_stacking_buff(buff, current_time, 1) if buff.type == "stacking_buff" else create_active_buff(buff, current_time))
+                        # the condition is a classification code, check against the classification
+                        if (condition in classification or (condition == "Hl" and heal_found)) and (buff.can_activate == active_character or buff.can_activate == "Team"):
+                            is_activated = special_activated
+                            break
+            if buff.name.startswith("Incandescence") and "Ec" in skill_ref["classifications"]:
+                is_activated = False
+            if is_activated: # activate this effect
+                found = False
+                stacks_to_add = 1
+                if "Hl" in buff.classifications: # when a heal effect is procced, raise a flag for subsequent proc conditions
+                    heal_found = True
+                if buff.type == "consume_buff_instant": # these buffs are immediately withdrawn before they are calculating
+                    remove_buff_instant.append(buff.classifications)
+                elif buff.type == "consume_buff":
+                    if remove_buff is not None:
+                        logger.debug("UNEXPECTED double removebuff condition.")
+                    remove_buff = buff.classifications; # remove this later, after other effects apply
+                elif buff.type == "reset_buff":
+                    buff_array = list(active_buffs[active_character])
+                    buff_array_team = list(active_buffs["team"])
+                    buff_names = [
+                        f'{activeBuff.buff.name} x{active_buff.stacks}'
+                        if activeBuff.buff.type == "stacking_buff"
+                        else activeBuff.buff.name
+                        for activeBuff in buff_array] # Extract the name from each object
+                    buff_names_team = [
+                        f'{active_buff.buff.name} x{active_buff.stacks}'
+                        if active_buff.buff.type == "stacking_buff"
+                        else active_buff.buff.name
+                        for active_buff in buff_array_team] # Extract the name from each object
+                    buff_names_string = ", ".join(buff_names)
+                    buff_names_string_team = ", ".join(buff_names_team)
+                    if buff.name not in (buff_names_string, buff_names_string_team):
+                        logger.debug("adding new active resetbuff")
+                        active_set.append(create_active_buff(buff, current_time))
+                elif buff.type == "dmg": # add a new passive damage instance
+                    # queue the passive damage and snapshot the buffs later
+                    passive_damage_queued = PassiveDamage(buff.name, buff.classifications, buff.buff_type, buff.amount, buff.duration, current_time, buff.stack_limit, buff.stack_interval, buff.triggered_by, active_character, i, buff.d_cond)
+                    if buff.buff_type == "tick_over_time" and "Inklet" not in buff.name:
+                        # for DOT effects, procs are only applied at the end of the interval
+                        passive_damage_queued.lastProc = current_time
+                    passive_damage_queue.append(passive_damage_queued)
+                    if recorder is not None:
+                        recorder.record("passive_damage_added", current_time, active_character, name=buff.name, type=buff.buff_type, interval=buff.stack_interval, limit=buff.stack_limit)
+                elif buff.type == "stacking_buff":
+                    effective_interval = buff.stack_interval
+                    if "Incandescence" in buff.name and jinhsi_outro_active:
+                        effective_interval = 1
+                    if effective_interval < (skill_ref["cast_time"] - skill_ref["freeze_time"]): # potentially add multiple stacks
+                        if effective_interval == 0:
+                            max_stacks_by_time = skill_ref["number_of_hits"]
+                        else:
+                            max_stacks_by_time = (skill_ref["cast_time"] - skill_ref["freeze_time"]) // effective_interval
+                        stacks_to_add = min(max_stacks_by_time, skill_ref["number_of_hits"])
+                    if buff.special_condition and "on_cast" in buff.special_condition:
+                        stacks_to_add = 1
+                    if buff.name == "Resolution" and skill_ref["name"].startswith("Intro: Tactical Strike"):
+                        stacks_to_add = 15
+                    if special_condition_value > 0: # cap the stacks to add based on the special condition value
+                        stacks_to_add = min(stacks_to_add, special_condition_value)
+                    for active_buff in active_set: # loop through and look for if the buff already exists
+                        if active_buff.buff.name == buff.name and active_buff.buff.triggered_by == buff.triggered_by:
+                            found = True
+                            if current_time - active_buff.stack_time >= effective_interval:
+                                active_buff.stacks = min(active_buff.stacks + stacks_to_add, buff.stack_limit)
+                                active_buff.stack_time = current_time
+                                if recorder is not None:
+                                    recorder.record("buff_stacked", current_time, buff.applies_to, name=buff.name, stacks=active_buff.stacks, added=stacks_to_add, source=skill_ref["name"])
+                    if not found: # add a new stackable buff
+                        active_set.append(create_active_stacking_buff(buff, current_time, min(stacks_to_add, buff.stack_limit)))
+                        if recorder is not None:
+                            recorder.record("buff_added", current_time, buff.applies_to, name=buff.name, stacks=min(stacks_to_add, buff.stack_limit), source=skill_ref["name"])
+                else:
+                    if "Outro" in buff.name or buff.applies_to == "Next": # outro buffs are special and are saved for the next character
+                        self.queued_buffs_for_next.append(create_active_buff(buff, current_time))
+                        if recorder is not None:
+                            recorder.record("buff_queued", current_time, active_character, name=buff.name, source=skill_ref["name"])
+                    else:
+                        for active_buff in active_set: # loop through and look for if the buff already exists
+                            if active_buff.buff.name == buff.name:
+                                active_buff.start_time = current_time + skill_ref["cast_time"]
+                                found = True
+                                if recorder is not None:
+                                    recorder.record("buff_refreshed", current_time + skill_ref["cast_time"], buff.applies_to, name=buff.name, source=skill_ref["name"])
+                        if not found:
+                            if buff.type != "buff_energy": # buff_energy available_in is updated when it is applied later on
+                                self.available_in[buff] = current_time + buff.stack_interval
+                            active_set.append(create_active_buff(buff, current_time + skill_ref["cast_time"]))
+                            if recorder is not None:
+                                recorder.record("buff_added", current_time + skill_ref["cast_time"], buff.applies_to, name=buff.name, source=skill_ref["name"])
+                if buff.d_cond is not None:
+                    for condition, value in buff.d_cond.items():
+                        if buff_names is None:
+                            active_buffs_array = active_buffs[active_character]
+                            buff_names = [
+                                f'{active_buff.buff.name} x{active_buff.stacks}'
+                                if active_buff.buff.type == "stacking_buff"
+                                else active_buff.buff.name
+                                for active_buff in active_buffs_array]
+                        if total_buff_map is None:
+                            total_buff_map = BuffMap()
+                        evaluate_d_cond(value * stacks_to_add, condition, i, active_character, self.characters, char_data, self.weapon_data, self.bonus_stats, buff_names, skill_ref, self.initial_d_cond, total_buff_map, self.cell_notes, self.game_data.char_constants)
+        instrumentation.stop_timer("buff_triggers", trigger_start)
+
+        for remove_buff in remove_buff_instant:
+            if remove_buff is not None:
+                for active_buff in active_buffs[active_character]:
+                    if remove_buff in active_buff.buff.name:
+                        active_buffs[active_character].remove(active_buff)
+                        if recorder is not None:
+                            recorder.record("buff_removed", current_time, active_character, name=active_buff.buff.name, instant=True)
+                for active_buff in active_buffs["team"]:
+                    if remove_buff in active_buff.buff.name:
+                        active_buffs["team"].remove(active_buff)
+                        if recorder is not None:
+                            recorder.record("buff_removed", current_time, "Team", name=active_buff.buff.name, instant=True)
+
+        active_buffs_array = active_buffs[active_character]
+        buff_names = [
+            f'{active_buff.buff.name} x{active_buff.stacks}'
+            if active_buff.buff.type == "stacking_buff"
+            else active_buff.buff.name
+            for active_buff in active_buffs_array] # Extract the name from each object
+        buff_names_string = ", ".join(buff_names)
+
+        if len(active_buffs_array) == 0:
+            self.write_buffs_personal.append("(0)")
+        else:
+            buff_string = f'({len(active_buffs_array)}) {buff_names_string}'
+            self.write_buffs_personal.append(buff_string)
+
+        active_buffs_array_team = active_buffs["Team"]
+        buff_names_team = [
+            f'{active_buff.buff.name} x{active_buff.stacks}'
+            if active_buff.buff.type == "stacking_buff"
+            else active_buff.buff.name
+            for active_buff in active_buffs_array_team] # Extract the name from each object
+        buff_names_string_team = ", ".join(buff_names_team)
+
+        if len(buff_names_string_team) == 0:
+            self.write_buffs_team.append("(0)")
+        else:
+            buff_string = f'({len(active_buffs_array_team)}) {buff_names_string_team}'
+            self.write_buffs_team.append(buff_string)
+
+        total_buff_map = BuffMap()
+        self.buff_names = buff_names
+        self.total_buff_map = total_buff_map
+
+        weapon_data = self.weapon_data
+        bonus_stats = self.bonus_stats
+        if weapon_data[active_character]["main_stat"] in total_buff_map:
+            total_buff_map[weapon_data[active_character]["main_stat"]] += weapon_data[active_character]["main_stat_amount"]
+        for stat, value in char_data[active_character]["bonus_stats"].items():
+            current_amount = total_buff_map.get(stat, 0)
+            total_buff_map[stat] = current_amount + value
+        process_buffs(active_buffs_array, current_time, char_data, active_character, total_buff_map, skill_ref, self.available_in)
+
+        process_buffs(active_buffs_array_team, current_time, char_data, active_character, total_buff_map, skill_ref, self.available_in)
+        self.last_total_buff_map[active_character] = total_buff_map
+        for passive_damage_queued in passive_damage_queue:
+            if passive_damage_queued is not None: # snapshot passive damage BEFORE team buffs are applied
+                # TEMP: move this above activeBuffsArrayTeam and implement separate buff tracking
+                for instance in self.passive_damage_instances: # remove any duplicates first
+                    if instance.name == passive_damage_queued.name:
+                        instance.remove = True
+                        break
+                passive_damage_queued.set_total_buff_map(total_buff_map, self.sequences)
+                self.passive_damage_instances.append(passive_damage_queued)
+
+        self.add_damage_event(("stats", total_buff_map.values[:25], active_character))
+        if "buff" in skill_ref["type"]:
+            self.add_damage_event(("buff", i))
+            return True
+
+        # damage calculations
+        self.passive_damage_instances = [passive_damage for passive_damage in self.passive_damage_instances if not passive_damage.can_remove(current_time, remove_buff)]
+        for condition, value in skill_ref["d_cond"].items():
+            evaluate_d_cond(value, condition, i, active_character, self.characters, char_data, weapon_data, bonus_stats, buff_names, skill_ref, self.initial_d_cond, total_buff_map, self.cell_notes, self.game_data.char_constants)
+        passive_current_slot = False # if a passive damage procs on the same slot, we need to add the damage to the current value later
+        procs_start = instrumentation.start_timer()
+        if skill_ref["damage"] > 0:
+            for passive_damage in self.passive_damage_instances:
+                if passive_damage.can_proc(current_time, skill_ref) and passive_damage.check_proc_conditions(skill_ref):
+                    passive_damage.update_total_buff_map(self.last_total_buff_map, self.sequences)
+                    procs = passive_damage.handle_procs(current_time, skill_ref["cast_time"] - skill_ref["freeze_time"], skill_ref["number_of_hits"], jinhsi_outro_active, self.queued_buffs)
+                    passive_damage.apply_d_cond(active_character, self.characters, char_data, weapon_data, bonus_stats)
+                    bonus_attack, extra_multiplier = passive_damage.get_proc_modifiers(active_character, char_data, weapon_data, self.last_seen, rythmic_vibrato)
+                    self.add_damage_event(("proc", i, passive_damage, passive_damage.total_buff_map, passive_damage.proc_multiplier, passive_damage.num_procs, procs, bonus_attack, extra_multiplier))
+                    instrumentation.count("procs")
+                    if recorder is not None:
+                        recorder.record("proc", current_time, passive_damage.owner, name=passive_damage.name, procs=procs, total_procs=passive_damage.num_procs, slot=passive_damage.slot)
+                    if passive_damage.slot == i:
+                        passive_current_slot = True
+        instrumentation.stop_timer("procs", procs_start)
+        self.write_resonance.append(f'{char_data[active_character]["d_cond"]["resonance"]:.2f}')
+        self.write_concerto.append(f'{char_data[active_character]["d_cond"]["concerto"]:.2f}')
+
+        additive_value_key = f'{skill_ref["name"]} (Additive)'
+        damage = skill_ref["damage"] * (1 if ("Ec" in skill_ref["classifications"] or "Ou" in skill_ref["classifications"]) else self.skill_level_multiplier) + total_buff_map.get(additive_value_key, 0)
+        # the buff map is copied because dynamic conditions of later steps can still change it
+        self.add_damage_event(("skill", i, skill_ref, damage, total_buff_map.copy(), active_character, self.mode, passive_current_slot))
+        if self.mode == "opener" and self.characters[0] == active_character and skill_ref["name"].startswith("Outro"):
+            self.mode = "loop"
+            self.opener_row = i
+        self.live_time += skill_ref["cast_time"] # live time
+
+        if remove_buff is not None:
+            for active_buff in active_buffs[active_character]:
+                if remove_buff in active_buff.buff.name:
+                    active_buffs[active_character].remove(active_buff)
+                    if recorder is not None:
+                        recorder.record("buff_removed", current_time, active_character, name=active_buff.buff.name, instant=False)
+            for active_buff in active_buffs["team"]:
+                if remove_buff in active_buff.buff.name:
+                    active_buffs["team"].remove(active_buff)
+                    if recorder is not None:
+                        recorder.record("buff_removed", current_time, "Team", name=active_buff.buff.name, instant=False)
+        return True
+
+    def get_in_game_times(self):
+        """
+        Get the in-game times of the rotation steps, including the time delays that were added so far.
+
+        :return: The in-game time of every rotation step.
+        :rtype: list
+        """
+        in_game_times = [self.times[0]]
+        for k in range(1, len(self.rotation)):
+            character, skill = self.rotation[k - 1]
+            time_to_add = get_skill_time(get_skill_reference(self.skill_data, skill, character))
+            time_delay = self.time_delays[k] or 0
+            in_game_times.append(in_game_times[-1] + time_to_add + time_delay)
+        return in_game_times
+
+    def get_substat_gains(self):
+        """
+        Get the damage gained per character from one additional roll of each substat, relative to the damage of the character.
+
+        :return: The relative substat gains of every character, None for characters without damage entries.
+        :rtype: dict
+        """
+        char_stat_gains = self.substat_sensitivity.evaluate()
+        substat_gains = {}
+        for character in self.characters:
+            substat_gains[character] = None
+            if self.char_entries[character] > 0: # Using [character] to get each character's entry
+                stats = char_stat_gains[character]
+
+                for key in stats.keys():
+                    if self.damage_by_character[character] == 0:
+                        stats[key] = 0
+                    else:
+                        stats[key] /= self.damage_by_character[character] # char_entries[character]
+                logger.debug(stats)
+                substat_gains[character] = stats
+        return substat_gains
+
+    def get_character_damage(self):
+        """
+        Get the total damage dealt by every character in the rotation.
+
+        :return: The damage of every character, None for characters without rotation steps.
+        :rtype: dict
+        """
+        character_damage = {}
+        for character in self.characters:
+            damage_values = [
+                damage for (row_character, _), damage in zip(self.rotation, self.write_damage)
+                if row_character == character and damage is not None]
+            character_damage[character] = math.fsum(damage_values) if damage_values else None
+        return character_damage
+
+    def get_result(self):
+        """
+        Collect the results of the simulated rotation steps.
+
+        :return: The results of the simulation.
+        :rtype: SimulationResult
+        """
+        in_game_times = self.get_in_game_times()
+        opener_time = in_game_times[self.opener_row] if self.opener_row is not None else 0
+        final_time = in_game_times[-1]
+        logger.debug(f'real time: {self.live_time}; final in-game time: {final_time}')
+        logger.debug(self.total_damage_map)
+        return SimulationResult(
+            characters=list(self.characters),
+            in_game_times=in_game_times,
+            time_delays=list(self.time_delays),
+            resonance=self.write_resonance,
+            concerto=self.write_concerto,
+            local_buffs=self.write_buffs_personal,
+            global_buffs=self.write_buffs_team,
+            stats=self.write_stats,
+            damage=self.write_damage,
+            damage_notes=self.write_damage_note,
+            cell_notes=self.cell_notes,
+            opener_damage=self.opener_damage,
+            opener_time=opener_time,
+            loop_damage=self.loop_damage,
+            final_time=final_time,
+            total_swaps=self.total_swaps,
+            total_damage_map=dict(self.total_damage_map),
+            character_damage=self.get_character_damage(),
+            substat_gains=self.get_substat_gains(),
+            initial_d_cond=deepcopy(self.initial_d_cond),
+            final_d_cond={character: dict(self.char_data[character]["d_cond"]) for character in self.characters})
+
+    def recalculate(self, lineup):
+        """
+        Recalculate the results for a lineup that only differs from the simulated one in the stat columns.
+
+        The buffs, procs and energy of the rotation don't depend on the columns in LINEUP_STAT_COLUMNS,
+        so instead of simulating the rotation again, the recorded damage events are processed again with the new stats.
+
+        :param lineup: The three characters of the lineup, as dictionaries with the column names of the 
+            CharacterLineup table as keys.
+        :type lineup: list
+        :return: The results of the simulation with the new stats.
+        :rtype: SimulationResult
+        :raises ValueError: If the lineup also differs in other columns than the stat columns.
+        """
+        if get_lineup_structure(lineup) != self.lineup_structure:
+            raise ValueError("The lineup differs in more than its stats and has to be simulated again")
+
+        lineup_rows = [lineup_row_to_list(character_row) for character_row in lineup]
+        self.bonus_stats = get_bonus_stats(lineup)
+        flat_deltas = {}
+        for i, character in enumerate(self.characters):
+            character_info = row_to_character_info(lineup_rows[i], self.level_cap, self.weapon_data, False, self.game_data)
+            for key in ("crit_rate", "crit_dmg", "bonus_stats"):
+                self.char_data[character][key] = character_info[key]
+            flat_deltas[character] = [
+                character_info["bonus_stats"][stat] - recorded
+                for stat, recorded in zip(FLAT_STATS, self.recorded_flat_stats[character])]
+
+        self.opener_damage = 0
+        self.loop_damage = 0
+        self.char_entries = dict.fromkeys(self.characters, 0)
+        self.damage_by_character = dict.fromkeys(self.characters, 0)
+        self.total_damage_map = dict.fromkeys(self.total_damage_map, 0)
+        self.substat_sensitivity = SubstatSensitivity(self.characters, STAT_CHECK_MAP)
+        self.write_stats = []
+        self.write_damage = []
+        self.write_damage_note = []
+        self.checkpoints = {} # the checkpoints still have the damage of the old stats
+        for event in self.damage_events:
+            if event[0] == "proc":
+                event[2].total_damage = 0
+        recalculate_start = instrumentation.start_timer()
+        for event in self.damage_events:
+            self.process_damage_event(adjust_flat_stats(event, flat_deltas))
+        instrumentation.stop_timer("recalculate", recalculate_start)
+        logger.debug(f"Recalculated {len(self.damage_events)} damage events")
+        return self.get_result()
+
+class SimulationCache:
+    """
+    Keeps the last simulation, so a rotation is only recalculated instead of simulated again when
+    nothing but the stat columns of the lineup have changed since, and only simulated from the last 
+    checkpoint before the first changed step when nothing but the rotation has changed since.
+
+    :param checkpoint_interval: The amount of rotation steps between two checkpoints, defaults to CHECKPOINT_INTERVAL.
+    :type checkpoint_interval: int, optional
+    """
+    def __init__(self, checkpoint_interval=CHECKPOINT_INTERVAL):
+        self.checkpoint_interval = checkpoint_interval
+        self.key = None
+        self.lineup = None
+        self.simulation = None
+
+    def simulate(self, lineup, rotation, settings, start_time=0.0, game_data=None, progress_callback=None):
+        """
+        Simulate a rotation of a character lineup, reusing the last simulation if only the stats of the lineup
+        or only the rotation have changed.
+
+        The other parameters are the same as the ones of simulate.
+
+        :param progress_callback: Called with the amount of simulated steps and the total amount of steps, see Simulation.run.
+            If it stops the simulation, the last simulation is kept.
+        :type progress_callback: callable, optional
+        :return: The results of the simulation.
+        :rtype: SimulationResult
+        :raises IncompleteInputError: If the lineup or the rotation is incomplete.
+        """
+        game_data = game_data or get_game_data()
+        key = (get_lineup_structure(lineup), tuple(tuple(step) for step in rotation), tuple(settings.items()), start_time, game_data.key)
+        if self.simulation is not None and key == self.key:
+            logger.debug("Only the stats of the lineup have changed, recalculating the damage")
+            self.lineup = [dict(character_row) for character_row in lineup]
+            return self.simulation.recalculate(lineup)
+
+        simulation = None
+        if self.simulation is not None and key[0] == self.key[0] and key[2:] == self.key[2:] and lineup == self.lineup:
+            simulation = self.simulation.resume(rotation)
+        if simulation is None:
+            simulation = Simulation(lineup, rotation, settings, start_time=start_time, game_data=game_data, checkpoint_interval=self.checkpoint_interval)
+        result = simulation.run(progress_callback)
+        self.key = key
+        self.lineup = [dict(character_row) for character_row in lineup]
+        self.simulation = simulation
+        return result
+
+def simulate(lineup, rotation, settings, start_time=0.0, game_data=None):
+    """
+    Simulate a rotation of a character lineup without touching the GUI or the calculator database.
+
+    :param lineup: The three characters of the lineup, as dictionaries with the column names of the 
+        CharacterLineup table as keys.
+    :type lineup: list
+    :param rotation: The rotation steps as (character, skill) pairs.
+    :type rotation: list
+    :param settings: The settings, as a dictionary with the column names of the Settings table as keys.
+    :type settings: dict
+    :param start_time: The in-game time of the first rotation step, defaults to 0.0.
+    :type start_time: float, optional
+    :param game_data: The reference data to use, defaults to the shared snapshot that is reloaded when the data is updated.
+    :type game_data: GameData, optional
+    :return: The results of the simulation.
+    :rtype: SimulationResult
+    :raises IncompleteInputError: If the lineup or the rotation is incomplete.
+    """
+    return Simulation(lineup, rotation, settings, start_time=start_time, game_data=game_data).run()
@@ -0,0 +1,264 @@
+"""
+Substats
+========
+
+by @HikariTenshi
+original script by @Maygi
+
+This module estimates how much damage one additional roll of each substat would have added
+to a rotation. The inputs of the damage formula are recorded for every damage instance while
+the rotation is simulated, and the damage with each substat increased is evaluated for all
+instances at once with NumPy afterwards. The same records are used to recalculate the damage 
+of a rotation against a different enemy level or resistance without simulating it again.
+"""
+
+import logging
+import numpy as np
+from engine.buff_map import Stat, STAT_INDICES
+from config.constants import logger
+
+logger = logging.getLogger(__name__)
+
+# The scale factor a damage instance uses
+SCALE_ATTACK = 0
+SCALE_HEALTH = 1
+SCALE_DEFENSE = 2
+
+# The stats the damage formula reads from the buff map, in the column order of the recorded stats
+FORMULA_STATS = (
+    Stat.ATTACK, Stat.FLAT_ATTACK, Stat.HEALTH, Stat.FLAT_HEALTH, Stat.DEFENSE, Stat.FLAT_DEFENSE, Stat.CRIT_RATE, Stat.CRIT_DMG)
+
+# The scalar inputs recorded for every damage instance, in the column order of the records, see SubstatSensitivity.add
+RECORD_FIELDS = (
+    "damage", "total_damage", "base_attack", "base_health", "base_defense", "base_crit_rate", "base_crit_dmg",
+    "bonus_attack_stat", "bonus_attack", "bonus_health", "bonus_defense", "specific", "multiplier", "deepen",
+    "res_multiplier", "defense_multiplier", "damage_mult_extra", "scale", "nullify")
+
+def calculate_damage(records, formula_stats, damage_bonus, res_multiplier, defense_multiplier):
+    """
+    Calculate the damage of recorded damage instances, in the same order of operations as the simulation.
+
+    :param records: The columns of the recorded scalar inputs, see SubstatSensitivity.add.
+    :type records: tuple
+    :param formula_stats: The columns of the stats in FORMULA_STATS.
+    :type formula_stats: tuple
+    :param damage_bonus: The total damage bonus of the instances.
+    :type damage_bonus: numpy.ndarray
+    :param res_multiplier: The resistance multiplier of the instances.
+    :type res_multiplier: numpy.ndarray
+    :param defense_multiplier: The defense multiplier of the instances.
+    :type defense_multiplier: numpy.ndarray
+    :return: The damage of the instances.
+    :rtype: numpy.ndarray
+    """
+    (damage, _, base_attack, base_health, base_defense, base_crit_rate, base_crit_dmg,
+     bonus_attack_stat, bonus_attack, bonus_health, bonus_defense, _, multiplier, deepen,
+     _, _, damage_mult_extra, scale, nullify) = records
+    attack_stat, flat_attack, health_stat, flat_health, defense_stat, flat_defense, crit_rate, crit_dmg = formula_stats
+
+    attack = base_attack * (1 + attack_stat + bonus_attack_stat + bonus_attack) + flat_attack
+    health = base_health * (1 + health_stat + bonus_health) + flat_health
+    defense = base_defense * (1 + defense_stat + bonus_defense) + flat_defense
+    capped_crit_rate = np.minimum(1, base_crit_rate + crit_rate)
+    crit_multiplier = (1 - capped_crit_rate) * 1 + capped_crit_rate * (base_crit_dmg + crit_dmg)
+    damage_multiplier = damage_bonus * multiplier * deepen * res_multiplier * defense_multiplier + damage_mult_extra
+    scale_factor = np.where(scale == SCALE_DEFENSE, defense, np.where(scale == SCALE_HEALTH, health, attack))
+    return damage * scale_factor * crit_multiplier * damage_multiplier * nullify
+
+class SubstatSensitivity:
+    """
+    Records the damage instances of a rotation and evaluates the damage gained from one more roll of each substat.
+
+    :param characters: The names of the characters in the lineup.
+    :type characters: list
+    :param stat_check_map: The value of one substat roll for each stat that is checked.
+    :type stat_check_map: dict
+    """
+    def __init__(self, characters, stat_check_map):
+        self.characters = characters
+        self.stat_check_map = stat_check_map
+        self.record_characters = []
+        self.records = []
+        self.stats = []
+        self.bonus_terms = []
+        self.enemy_stats = []
+        self.modes = []
+
+    def __deepcopy__(self, memo):
+        # the recorded instances are never changed once they have been added, so only the lists are copied
+        copy = SubstatSensitivity(self.characters, self.stat_check_map)
+        for name in ("record_characters", "records", "stats", "bonus_terms", "enemy_stats", "modes"):
+            setattr(copy, name, list(getattr(self, name)))
+        return copy
+
+    def add(self, active_character, classifications, damage, total_damage, total_buff_map, damage_factors, char_data, weapon_data, bonus_stats, damage_mult_extra=0, bonus_attack=0, mode="opener"):
+        """
+        Record the inputs of the damage formula for a damage instance.
+
+        :param active_character: The character that dealt the damage.
+        :type active_character: str
+        :param classifications: The classifications of the damage.
+        :type classifications: str
+        :param damage: The raw damage before the stats are applied.
+        :type damage: float
+        :param total_damage: The damage that was dealt.
+        :type total_damage: float
+        :param total_buff_map: The buff map the damage was calculated with.
+        :type total_buff_map: BuffMap
+        :param damage_factors: The damage bonus terms, deepen, resistance and defense multipliers of the damage, see get_damage_multiplier_factors.
+        :type damage_factors: tuple
+        :param char_data: The data of all characters.
+        :type char_data: dict
+        :param weapon_data: The weapon data of all characters.
+        :type weapon_data: dict
+        :param bonus_stats: The bonus stats of all characters.
+        :type bonus_stats: dict
+        :param damage_mult_extra: An additional damage multiplier, defaults to 0.
+        :type damage_mult_extra: float, optional
+        :param bonus_attack: An additional attack bonus, defaults to 0.
+        :type bonus_attack: float, optional
+        :param mode: Whether the damage was added to the "opener" or the "loop" damage, or None if it was added to neither,
+            defaults to "opener".
+        :type mode: str, optional
+        """
+        if total_damage <= 0:
+            return
+        stats = total_buff_map.values
+        bonus_terms, damage_deepen, res_multiplier, defense_multiplier = damage_factors
+        character = char_data[active_character]
+        scale = SCALE_DEFENSE if "Df" in classifications else (SCALE_HEALTH if "Hp" in classifications else SCALE_ATTACK)
+        self.record_characters.append(active_character)
+        self.records.append((
+            damage,
+            total_damage,
+            character["attack"] + weapon_data[active_character]["attack"],
+            character["health"],
+            character["defense"],
+            character["crit_rate"],
+            character["crit_dmg"],
+            bonus_stats[active_character]["attack"],
+            bonus_attack or 0,
+            bonus_stats[active_character]["health"],
+            bonus_stats[active_character]["defense"],
+            stats[Stat.SPECIFIC],
+            1 + stats[Stat.MULTIPLIER],
+            1 + damage_deepen,
+            res_multiplier,
+            defense_multiplier,
+            damage_mult_extra or 0,
+            scale,
+            0 if weapon_data[active_character]["weapon"]["name"] == "Nullify Damage" else 1))
+        self.stats.append([stats[index] for index in FORMULA_STATS])
+        self.bonus_terms.append(bonus_terms)
+        self.enemy_stats.append((stats[Stat.RESISTANCE], stats[Stat.IGNORE_DEFENSE]))
+        self.modes.append(mode)
+
+    def get_damage_bonus(self, checked_stats=None, deltas=None):
+        """
+        Add up the damage bonus terms and the specific damage bonus of every recorded damage instance.
+
+        :param checked_stats: The stat indices to increase, one column per stat, defaults to no columns.
+        :type checked_stats: list, optional
+        :param deltas: The amount to increase each checked stat by.
+        :type deltas: numpy.ndarray, optional
+        :return: The damage bonus of each instance, with one column per checked stat if any are given.
+        :rtype: numpy.ndarray
+        """
+        term_count = max(len(terms) for terms in self.bonus_terms)
+        term_stats = np.full((len(self.records), term_count), -1)
+        term_values = np.zeros((len(self.records), term_count))
+        for row, terms in enumerate(self.bonus_terms):
+            for column, (stat, value) in enumerate(terms):
+                term_stats[row, column] = stat
+                term_values[row, column] = value
+
+        specific_index = RECORD_FIELDS.index("specific")
+        specific = np.array([record[specific_index] for record in self.records], dtype=float)
+        if checked_stats is None:
+            damage_bonus = np.ones(len(self.records))
+            for column in range(term_count):
+                damage_bonus = damage_bonus + term_values[:, column]
+            return damage_bonus + specific
+
+        damage_bonus = np.ones((len(self.records), len(checked_stats)))
+        for column in range(term_count):
+            term = term_values[:, column, None] + np.where(term_stats[:, column, None] == np.array(checked_stats), deltas, 0.0)
+            damage_bonus = damage_bonus + term
+        return damage_bonus + specific[:, None]
+
+    def evaluate(self):
+        """
+        Evaluate the damage gained by every character from one more roll of each substat.
+
+        Every recorded damage instance is recalculated once per substat, with the substat
+        increased by the value in the stat check map, and the difference to the dealt damage
+        is added up per character in the order the damage was dealt.
+
+        :return: The damage gained per substat for every character.
+        :rtype: dict
+        """
+        gains = {
+            character: {stat: 0 for stat in self.stat_check_map}
+            for character in self.characters}
+        if not self.records:
+            return gains
+
+        checked_stats = [STAT_INDICES[stat] for stat in self.stat_check_map]
+        deltas = np.array(list(self.stat_check_map.values()), dtype=float)
+        records = tuple(column[:, None] for column in np.array(self.records, dtype=float).T)
+        total_damage, res_multiplier, defense_multiplier = (
+            records[RECORD_FIELDS.index(field)] for field in ("total_damage", "res_multiplier", "defense_multiplier"))
+
+        # one column per checked stat, with that stat increased by one roll
+        def perturbed(stat, values):
+            return values[:, None] + np.where(np.array(checked_stats) == stat, deltas, 0.0)
+
+        stats = np.array(self.stats, dtype=float)
+        formula_stats = tuple(perturbed(stat, stats[:, i]) for i, stat in enumerate(FORMULA_STATS))
+        damage_bonus = self.get_damage_bonus(checked_stats, deltas)
+        new_total_damage = calculate_damage(records, formula_stats, damage_bonus, res_multiplier, defense_multiplier)
+        stat_gains = new_total_damage - total_damage
+
+        record_characters = np.array(self.record_characters)
+        for character in self.characters:
+            character_gains = stat_gains[record_characters == character]
+            if len(character_gains) > 0:
+                totals = np.cumsum(character_gains, axis=0)[-1] # added up in order, like the gains were dealt
+                gains[character] = dict(zip(self.stat_check_map, totals.tolist()))
+        logger.debug(f'evaluated substat gains for {len(self.records)} damage instances')
+        return gains
+
+    def rescale(self, level_cap, enemy_level, res):
+        """
+        Recalculate the damage of every recorded damage instance against an enemy with a different level or resistance.
+
+        The buffs and the procs of a rotation don't depend on the enemy, so only the resistance and
+        defense multipliers of the damage formula change. Instances that dealt no damage aren't recorded
+        and stay at zero.
+
+        :param level_cap: The level cap the rotation was simulated with.
+        :type level_cap: int
+        :param enemy_level: The level of the enemy.
+        :type enemy_level: int
+        :param res: The resistance of the enemy.
+        :type res: float
+        :return: The damage of each instance in the order it was dealt, and the modes of the instances.
+        :rtype: tuple
+        """
+        if not self.records:
+            return [], []
+
+        records = tuple(np.array(self.records, dtype=float).T)
+        stats = np.array(self.stats, dtype=float)
+        res_shred, def_pen = np.array(self.enemy_stats, dtype=float).T
+        enemy_defense = 792 + 8 * enemy_level
+        defense_multiplier = (800 + level_cap * 8) / (enemy_defense * (1 - def_pen) + 800 + level_cap * 8)
+        if res <= 0:
+            res_multiplier = 1 - (res - res_shred) / 2
+        elif res < .8:
+            res_multiplier = 1 - (res - res_shred)
+        else:
+            res_multiplier = 1 / (1 + (res - res_shred) * 5)
+
+        damage = calculate_damage(records, tuple(stats.T), self.get_damage_bonus(), res_multiplier, defense_multiplier)
+        return damage.tolist(), self.modes
@@ -0,0 +1,96 @@
+"""
+Sweep
+=====
+
+by @HikariTenshi
+original script by @Maygi
+
+This module compares the DPS of a lineup and rotation across different settings, e.g. to check
+a build against several boss profiles. The level cap and the skill level change the stats and
+the skill multipliers, so the rotation is simulated again for each of them. The enemy level and
+the resistance only change the damage formula, so for those the recorded damage instances of
+the simulation are recalculated instead.
+"""
+
+import logging
+from itertools import product
+from engine.simulation import Simulation, get_dps
+from config.constants import logger
+
+logger = logging.getLogger(__name__)
+
+def get_rescaled_dps(simulation, result, enemy_level, res):
+    """
+    Get the DPS of a simulated rotation against an enemy with a different level or resistance.
+    Only the DPS is recalculated, the other damage values of the result stay the ones against the simulated enemy.
+
+    :param simulation: The simulation the result was created by.
+    :type simulation: Simulation
+    :param result: The results of the simulation.
+    :type result: SimulationResult
+    :param enemy_level: The level of the enemy.
+    :type enemy_level: int
+    :param res: The resistance of the enemy.
+    :type res: float
+    :return: The opener DPS, the loop DPS and the DPS over 2 minutes against the new enemy.
+    :rtype: tuple
+    """
+    if enemy_level == simulation.enemy_level and res == simulation.res:
+        return result.opener_dps, result.loop_dps, result.dps_2_mins
+    damage, modes = simulation.substat_sensitivity.rescale(simulation.level_cap, enemy_level, res)
+    opener_damage = sum(value for value, mode in zip(damage, modes) if mode == "opener")
+    loop_damage = sum(value for value, mode in zip(damage, modes) if mode == "loop")
+    return get_dps(opener_damage, result.opener_time, loop_damage, result.final_time)
+
+def sweep_settings(lineup, rotation, settings, level_caps=None, enemy_levels=None, resistances=None, skill_levels=None, start_time=0.0, game_data=None):
+    """
+    Calculate the DPS of a lineup and rotation for every combination of the given settings.
+
+    :param lineup: The three characters of the lineup, as dictionaries with the column names of the
+        CharacterLineup table as keys.
+    :type lineup: list
+    :param rotation: The rotation steps as (character, skill) pairs.
+    :type rotation: list
+    :param settings: The base settings, as a dictionary with the column names of the Settings table as keys.
+    :type settings: dict
+    :param level_caps: The level caps to compare, defaults to the LevelCap of the settings.
+    :type level_caps: iterable, optional
+    :param enemy_levels: The enemy levels to compare, defaults to the EnemyLevel of the settings.
+    :type enemy_levels: iterable, optional
+    :param resistances: The enemy resistances to compare, defaults to the Resistance of the settings.
+    :type resistances: iterable, optional
+    :param skill_levels: The skill levels to compare, defaults to the SkillLevel of the settings.
+    :type skill_levels: iterable, optional
+    :param start_time: The in-game time of the first rotation step, defaults to 0.0.
+    :type start_time: float, optional
+    :param game_data: The reference data to use, defaults to the shared snapshot.
+    :type game_data: GameData, optional
+    :return: The DPS grid, one dictionary per combination with the keys LevelCap, SkillLevel, EnemyLevel,
+        Resistance, OpenerDPS, LoopDPS, DPS2Mins and Complexity, ordered by the settings in that order.
+    :rtype: list
+    :raises IncompleteInputError: If the lineup or the rotation is incomplete.
+    """
+    level_caps = list(level_caps) if level_caps is not None else [settings["LevelCap"]]
+    skill_levels = list(skill_levels) if skill_levels is not None else [settings["SkillLevel"]]
+    enemy_levels = list(enemy_levels) if enemy_levels is not None else [settings["EnemyLevel"]]
+    resistances = list(resistances) if resistances is not None else [settings["Resistance"]]
+
+    grid = []
+    for level_cap, skill_level in product(level_caps, skill_levels):
+        simulation_settings = dict(settings, LevelCap=level_cap, SkillLevel=skill_level, EnemyLevel=enemy_levels[0], Resistance=resistances[0])
+        simulation = Simulation(lineup, rotation, simulation_settings, start_time=start_time, game_data=game_data)
+        result = simulation.run()
+        for enemy_level, res in product(enemy_levels, resistances):
+            opener_dps, loop_dps, dps_2_mins = get_rescaled_dps(simulation, result, enemy_level, res)
+            grid.append({
+                "LevelCap": level_cap,
+                "SkillLevel": skill_level,
+                "EnemyLevel": enemy_level,
+                "Resistance": res,
+                "OpenerDPS": opener_dps,
+                "LoopDPS": loop_dps,
+                "DPS2Mins": dps_2_mins,
+                "Complexity": result.complexity
+            })
+    logger.debug(f"Swept {len(grid)} settings with {len(level_caps) * len(skill_levels)} simulations")
+    return grid
@@ -0,0 +1,233 @@
+"""
+Trace
+=====
+
+by @HikariTenshi
+original script by @Maygi
+
+This module records what happens in each step of a simulated rotation, e.g. which buffs are added,
+stacked, refreshed or expire, which passive damage procs, how the dynamic conditions change and when
+a skill has to wait for its cooldown. The events are only recorded while tracing is enabled, the
+simulation just checks whether there is a recorder otherwise. A trace can be saved as JSON Lines or
+in the Chrome trace event format, which can be opened in chrome://tracing or https://ui.perfetto.dev.
+
+Usage Example:
+
+    from engine import trace
+    from engine.simulation import simulate
+
+    with trace.tracing() as recorder:
+        simulate(lineup, rotation, settings)
+    recorder.save_jsonl("trace.jsonl")
+    recorder.save_chrome_trace("trace.json")
+
+The GUI saves a trace of every calculation if the environment variable WUWA_TRACE is set to a directory,
+as JSON Lines or as a Chrome trace if WUWA_TRACE_FORMAT is set to "chrome".
+"""
+
+import contextlib
+import json
+import logging
+import os
+from datetime import datetime
+from config.constants import logger
+
+logger = logging.getLogger(__name__)
+
+# Saves a trace of every calculation of the GUI to this directory if it is set, see finish_tracing
+TRACE_DIRECTORY_VARIABLE = "WUWA_TRACE"
+
+# The format of these traces, "jsonl" or "chrome"
+TRACE_FORMAT_VARIABLE = "WUWA_TRACE_FORMAT"
+
+# The Chrome trace events use microseconds, the events are placed at their in-game time
+MICROSECONDS = 1000000
+
+class TraceRecorder:
+    """
+    Collects the events of a simulation as compact (kind, row, time, character, fields) tuples.
+
+    Every rotation step starts with a "row" event, the other events belong to the last started row. The kinds are
+
+    - row: a rotation step, with the skill and its cast time.
+    - buff_added, buff_stacked, buff_refreshed, buff_queued, buff_expired, buff_removed: changes of the active buffs.
+    - passive_damage_added, proc, proc_damage: passive damage that has been triggered or procced and its damage.
+    - d_cond: a change of the Forte, Concerto or Resonance of a character.
+    - cooldown_wait, swap_delay: time added to the rotation.
+    - damage: the damage of a rotation step and the stats it has been calculated with.
+    """
+    def __init__(self):
+        self.events = []
+        self.row = None
+        self.time = None
+
+    def start_row(self, row, time, character, skill, cast_time):
+        """
+        Record the start of a rotation step.
+
+        :param row: The index of the rotation step.
+        :type row: int
+        :param time: The in-game time of the step.
+        :type time: float
+        :param character: The active character.
+        :type character: str
+        :param skill: The name of the skill.
+        :type skill: str
+        :param cast_time: The time the skill takes.
+        :type cast_time: float
+        """
+        self.row = row
+        self.time = time
+        self.events.append(("row", row, time, character, {"skill": skill, "cast_time": cast_time}))
+
+    def record(self, kind, time=None, character=None, row=None, **fields):
+        """
+        Record an event of a rotation step.
+
+        :param kind: The kind of the event, see the class description.
+        :type kind: str
+        :param time: The in-game time of the event, defaults to the time of the current rotation step.
+        :type time: float, optional
+        :param character: The character or "Team" the event belongs to, defaults to None.
+        :type character: str, optional
+        :param row: The index of the rotation step, defaults to the current rotation step.
+        :type row: int, optional
+        :param fields: The details of the event.
+        """
+        if row is None or row == self.row:
+            row, time = self.row, self.time if time is None else time
+        self.events.append((kind, row, time, character, fields))
+
+    def to_dicts(self):
+        """
+        Get the events as dictionaries.
+
+        :return: The events, with the keys kind, row, time and character and the fields of the event.
+        :rtype: list
+        """
+        return [
+            {"kind": kind, "row": row, "time": time, "character": character, **fields}
+            for kind, row, time, character, fields in self.events]
+
+    def save_jsonl(self, path):
+        """
+        Save the events as JSON Lines, one event per line.
+
+        :param path: The path of the file.
+        :type path: str
+        """
+        with open(path, "w", encoding="utf-8") as file:
+            for event in self.to_dicts():
+                file.write(json.dumps(event, default=str) + "\n")
+
+    def to_chrome_trace(self):
+        """
+        Convert the events to the Chrome trace event format, with one track per character.
+        The rotation steps are shown as spans of their cast time and the other events as instant events.
+
+        :return: The trace, with the events in "traceEvents".
+        :rtype: dict
+        """
+        threads = {None: 0, "Team": 1}
+        trace_events = []
+        for kind, row, time, character, fields in self.events:
+            if character not in threads:
+                threads[character] = len(threads)
+            event = {
+                "name": fields.get("skill") if kind == "row" else f'{kind}: {fields.get("name", "")}'.rstrip(": "),
+                "cat": kind,
+                "ts": (time or 0) * MICROSECONDS,
+                "pid": 0,
+                "tid": threads[character],
+                "args": {"row": row, **fields}
+            }
+            if kind == "row":
+                event.update({"ph": "X", "dur": max(fields["cast_time"], 0) * MICROSECONDS})
+            else:
+                event.update({"ph": "i", "s": "t"})
+            trace_events.append(event)
+        trace_events.extend(
+            {"name": "thread_name", "ph": "M", "pid": 0, "tid": tid, "args": {"name": character or "Rotation"}}
+            for character, tid in threads.items())
+        return {"traceEvents": trace_events, "displayTimeUnit": "ms"}
+
+    def save_chrome_trace(self, path):
+        """
+        Save the events in the Chrome trace event format, see to_chrome_trace.
+
+        :param path: The path of the file.
+        :type path: str
+        """
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(self.to_chrome_trace(), file, default=str)
+
+# The recorder the simulation records its events to, None while tracing is disabled
+recorder = None
+
+def start_tracing():
+    """
+    Record the events of the next simulations.
+
+    :return: The new recorder.
+    :rtype: TraceRecorder
+    """
+    global recorder
+    recorder = TraceRecorder()
+    return recorder
+
+def stop_tracing():
+    """
+    Stop recording the events.
+
+    :return: The recorder with the recorded events, or None if tracing wasn't enabled.
+    :rtype: TraceRecorder
+    """
+    global recorder
+    stopped, recorder = recorder, None
+    return stopped
+
+@contextlib.contextmanager
+def tracing():
+    """
+    Record the events of the simulations within a with block.
+    """
+    started = start_tracing()
+    try:
+        yield started
+    finally:
+        stop_tracing()
+
+def get_trace_directory():
+    """
+    Get the directory the traces of the GUI calculations are saved to.
+
+    :return: The directory in WUWA_TRACE, or None if the calculations aren't traced.
+    :rtype: str
+    """
+    return os.environ.get(TRACE_DIRECTORY_VARIABLE) or None
+
+def finish_tracing(name):
+    """
+    Stop tracing and save the trace to the directory in WUWA_TRACE, in the format in WUWA_TRACE_FORMAT.
+
+    :param name: The name of the trace, the file is named after it and the current time.
+    :type name: str
+    :return: The path of the saved trace, or None if there was nothing to save.
+    :rtype: str
+    """
+    stopped = stop_tracing()
+    directory = get_trace_directory()
+    if stopped is None or directory is None:
+        return None
+    if not stopped.events:
+        logger.info(f"Not saving the trace of the {name}, no events have been recorded")
+        return None
+    os.makedirs(directory, exist_ok=True)
+    chrome = os.environ.get(TRACE_FORMAT_VARIABLE, "jsonl").lower() == "chrome"
+    path = os.path.join(directory, f'{name}_{datetime.now():%Y%m%d_%H%M%S_%f}.{"json" if chrome else "jsonl"}')
+    if chrome:
+        stopped.save_chrome_trace(path)
+    else:
+        stopped.save_jsonl(path)
+    logger.info(f"Saved the trace of {len(stopped.events)} events to {path}")
+    return path
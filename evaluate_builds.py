@@ -0,0 +1,49 @@
+"""
+Evaluate Builds
+===============
+
+by @HikariTenshi
+
+This script evaluates the build strings stored in the constants database without the GUI,
+simulating them in parallel and writing the DPS of every build to a JSONL file or a database table.
+
+Example Usage:
+
+    python evaluate_builds.py --jsonl results.jsonl
+    python evaluate_builds.py --table BuildResults --tables ApprovedBuilds
+"""
+
+import argparse
+import logging
+from engine.batch import BUILD_TABLES, DatabaseResultWriter, JsonlResultWriter, get_settings, get_stored_builds, run_batch
+from config.constants import logger, CALCULATOR_DB_PATH, CONSTANTS_DB_PATH
+
+logger = logging.getLogger(__name__)
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Evaluate the build strings stored in the constants database.")
+    parser.add_argument("--tables", nargs="+", default=BUILD_TABLES, help="The tables to read the builds from.")
+    parser.add_argument("--jsonl", help="Write the results to this JSONL file.")
+    parser.add_argument("--table", help="Write the results to this table of the output database.")
+    parser.add_argument("--db", default=CALCULATOR_DB_PATH, help="The output database of --table.")
+    parser.add_argument("--workers", type=int, help="The amount of worker processes, defaults to the amount of CPU cores.")
+    arguments = parser.parse_args()
+    if not arguments.jsonl and not arguments.table:
+        parser.error("either --jsonl or --table is required")
+    return arguments
+
+def main():
+    arguments = parse_arguments()
+    writer = JsonlResultWriter(arguments.jsonl) if arguments.jsonl else DatabaseResultWriter(arguments.db, arguments.table)
+    try:
+        results = run_batch(get_stored_builds(CONSTANTS_DB_PATH, arguments.tables), writer, get_settings(), arguments.workers)
+    finally:
+        writer.close()
+
+    ranked = sorted((result for result in results if not result["Error"]), key=lambda result: result["DPS2Mins"], reverse=True)
+    for result in ranked:
+        logger.info(f'{result["DPS2Mins"]:>10.2f} DPS  {result["Source"]} {result["SourceID"]}: {result["Name"]}')
+
+# The worker processes import this module, so only start the batch when it is run as a script
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Optimize Echoes
+===============
+
+by @HikariTenshi
+
+This script searches the echo main stat layouts and substat distributions that maximize the 2 minute DPS
+of a lineup without the GUI, for the lineup and rotation of the calculator database or of a build stored
+in the constants database.
+
+Example Usage:
+
+    python optimize_echoes.py
+    python optimize_echoes.py --build ApprovedBuilds 3 --top 10 --max-rolls 4
+"""
+
+import argparse
+import logging
+from utils.database_io import fetch_data_from_database
+from engine.batch import decode_build, get_settings
+from engine.optimizer import MAX_ROLLS, optimize_echoes
+from engine.simulation import LINEUP_COLUMNS
+from config.constants import logger, CALCULATOR_DB_PATH, CONSTANTS_DB_PATH
+
+logger = logging.getLogger(__name__)
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Find the echo main stats and substats that maximize the DPS of a lineup.")
+    parser.add_argument("--build", nargs=2, metavar=("TABLE", "ID"), help="Optimize a build stored in the constants database instead of the calculator lineup.")
+    parser.add_argument("--layouts", nargs="+", help="Only consider these main stat layouts of the EchoBuilds table.")
+    parser.add_argument("--budgets", nargs=3, type=int, help="The amount of substat rolls of every character, defaults to the rolls of the lineup.")
+    parser.add_argument("--max-rolls", type=int, default=MAX_ROLLS, help="The maximum amount of rolls of a single substat.")
+    parser.add_argument("--top", type=int, default=5, help="The amount of allocations to show.")
+    parser.add_argument("--workers", type=int, help="The amount of worker processes, defaults to the amount of CPU cores.")
+    return parser.parse_args()
+
+def main():
+    arguments = parse_arguments()
+    if arguments.build:
+        table_name, build_id = arguments.build
+        _, lineup, rotation = decode_build(fetch_data_from_database(CONSTANTS_DB_PATH, table_name, columns="Build", where_clause=f"ID = {int(build_id)}")[0])
+    else:
+        lineup = [dict(zip(LINEUP_COLUMNS, row)) for row in fetch_data_from_database(CALCULATOR_DB_PATH, "CharacterLineup", columns=LINEUP_COLUMNS)]
+        rotation = fetch_data_from_database(CALCULATOR_DB_PATH, "RotationBuilder", columns=["Character", "Skill"])
+
+    allocations = optimize_echoes(
+        lineup, rotation, get_settings(), top_n=arguments.top, layouts=arguments.layouts,
+        budgets=arguments.budgets, max_rolls=arguments.max_rolls, max_workers=arguments.workers)
+    for rank, allocation in enumerate(allocations, start=1):
+        logger.info(f'#{rank}: {allocation["DPS2Mins"]:.2f} DPS ({allocation["Gain"]:+.2f})')
+        for layout, (character, rolls) in zip(allocation["Builds"], allocation["Rolls"].items()):
+            substats = ", ".join(f"{stat} {count}" for stat, count in rolls.items() if count)
+            gains = ", ".join(f"{stat} {gain:+.2f}" for stat, gain in allocation["MarginalGains"][character].items())
+            logger.info(f"    {character}: {layout} | {substats} | next roll: {gains}")
+
+# The worker processes import this module, so only start the optimization when it is run as a script
+if __name__ == "__main__":
+    main()
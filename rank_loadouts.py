@@ -0,0 +1,52 @@
+"""
+Rank Loadouts
+=============
+
+by @HikariTenshi
+
+This script ranks the weapons and echoes every character of a lineup could use without the GUI,
+for the lineup and rotation of the calculator database or of a build stored in the constants database.
+
+Example Usage:
+
+    python rank_loadouts.py
+    python rank_loadouts.py --build ApprovedBuilds 3 --combine
+"""
+
+import argparse
+import logging
+from utils.database_io import fetch_data_from_database
+from engine.batch import decode_build, get_settings
+from engine.ranking import rank_loadouts
+from engine.simulation import LINEUP_COLUMNS
+from config.constants import logger, CALCULATOR_DB_PATH, CONSTANTS_DB_PATH
+
+logger = logging.getLogger(__name__)
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Rank the weapons and echoes of a lineup by the DPS they add to its rotation.")
+    parser.add_argument("--build", nargs=2, metavar=("TABLE", "ID"), help="Rank a build stored in the constants database instead of the calculator lineup.")
+    parser.add_argument("--combine", action="store_true", help="Try every weapon with every echo instead of changing one of them at a time.")
+    parser.add_argument("--top", type=int, help="Only show this many loadouts.")
+    parser.add_argument("--workers", type=int, help="The amount of worker processes, defaults to the amount of CPU cores.")
+    return parser.parse_args()
+
+def main():
+    arguments = parse_arguments()
+    if arguments.build:
+        table_name, build_id = arguments.build
+        _, lineup, rotation = decode_build(fetch_data_from_database(CONSTANTS_DB_PATH, table_name, columns="Build", where_clause=f"ID = {int(build_id)}")[0])
+    else:
+        lineup = [dict(zip(LINEUP_COLUMNS, row)) for row in fetch_data_from_database(CALCULATOR_DB_PATH, "CharacterLineup", columns=LINEUP_COLUMNS)]
+        rotation = fetch_data_from_database(CALCULATOR_DB_PATH, "RotationBuilder", columns=["Character", "Skill"])
+
+    table = rank_loadouts(lineup, rotation, get_settings(), combine=arguments.combine, max_workers=arguments.workers)
+    for entry in table[:arguments.top]:
+        if entry["Error"]:
+            logger.info(f'{"failed":>10}  {entry["Character"]}: {entry["Weapon"]} R{entry["Rank"]}, {entry["Echo"]} ({entry["Error"]})')
+        else:
+            logger.info(f'{entry["Delta"]:>+10.2f}  {entry["Character"]}: {entry["Weapon"]} R{entry["Rank"]}, {entry["Echo"]}')
+
+# The worker processes import this module, so only start the ranking when it is run as a script
+if __name__ == "__main__":
+    main()
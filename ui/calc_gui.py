@@ -11,12 +11,15 @@ from utils.config_io import load_config
 from utils.naming_case import camel_to_snake
 from config.constants import logger, UI_FILE, CONFIG_PATH, CONSTANTS_DB_PATH, CALCULATOR_DB_PATH, CHARACTERS_DB_PATH
 from ui.custom_table_widget import CustomTableWidget
+from ui.rotation_table_view import RotationTableView
 
 logger = logging.getLogger(__name__)
 
 class UI(QMainWindow):
     initialize_calc_tables_signal = pyqtSignal()
     run_calculations_signal = pyqtSignal()
+    cancel_calculations_signal = pyqtSignal()
+    instrument_calculations_signal = pyqtSignal(bool)
     import_build_signal = pyqtSignal()
     export_build_signal = pyqtSignal()
     
@@ -49,14 +52,20 @@ class UI(QMainWindow):
         self.calculator_db_table_column_collection = [(table["ui_columns"] if "ui_columns" in table else table["expected_columns"]) for table in config[CALCULATOR_DB_PATH]["tables"]]
         self.characters_table_column_collection = [(table["ui_columns"] if "ui_columns" in table else table["expected_columns"]) for table in config["characters"]["tables"]]
         
-        # Replace QTableWidget with CustomTableWidget
+        # Replace QTableWidget with CustomTableWidget, or RotationTableView for the Rotation Builder
         self.constants_db_table_widgets = {
             name: self.findChild(CustomTableWidget, f'{camel_to_snake(name)}_table_widget')
             for name in constants_db_table_names}
         self.calculator_db_table_widgets = {
-            name: self.findChild(CustomTableWidget, f'{camel_to_snake(name)}_table_widget')
+            name: self.findChild((CustomTableWidget, RotationTableView), f'{camel_to_snake(name)}_table_widget')
             for name in calculator_db_table_names}
         self.character_table_widget_collection = {}
+
+        # The skill options of the Rotation Builder depend on the characters and echoes of the lineup
+        character_lineup_table = self.calculator_db_table_widgets.get("CharacterLineup")
+        rotation_builder_table = self.calculator_db_table_widgets.get("RotationBuilder")
+        if character_lineup_table and rotation_builder_table:
+            character_lineup_table.cellChanged.connect(lambda row, column: rotation_builder_table.invalidate_lineup_echoes())
     
     def handle_menu_actions(self):
         self.action_light_theme = self.findChild(QAction, "action_light_theme")
@@ -74,11 +83,17 @@ class UI(QMainWindow):
         self.action_run_calculations = self.findChild(QAction, "action_run_calculations")
         self.action_run_calculations.triggered.connect(self.run_calculations_signal.emit)
         
-        self.action_run_calculations = self.findChild(QAction, "action_import_build")
-        self.action_run_calculations.triggered.connect(self.import_build_signal.emit)
+        self.action_cancel_calculations = self.findChild(QAction, "action_cancel_calculations")
+        self.action_cancel_calculations.triggered.connect(self.cancel_calculations_signal.emit)
+
+        self.action_instrument_calculations = self.findChild(QAction, "action_instrument_calculations")
+        self.action_instrument_calculations.toggled.connect(self.instrument_calculations_signal.emit)
+        
+        self.action_import_build = self.findChild(QAction, "action_import_build")
+        self.action_import_build.triggered.connect(self.import_build_signal.emit)
         
-        self.action_run_calculations = self.findChild(QAction, "action_export_build")
-        self.action_run_calculations.triggered.connect(self.export_build_signal.emit)
+        self.action_export_build = self.findChild(QAction, "action_export_build")
+        self.action_export_build.triggered.connect(self.export_build_signal.emit)
 
     def create_character_tabs(self):
         self.characters_tab_widget = self.findChild(QTabWidget, "characters_tab_widget")
@@ -172,7 +187,7 @@ class UI(QMainWindow):
             rotation_builder_table.should_ensure_empty_row = True
             rotation_builder_table.dropdown_options = {
                 0: [""] + fetch_data_from_database(CALCULATOR_DB_PATH, "CharacterLineup", columns="Character"),
-                1: {} # Will be dynamically updated based on character selection
+                1: {} # Depends on the character of the row, see RotationTableView.get_dropdown_options
             }
 
     def load_table_widgets(self, table_widgets, column_name_collection, db_name):
@@ -202,11 +217,36 @@ class UI(QMainWindow):
             return self.character_table_widget_collection[table_name]
         return None
 
+    def get_all_table_widgets(self):
+        """Gets the table widgets of all databases, including the tables of every character tab."""
+        table_widgets = list(self.constants_db_table_widgets.values()) + list(self.calculator_db_table_widgets.values())
+        for section_table_widgets in self.character_table_widget_collection.values():
+            table_widgets.extend(section_table_widgets.values())
+        return [table_widget for table_widget in table_widgets if table_widget is not None]
+
     def set_invalid_cell(self, table_name, column_name, row, note="Invalid value"):
         """Marks a cell as invalid by coloring it red and adding a note."""
         if table_widget:= self.find_table_widget_by_name(table_name):
             table_widget.configure_cell(table_name, column_name, row, color="#FF0000", note=note)
 
+    def set_calculation_running(self, running, message=None):
+        """
+        Enables the action to cancel the calculations while they are running instead of the one to run them.
+        The tables and the actions that change them are disabled meanwhile, so the results match their inputs.
+        """
+        self.action_run_calculations.setEnabled(not running)
+        self.action_cancel_calculations.setEnabled(running)
+        for action in (self.action_import_build, self.action_reset_to_default, self.action_reload_tables):
+            action.setEnabled(not running)
+        for table_widget in self.get_all_table_widgets():
+            table_widget.setEnabled(not running)
+        if message is not None:
+            self.statusBar().showMessage(message)
+
+    def show_calculation_progress(self, done, total):
+        """Shows how many rotation rows have been simulated in the status bar."""
+        self.statusBar().showMessage(f"Calculating... {done}/{total} rotation rows")
+
     def toggle_stylesheet(self, palette):
         self.setStyleSheet(qdarkstyle.load_stylesheet(qt_api='pyqt5', palette=palette))
         self.palette = palette
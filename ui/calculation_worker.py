@@ -0,0 +1,134 @@
+"""
+Calculation Worker
+==================
+
+by @HikariTenshi
+
+This module runs calculations in a background thread, so the window stays responsive while a long
+rotation or a batch of builds is simulated. The worker reports its progress with Qt signals and can
+be cancelled, its result is handed back to the GUI thread once it is done.
+
+Module Dependencies
+-------------------
+- **PyQt5.QtCore**: Provides the `QObject` and `QThread` classes and the signals.
+
+Class Definitions
+-----------------
+**CalculationCancelled**: Raised in the worker thread to stop a calculation that has been cancelled.
+
+**CalculationWorker**: Runs a function in a `QThread` and passes it a progress callback.
+
+    - **run(self)**:
+      Runs the function and emits `finished` with its result, `failed` with the exception it raised
+      or `cancelled` if it has been cancelled. The pooled database connections of the thread are closed afterwards.
+
+    - **report_progress(self, done, total)**:
+      The progress callback of the function, it emits `progress` or stops the function if it has been cancelled.
+
+    - **cancel(self)**:
+      Requests the function to stop at its next progress report.
+
+Usage Example:
+
+    from ui.calculation_worker import CalculationWorker
+
+    def calculate(progress_callback=None):
+        return simulation_cache.simulate(lineup, rotation, settings, progress_callback=progress_callback)
+
+    worker = CalculationWorker(calculate)
+    worker.progress.connect(lambda done, total: print(f"{done}/{total}"))
+    worker.finished.connect(apply_results)
+    worker.start()
+"""
+
+import logging
+from PyQt5.QtCore import Qt, QObject, QThread, pyqtSignal, pyqtSlot
+from utils.database_io import release_thread_connections
+from config.constants import logger
+
+logger = logging.getLogger(__name__)
+
+class CalculationCancelled(Exception):
+    """Raised in the worker thread to stop a calculation that has been cancelled."""
+
+class CalculationWorker(QObject):
+    """
+    Runs a function in its own `QThread`.
+
+    The function is called with the keyword argument `progress_callback`, which it should call with the
+    amount of processed steps and the total amount of steps, e.g. the rows of a rotation.
+    The signals are delivered to the GUI thread, so their slots can update the widgets.
+
+    :param function: The function to run.
+    :type function: callable
+    :param args: The positional arguments of the function.
+    :param kwargs: The other keyword arguments of the function.
+    """
+    progress = pyqtSignal(int, int)
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(object)
+    cancelled = pyqtSignal()
+
+    def __init__(self, function, *args, **kwargs):
+        super().__init__()
+        self.function = function
+        self.args = args
+        self.kwargs = kwargs
+        self.cancel_requested = False
+        self.worker_thread = QThread()
+        self.moveToThread(self.worker_thread)
+        # Queued, so the function runs within the event loop of the thread and can quit it when it is done,
+        # directly from the thread, so the thread also stops while the GUI thread waits for it
+        self.worker_thread.started.connect(self.run, Qt.QueuedConnection)
+        for signal in (self.finished, self.failed, self.cancelled):
+            signal.connect(self.worker_thread.quit, Qt.DirectConnection)
+
+    def start(self):
+        """
+        Start the function in the worker thread.
+        """
+        self.worker_thread.start()
+
+    def is_running(self):
+        """
+        Check if the function is still running.
+
+        :return: True if the worker thread is running, False otherwise.
+        :rtype: bool
+        """
+        return self.worker_thread.isRunning()
+
+    @pyqtSlot()
+    def run(self):
+        try:
+            result = self.function(*self.args, progress_callback=self.report_progress, **self.kwargs)
+        except CalculationCancelled:
+            logger.info("The calculation has been cancelled")
+            self.cancelled.emit()
+        except Exception as e:
+            self.failed.emit(e)
+        else:
+            self.finished.emit(result)
+        finally:
+            # Every run has its own thread, so its pooled connections would stay open until the app quits
+            release_thread_connections()
+
+    def report_progress(self, done, total):
+        """
+        Report the progress of the function, called in the worker thread.
+
+        :param done: The amount of processed steps.
+        :type done: int
+        :param total: The total amount of steps.
+        :type total: int
+        :raises CalculationCancelled: If the calculation has been cancelled.
+        """
+        if self.cancel_requested:
+            raise CalculationCancelled()
+        self.progress.emit(done, total)
+
+    def cancel(self):
+        """
+        Request the function to stop at its next progress report.
+        """
+        self.cancel_requested = True
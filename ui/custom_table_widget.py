@@ -3,10 +3,11 @@ import traceback
 from PyQt5.QtWidgets import QApplication, QTableWidget, QTableWidgetItem, QMenu, QAction, QUndoStack, QHeaderView
 from PyQt5.QtGui import QKeySequence, QColor, QBrush, QFont
 from PyQt5.QtCore import Qt
-from utils.database_io import fetch_data_from_database, fetch_data_comparing_two_databases, overwrite_table_data_by_row_ids
+from utils.database_io import fetch_data_from_database, overwrite_table_data_by_row_ids
 from utils.config_io import load_config
 from utils.function_call_stack import FunctionCallStack
-from config.constants import logger, CONSTANTS_DB_PATH, CHARACTERS_DB_PATH, CONFIG_PATH, CALCULATOR_DB_PATH
+from engine.game_data import mark_game_data_edited
+from config.constants import logger, CONSTANTS_DB_PATH, CONFIG_PATH, CALCULATOR_DB_PATH
 from ui.custom_combo_box import CustomComboBox
 from ui.check_box_item import CheckBoxItem
 from ui.paste_command import PasteCommand
@@ -179,32 +180,21 @@ class CustomTableWidget(QTableWidget):
                     last_row_index = self.rowCount() - 1
                     if last_row_index >= 0:
                         # Check if the last row is empty
-                        column_range = range(self.columnCount())
-                        if self.table_name == "RotationBuilder": # Ignore the In-Game Time
-                            column_range = tuple(
-                                col for col in column_range if col != 2
-                            )
                         last_row_empty = all(
                             self.item(last_row_index, col) is None or self.item(last_row_index, col).text() == ''
-                            for col in column_range
+                            for col in range(self.columnCount())
                         )
                         if not last_row_empty:
                             self.insertRow(self.rowCount())
                             self.apply_dropdowns()
                             # Initialize dropdowns in the newly added row
                             self.initialize_row_dropdowns(self.rowCount() - 1)
-                            if self.table_name == "RotationBuilder":
-                                # Set In-Game Time to the value in the previous row
-                                self.setItem(last_row_index + 1, 2, QTableWidgetItem(self.item(last_row_index, 2).text()))
                     else:
                         # If there are no rows, insert the first row
                         self.insertRow(0)
                         self.apply_dropdowns()
                         # Initialize dropdowns in the newly added row
                         self.initialize_row_dropdowns(0)
-                        if self.table_name == "RotationBuilder":
-                            # Set In-Game Time to 0
-                            self.setItem(0, 2, QTableWidgetItem("0.00"))
                 self.restore_dropdown_state()  # Restore the state of dropdowns
         except Exception as e:
             logger.error(f'Failed to ensure one empty row\n{get_trace(e)}')
@@ -256,75 +246,9 @@ class CustomTableWidget(QTableWidget):
                                 else:
                                     weapon_options = [""]
                                 self.update_dropdown(row, 2, character, weapon_options)  # Update weapon dropdown (column 2)
-                    case "RotationBuilder":
-                        if column == 0:  # Character column
-                            item = self.item(row, column)
-                            if item is None:
-                                character = self.cellWidget(row, column).currentText()
-                            else:
-                                character = item.text()
-                            if character is None:
-                                logger.warning(f"Item at row {row}, column {column} in table {self.table_name} is None")
-                            else:
-                                if character != "":
-                                    skill_options = (
-                                        [""] +
-                                        fetch_data_from_database(f'{CHARACTERS_DB_PATH}/{character}.db', "Intro", columns="Skill") +
-                                        fetch_data_from_database(f'{CHARACTERS_DB_PATH}/{character}.db', "Outro", columns="Skill") +
-                                        list(fetch_data_comparing_two_databases(
-                                            CONSTANTS_DB_PATH, "Echoes", 
-                                            CALCULATOR_DB_PATH, "CharacterLineup", 
-                                            columns1="Echo", columns2="", 
-                                            where_clause=f"t2.Character = '{character}' AND t1.Echo LIKE t2.Echo || '%'")) +
-                                        fetch_data_from_database(f'{CHARACTERS_DB_PATH}/{character}.db', "Skills", columns="Skill")
-                                    )
-                                else:
-                                    skill_options = [""]
-                                self.update_dropdown(row, 1, character, skill_options)  # Update skill dropdown (column 1)
         except Exception as e:
             logger.error(f'Failed to update dependent dropdowns\n{get_trace(e)}')
 
-    def update_subsequent_in_game_times(self, row):
-        try:
-            with self.call_stack.track_function():
-                i = 1
-                while self.item(row + i, 2):
-                    in_game_time = float(self.item(row + i - 1, 2).text()) if row + i > 0 else 0.0
-                    time_to_add = None
-                    character_name = self.cellWidget(row + i - 1, 0).currentText()
-                    skill_name = self.cellWidget(row + i - 1, 1).currentText()
-                    if "" not in (character_name, skill_name):
-                        time_delay = fetch_data_from_database(CALCULATOR_DB_PATH, "RotationBuilder", columns="TimeDelay", where_clause=f"ID = '{row + i + 1}'")
-                        time_delay = 0 if time_delay == [] or time_delay[0] is None else time_delay[0]
-                        if skill_name.startswith("Intro:"):
-                            try:
-                                time_to_add = fetch_data_from_database(f'{CHARACTERS_DB_PATH}/{character_name}.db', "Intro", columns="Time", where_clause=f'Skill = "{skill_name}"')[0]
-                            except IndexError:
-                                logger.debug(f'Skill name {skill_name} has not been found in Intro table, searching Skills table')
-                        elif skill_name.startswith("Outro:"):
-                            try:
-                                time_to_add = fetch_data_from_database(f'{CHARACTERS_DB_PATH}/{character_name}.db', "Outro", columns="Time", where_clause=f'Skill = "{skill_name}"')[0]
-                            except IndexError:
-                                logger.debug(f'Skill name {skill_name} has not been found in Outro table, searching Skills table')
-                        if time_to_add is None:
-                            try:
-                                time_to_add = fetch_data_from_database(f'{CHARACTERS_DB_PATH}/{character_name}.db', "Skills", columns="Time - IFNULL(FreezeTime, 0)", where_clause=f'Skill = "{skill_name}"')[0] 
-                            except IndexError:
-                                logger.debug(f'Skill name {skill_name} has not been found in Skills table, searching Echo table')
-                        if time_to_add is None:
-                            try:
-                                time_to_add = fetch_data_from_database(CONSTANTS_DB_PATH, "Echoes", columns="Time", where_clause=f'Echo = "{skill_name}"')[0]
-                            except IndexError:
-                                logger.warning(f'Skill name {skill_name} has not been found in Echo table')
-                        if time_to_add is None:
-                            logger.error(f'Skill {skill_name} could not be found for character {character_name}')
-                        else:
-                            self.item(row + i, 2).setText(str(in_game_time + time_to_add + time_delay))
-                    i += 1
-                self.save_table_data()
-        except Exception as e:
-            logger.error(f'Failed to update subsequent in-game times\n{get_trace(e)}')
-
     def on_dropdown_changed(self, row, column):
         try:
             if self.call_stack.get_stack(): # Make sure this isn't running because of some other function
@@ -338,8 +262,6 @@ class CustomTableWidget(QTableWidget):
                     self.update_dependent_dropdowns(row, column)
                     self.ensure_one_empty_row()
                     self.save_table_data()
-                    if self.table_name == "RotationBuilder": # Update the In-Game Time of the next rows
-                        self.update_subsequent_in_game_times(row)
         except Exception as e:
             logger.error(f'Failed to process on_dropdown_changed\n{get_trace(e)}')
 
@@ -562,12 +484,6 @@ class CustomTableWidget(QTableWidget):
                             row_data[self.db_columns[col]] = cell_data
                             row_modified = True
 
-                    if self.table_name == "RotationBuilder": # Ignore incomplete rows in the Rotation Builder table
-                        character_name = self.cellWidget(row, 0).currentText()
-                        skill_name = self.cellWidget(row, 1).currentText()
-                        if "" in (character_name, skill_name):
-                            row_modified = False
-
                     # If the row has been modified, add it to the list
                     if row_modified:
                         # Calculate the row ID based on the row number (index starts at 0, ID starts at 1)
@@ -579,6 +495,9 @@ class CustomTableWidget(QTableWidget):
                 if modified_rows:
                     overwrite_table_data_by_row_ids(self.db_name, self.table_name, modified_rows)
                     logger.debug(f"Modified data for '{self.table_name}' has been saved successfully.")
+                    # The calculations have to reload the reference data and can't reuse results calculated with the old data
+                    if self.db_name != CALCULATOR_DB_PATH:
+                        mark_game_data_edited()
         except Exception as e:
             logger.error(f'Failed to save table data\n{get_trace(e)}')
 
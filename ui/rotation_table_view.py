@@ -0,0 +1,678 @@
+"""
+Rotation Table View
+===================
+
+by @HikariTenshi
+
+This module defines the table of the Rotation Builder as a `QTableView` backed by a `QAbstractTableModel`.
+The rows of the rotation are kept as plain lists in the model and the character and skill dropdowns
+are only created by an item delegate while a cell is being edited, so loading and scrolling a rotation
+doesn't create any widgets per cell and stays fast for long rotations.
+
+Module Dependencies
+-------------------
+- **PyQt5.QtWidgets**: Provides the `QTableView`, `QStyledItemDelegate` and `QUndoCommand` classes.
+- **PyQt5.QtCore**: Provides the `QAbstractTableModel` class and the item roles.
+- **utils.database_io**: Loads and saves the rows of the RotationBuilder table.
+- **engine.game_data**: Provides the skills of the characters and their cast times.
+
+Class Definitions
+-----------------
+**RotationTableModel**: Holds the rows of the rotation and the attributes of its cells.
+
+**ComboBoxDelegate**: Creates a `CustomComboBox` editor for the dropdown columns and a line edit for the others.
+
+**SetValuesCommand**: An undoable change of several cells, e.g. a paste.
+
+**RotationTableView**: The table of the Rotation Builder, with the interface of `CustomTableWidget` the calculator uses.
+
+Usage Example:
+
+    from ui.rotation_table_view import RotationTableView
+
+    table_view = RotationTableView()
+    table_view.should_ensure_empty_row = True
+    table_view.dropdown_options = {0: ["", "Jinhsi", "Yinlin", "Verina"], 1: {}}
+    table_view.setup_table(CALCULATOR_DB_PATH, "RotationBuilder", column_labels)
+    table_view.load_table_data()
+"""
+
+import logging
+import traceback
+from PyQt5.QtWidgets import QApplication, QTableView, QAbstractItemView, QStyledItemDelegate, QMenu, QAction, QUndoStack, QUndoCommand, QHeaderView
+from PyQt5.QtGui import QKeySequence, QColor, QBrush, QFont
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QTimer
+from utils.database_io import fetch_data_from_database, overwrite_table_data_by_row_ids
+from utils.config_io import load_config
+from utils.function_call_stack import FunctionCallStack
+from engine.game_data import get_game_data, get_skill_names
+from config.constants import logger, CONFIG_PATH, CALCULATOR_DB_PATH
+from ui.custom_combo_box import CustomComboBox
+
+logger = logging.getLogger(__name__)
+
+# The amount of rows that are measured to resize the columns to their contents
+RESIZE_CONTENTS_PRECISION = 100
+
+# The skill dropdown options of the rotation builder by character and echo, for the game data version skill_options_key
+skill_options_cache = {}
+skill_options_key = None
+
+def get_skill_options(character, echo_name, game_data):
+    """
+    Get the options of the skill dropdown of a character, building them only once per character and echo.
+
+    The options are built again when the echo of the character in the lineup or the game data changes.
+
+    :param character: The name of the character.
+    :type character: str
+    :param echo_name: The echo of the character in the lineup, or None if there is none.
+    :type echo_name: str
+    :param game_data: The current reference data.
+    :type game_data: GameData
+    :return: The skill options, starting with an empty option.
+    :rtype: list
+    """
+    global skill_options_key
+    if skill_options_key != game_data.key:
+        skill_options_cache.clear()
+        skill_options_key = game_data.key
+    key = (character, echo_name)
+    if key not in skill_options_cache:
+        skill_options_cache[key] = tuple([""] + get_skill_names(character, echo_name, game_data))
+    return list(skill_options_cache[key])
+
+def get_lineup_echoes():
+    """
+    Get the echo of every character in the lineup of the calculator database.
+
+    :return: The echo of each character.
+    :rtype: dict
+    """
+    return dict(fetch_data_from_database(CALCULATOR_DB_PATH, "CharacterLineup", columns=["Character", "Echo"]))
+
+class RotationTableModel(QAbstractTableModel):
+    """
+    A table model that holds the rows of a rotation as lists of strings.
+
+    The notes, font colors and font weights of the cells are kept by row and column,
+    so they stay in place when the rows are loaded again.
+    """
+
+    def __init__(self, parent=None):
+        """
+        Initializes an empty model.
+
+        :param parent: Optional parent object.
+        :type parent: QObject or None
+        """
+        super().__init__(parent)
+        self.column_labels = []
+        self.rows = []
+        self.cell_attributes = {}
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.column_labels)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role in (Qt.DisplayRole, Qt.EditRole):
+            return self.rows[index.row()][index.column()]
+
+        attributes = self.cell_attributes.get((index.row(), index.column()))
+        if attributes is None:
+            return None
+        if role == Qt.ToolTipRole:
+            return attributes["note"]
+        if role == Qt.ForegroundRole and attributes["font_color"]:
+            return QBrush(QColor(attributes["font_color"]))
+        if role == Qt.FontRole and attributes["font_weight"]:
+            font = QFont()
+            font.setWeight(attributes["font_weight"])
+            return font
+        return None
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if not index.isValid() or role != Qt.EditRole:
+            return False
+        value = "" if value is None else str(value)
+        if self.rows[index.row()][index.column()] == value:
+            return False
+        self.rows[index.row()][index.column()] = value
+        self.dataChanged.emit(index, index, [Qt.DisplayRole, Qt.EditRole])
+        return True
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsEditable
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return self.column_labels[section] if section < len(self.column_labels) else None
+        return str(section + 1)
+
+    def set_rows(self, column_labels, rows):
+        """
+        Replace all rows of the model.
+
+        :param column_labels: The labels of the columns.
+        :type column_labels: list
+        :param rows: The rows, None values are shown as empty cells.
+        :type rows: list
+        """
+        self.beginResetModel()
+        self.column_labels = list(column_labels)
+        self.rows = [self.to_row(row) for row in rows]
+        self.endResetModel()
+
+    def append_row(self, values=None):
+        """
+        Add a row at the end of the model.
+
+        :param values: The values of the row by column index, defaults to an empty row.
+        :type values: dict, optional
+        """
+        row = self.to_row(())
+        for column, value in (values or {}).items():
+            row[column] = value
+        self.beginInsertRows(QModelIndex(), len(self.rows), len(self.rows))
+        self.rows.append(row)
+        self.endInsertRows()
+
+    def to_row(self, values):
+        """
+        Convert the values of a row to strings, padded or cut to the amount of columns.
+
+        :param values: The values of the row.
+        :type values: tuple
+        :return: The row.
+        :rtype: list
+        """
+        row = ["" if value is None else str(value) for value in values[:len(self.column_labels)]]
+        return row + [""] * (len(self.column_labels) - len(row))
+
+    def set_cell_attributes(self, row, column, attributes):
+        """
+        Set the note, font color and font weight of a cell.
+
+        :param row: The row of the cell.
+        :type row: int
+        :param column: The column of the cell.
+        :type column: int
+        :param attributes: The attributes with the keys "note", "font_color" and "font_weight".
+        :type attributes: dict
+        """
+        self.cell_attributes[(row, column)] = attributes
+        if row < len(self.rows):
+            index = self.index(row, column)
+            self.dataChanged.emit(index, index, [Qt.ToolTipRole, Qt.ForegroundRole, Qt.FontRole])
+
+    def clear_cell_attributes(self):
+        """
+        Remove the attributes of all cells.
+        """
+        self.cell_attributes = {}
+        if self.rows and self.column_labels:
+            self.dataChanged.emit(
+                self.index(0, 0), self.index(len(self.rows) - 1, len(self.column_labels) - 1),
+                [Qt.ToolTipRole, Qt.ForegroundRole, Qt.FontRole])
+
+class ComboBoxDelegate(QStyledItemDelegate):
+    """
+    An item delegate that edits the dropdown columns of a `RotationTableView` with a `CustomComboBox`.
+
+    The editor only exists while the cell is being edited, its options are requested from the view
+    with `get_dropdown_options` when it is created. Cells of other columns are edited with a line edit.
+    """
+
+    def createEditor(self, parent, option, index):
+        options = self.parent().get_dropdown_options(index.row(), index.column())
+        if options is None:
+            return super().createEditor(parent, option, index)
+        editor = CustomComboBox(parent)
+        editor.addItems(options)
+        # Choosing an option ends the edit right away, like the dropdowns of the other tables
+        editor.activated.connect(lambda _: self.commit_and_close(editor))
+        QTimer.singleShot(0, editor.showPopup)
+        return editor
+
+    def setEditorData(self, editor, index):
+        if isinstance(editor, CustomComboBox):
+            editor.setCurrentText(index.data(Qt.EditRole) or "")
+        else:
+            super().setEditorData(editor, index)
+
+    def setModelData(self, editor, model, index):
+        if isinstance(editor, CustomComboBox):
+            model.setData(index, editor.currentText(), Qt.EditRole)
+        else:
+            super().setModelData(editor, model, index)
+
+    def commit_and_close(self, editor):
+        """
+        Write the chosen option to the model and close the editor.
+
+        :param editor: The dropdown of the edited cell.
+        :type editor: CustomComboBox
+        """
+        self.commitData.emit(editor)
+        self.closeEditor.emit(editor)
+
+class SetValuesCommand(QUndoCommand):
+    """
+    An undoable change of several cells of a `RotationTableView`.
+
+    :param table_view: The table view that is changed.
+    :type table_view: RotationTableView
+    :param old_values: The values before the change, by (row, column).
+    :type old_values: dict
+    :param new_values: The values after the change, by (row, column).
+    :type new_values: dict
+    """
+
+    def __init__(self, table_view, old_values, new_values):
+        super().__init__()
+        self.table_view = table_view
+        self.old_values = old_values
+        self.new_values = new_values
+
+    def undo(self):
+        self.table_view.set_values(self.old_values)
+
+    def redo(self):
+        self.table_view.set_values(self.new_values)
+
+class RotationTableView(QTableView):
+    def __init__(self, parent=None):
+        try:
+            super(RotationTableView, self).__init__(parent)
+
+            self.table_model = RotationTableModel(self)
+            self.setModel(self.table_model)
+            self.setItemDelegate(ComboBoxDelegate(self))
+            self.setEditTriggers(
+                QAbstractItemView.DoubleClicked | QAbstractItemView.SelectedClicked |
+                QAbstractItemView.EditKeyPressed | QAbstractItemView.AnyKeyPressed)
+
+            # Only measure the first rows when resizing the columns to their contents, so it doesn't scale with the rotation
+            self.horizontalHeader().setResizeContentsPrecision(RESIZE_CONTENTS_PRECISION)
+
+            self.setContextMenuPolicy(Qt.CustomContextMenu)
+            self.customContextMenuRequested.connect(self.show_context_menu)
+
+            # Initialize Undo/Redo stack
+            self.undo_stack = QUndoStack(self)
+
+            # Add shortcuts for copy/paste and undo/redo
+            self.copy_action = QAction("Copy", self)
+            self.paste_action = QAction("Paste", self)
+            self.undo_action = QAction("Undo", self)
+            self.redo_action = QAction("Redo", self)
+
+            self.copy_action.setShortcut(QKeySequence("Ctrl+C"))
+            self.paste_action.setShortcut(QKeySequence("Ctrl+V"))
+            self.undo_action.setShortcut(QKeySequence("Ctrl+Z"))
+            self.redo_action.setShortcut(QKeySequence("Ctrl+Y"))
+
+            self.copy_action.triggered.connect(self.copy_selection)
+            self.paste_action.triggered.connect(self.paste_selection)
+            self.undo_action.triggered.connect(self.undo_stack.undo)
+            self.redo_action.triggered.connect(self.undo_stack.redo)
+
+            for action in (self.copy_action, self.paste_action, self.undo_action, self.redo_action):
+                self.addAction(action)
+                action.setShortcutContext(Qt.WidgetWithChildrenShortcut)
+
+            # Dictionary to store dropdown options, a dictionary as options means they depend on the character
+            self.dropdown_options = {}
+
+            # Flag to determine if an empty row should be maintained
+            self.should_ensure_empty_row = False
+
+            # The echo of each character of the lineup, loaded when a skill dropdown is first needed
+            self.lineup_echoes = None
+
+            # Save the edits of the user
+            self.table_model.dataChanged.connect(self.on_data_changed)
+
+            self.call_stack = FunctionCallStack()
+        except Exception as e:
+            logger.error(f'Failed to init the RotationTableView\n{get_trace(e)}')
+
+    def setup_table(self, db_name, table_name, column_labels, dropdown_options=None):
+        try:
+            with self.call_stack.track_function():
+                self.db_name = db_name
+                self.table_name = table_name
+                self.column_labels = column_labels
+
+                if dropdown_options:
+                    self.dropdown_options = dropdown_options
+
+                config = load_config(CONFIG_PATH)
+                for table in config[db_name]["tables"]:
+                    if table_name == table["table_name"]:
+                        self.db_columns = list(table["db_columns"].keys())
+                        break
+        except Exception as e:
+            logger.error(f'Failed to setup table\n{get_trace(e)}')
+
+    def get_value(self, row, column):
+        return self.table_model.rows[row][column]
+
+    def is_complete_row(self, row):
+        """Checks if a row has both a character and a skill, incomplete rows are not saved."""
+        return "" not in (self.get_value(row, 0), self.get_value(row, 1))
+
+    def get_lineup_echoes(self):
+        """
+        Get the echo of every character in the lineup, reading the lineup only once until it changes.
+
+        :return: The echo of each character.
+        :rtype: dict
+        """
+        if self.lineup_echoes is None:
+            self.lineup_echoes = get_lineup_echoes()
+        return self.lineup_echoes
+
+    def invalidate_lineup_echoes(self):
+        """
+        Read the lineup again the next time a skill dropdown is needed, e.g. after an echo has been changed.
+        """
+        self.lineup_echoes = None
+
+    def get_skill_options(self, character):
+        """
+        Get the options of the skill dropdown of a character.
+
+        :param character: The name of the character, or an empty string if the row has none.
+        :type character: str
+        :return: The skill options, starting with an empty option.
+        :rtype: list
+        """
+        if character == "":
+            return [""]
+        return get_skill_options(character, self.get_lineup_echoes().get(character), get_game_data())
+
+    def get_invalid_skills(self, values):
+        """
+        Get the skills that are cleared because the character of their row would no longer have them.
+
+        :param values: The new values by (row, column).
+        :type values: dict
+        :return: The skill cells to clear, by (row, column) with empty values.
+        :rtype: dict
+        """
+        invalid_skills = {}
+        for row in sorted({row for row, column in values if column == 0}):
+            character = values[(row, 0)]
+            skill = values.get((row, 1), self.get_value(row, 1) if row < self.table_model.rowCount() else "")
+            if skill != "" and skill not in self.get_skill_options(character):
+                invalid_skills[(row, 1)] = ""
+        return invalid_skills
+
+    def get_dropdown_options(self, row, column):
+        """
+        Get the options of the dropdown of a cell.
+
+        :param row: The row of the cell.
+        :type row: int
+        :param column: The column of the cell.
+        :type column: int
+        :return: The options, or None if the column has no dropdown.
+        :rtype: list
+        """
+        options = self.dropdown_options.get(column)
+        if options is None:
+            return None
+        if isinstance(options, dict): # Skill column, depends on the character of the row
+            return self.get_skill_options(self.get_value(row, 0))
+        return [str(option) for option in options]
+
+    def get_column_index_by_name(self, column_name):
+        """Fetches the column index by its name."""
+        return next((col for col, label in enumerate(self.column_labels) if label == column_name), None)
+
+    def load_table_data(self):
+        try:
+            with self.call_stack.track_function():
+                table_data = fetch_data_from_database(self.db_name, self.table_name)
+                self.invalidate_lineup_echoes()
+                self.table_model.set_rows(self.column_labels, table_data)
+                self.ensure_one_empty_row()
+
+                # Adjust column widths after the data is set
+                for i in range(self.table_model.columnCount()):
+                    self.resizeColumnToContents(i)
+                    if self.columnWidth(i) > 200:
+                        self.setColumnWidth(i, 200)
+
+                header = self.horizontalHeader()
+                header.setSectionResizeMode(QHeaderView.Interactive)
+        except Exception as e:
+            logger.error(f'Failed to load table data\n{get_trace(e)}')
+
+    def ensure_one_empty_row(self):
+        try:
+            with self.call_stack.track_function():
+                if not self.should_ensure_empty_row:
+                    return
+                rows = self.table_model.rows
+                if not rows:
+                    # If there are no rows, insert the first row with an In-Game Time of 0
+                    self.table_model.append_row({2: "0.00"})
+                elif any(value != "" for col, value in enumerate(rows[-1]) if col != 2): # Ignore the In-Game Time
+                    # Start the new row at the In-Game Time of the previous row
+                    self.table_model.append_row({2: rows[-1][2]})
+        except Exception as e:
+            logger.error(f'Failed to ensure one empty row\n{get_trace(e)}')
+
+    def on_data_changed(self, top_left, bottom_right, roles=None):
+        try:
+            if self.call_stack.get_stack(): # Make sure this isn't running because of some other function
+                return
+            if roles and Qt.EditRole not in roles:
+                return
+            with self.call_stack.track_function():
+                logger.debug(f"Cells changed from row {top_left.row()}, column {top_left.column()} to row {bottom_right.row()}, column {bottom_right.column()} in table {self.table_name}")
+                if top_left.column() == 0: # Clear the skills the new character doesn't have
+                    characters = {(row, 0): self.get_value(row, 0) for row in range(top_left.row(), bottom_right.row() + 1)}
+                    for (row, column), value in self.get_invalid_skills(characters).items():
+                        self.table_model.setData(self.table_model.index(row, column), value)
+                self.ensure_one_empty_row()
+                self.save_rows(range(top_left.row(), bottom_right.row() + 1))
+                if any(column in self.dropdown_options for column in range(top_left.column(), bottom_right.column() + 1)):
+                    # Update the In-Game Time of the next rows
+                    self.update_subsequent_in_game_times(top_left.row())
+        except Exception as e:
+            logger.error(f'Failed to process on_data_changed\n{get_trace(e)}')
+
+    def save_rows(self, rows):
+        """
+        Save rows of the table to the database, incomplete rows are ignored.
+
+        :param rows: The indices of the rows to save.
+        :type rows: iterable
+        """
+        try:
+            with self.call_stack.track_function():
+                modified_rows = []
+                for row in rows:
+                    if not self.is_complete_row(row):
+                        continue
+                    row_data = {
+                        self.db_columns[col]: value
+                        for col, value in enumerate(self.table_model.rows[row]) if value}
+                    # The row ID is based on the row number (index starts at 0, ID starts at 1)
+                    row_data["ID"] = row + 1
+                    modified_rows.append(row_data)
+                if modified_rows:
+                    overwrite_table_data_by_row_ids(self.db_name, self.table_name, modified_rows)
+                    logger.debug(f"Modified data for '{self.table_name}' has been saved successfully.")
+        except Exception as e:
+            logger.error(f'Failed to save table data\n{get_trace(e)}')
+
+    def save_table_data(self):
+        self.save_rows(range(self.table_model.rowCount()))
+
+    def update_subsequent_in_game_times(self, row):
+        try:
+            with self.call_stack.track_function():
+                # The skill times come from the in-memory index of the game data and the time delays from the table
+                # itself, which has been saved before, so only the changed in-game times have to be written
+                game_data = get_game_data()
+                time_delay_column = self.db_columns.index("TimeDelay")
+                changed_rows = []
+                for next_row in range(row + 1, self.table_model.rowCount()):
+                    previous_time = self.get_value(next_row - 1, 2)
+                    if previous_time == "":
+                        break
+                    character_name = self.get_value(next_row - 1, 0)
+                    skill_name = self.get_value(next_row - 1, 1)
+                    if "" in (character_name, skill_name):
+                        continue
+                    timing = game_data.get_skill_timing(character_name, skill_name)
+                    if timing is None:
+                        logger.error(f'Skill {skill_name} could not be found for character {character_name}')
+                        continue
+                    time_delay = float(self.get_value(next_row, time_delay_column) or 0)
+                    time_to_add = timing[0] - timing[1]
+                    in_game_time = str(float(previous_time) + time_to_add + time_delay)
+                    self.table_model.setData(self.table_model.index(next_row, 2), in_game_time)
+                    if self.is_complete_row(next_row): # incomplete rows aren't saved
+                        changed_rows.append({"ID": next_row + 1, "InGameTime": in_game_time})
+                if changed_rows:
+                    overwrite_table_data_by_row_ids(self.db_name, self.table_name, changed_rows)
+        except Exception as e:
+            logger.error(f'Failed to update subsequent in-game times\n{get_trace(e)}')
+
+    def set_cell_attributes(self, column_name, row, note=None, font_color=None, font_weight=None):
+        """
+        Set attributes for a specific cell.
+        """
+        col = self.get_column_index_by_name(column_name)
+        if col is None:
+            logger.error(f'Column {column_name} could not be found in table {self.table_name}')
+            return
+        self.table_model.set_cell_attributes(row, col, {
+            'note': note,
+            'font_color': font_color,
+            'font_weight': font_weight
+        })
+
+    def clear_cell_attributes(self):
+        """
+        Clear all attributes (notes, font colors, weights) for all cells in the table.
+        """
+        self.table_model.clear_cell_attributes()
+        logger.debug("All cell attributes have been cleared.")
+
+    def set_values(self, values):
+        """
+        Set the values of several cells, adding rows if necessary, and save the changed rows.
+
+        :param values: The new values by (row, column).
+        :type values: dict
+        """
+        try:
+            with self.call_stack.track_function():
+                if not values:
+                    return
+                for row, column in sorted(values):
+                    while row >= self.table_model.rowCount():
+                        self.table_model.append_row()
+                    self.table_model.setData(self.table_model.index(row, column), values[(row, column)])
+                rows = sorted({row for row, _ in values})
+                self.ensure_one_empty_row()
+                self.save_rows(rows)
+                if any(column in self.dropdown_options for _, column in values):
+                    self.update_subsequent_in_game_times(max(rows[0] - 1, 0))
+        except Exception as e:
+            logger.error(f'Failed to set values\n{get_trace(e)}')
+
+    def show_context_menu(self, pos):
+        try:
+            menu = QMenu()
+
+            menu.addAction(self.copy_action)
+            menu.addAction(self.paste_action)
+            menu.addAction(self.undo_action)
+            menu.addAction(self.redo_action)
+
+            menu.exec_(self.mapToGlobal(pos))
+        except Exception as e:
+            logger.error(f'Failed to show context menu\n{get_trace(e)}')
+
+    def copy_selection(self):
+        try:
+            selection = self.selectionModel().selection()
+            if selection.isEmpty():
+                return
+
+            selected_range = selection[0]
+            data = [
+                "\t".join(self.get_value(row, col) for col in range(selected_range.left(), selected_range.right() + 1))
+                for row in range(selected_range.top(), selected_range.bottom() + 1)]
+            QApplication.clipboard().setText("\n".join(data))
+        except Exception as e:
+            logger.error(f'Failed to copy selection\n{get_trace(e)}')
+
+    def paste_selection(self):
+        try:
+            selection = self.selectionModel().selection()
+            if selection.isEmpty():
+                return
+
+            start_row = selection[0].top()
+            start_col = selection[0].left()
+            rows = QApplication.clipboard().text().rstrip("\n").split("\n")
+
+            old_values = {}
+            new_values = {}
+            for row_index, row_data in enumerate(rows):
+                row = start_row + row_index
+                for col_index, cell_data in enumerate(row_data.rstrip("\r").split("\t")):
+                    col = start_col + col_index
+                    if col >= self.table_model.columnCount():
+                        logger.warning("Paste exceeds column count, trimming data.")
+                        break  # Prevent pasting past the last column
+                    old_values[(row, col)] = self.get_value(row, col) if row < self.table_model.rowCount() else ""
+                    new_values[(row, col)] = cell_data
+
+            # Clear the skills the pasted characters don't have, as part of the same undoable change
+            for (row, col), value in self.get_invalid_skills(new_values).items():
+                old_values.setdefault((row, col), self.get_value(row, col))
+                new_values[(row, col)] = value
+
+            # Pushing the command pastes the data
+            self.undo_stack.push(SetValuesCommand(self, old_values, new_values))
+        except Exception as e:
+            logger.error(f'Failed to paste selection\n{get_trace(e)}')
+
+    def keyPressEvent(self, event):
+        try:
+            key = event.key()
+            modifiers = event.modifiers()
+
+            if key == Qt.Key_C and modifiers & Qt.ControlModifier:
+                self.copy_action.trigger()
+            elif key == Qt.Key_V and modifiers & Qt.ControlModifier:
+                self.paste_action.trigger()
+            elif key == Qt.Key_Z and modifiers & Qt.ControlModifier:
+                self.undo_action.trigger()
+            elif key == Qt.Key_Y and modifiers & Qt.ControlModifier:
+                self.redo_action.trigger()
+            else:
+                super(RotationTableView, self).keyPressEvent(event)
+        except Exception as e:
+            logger.error(f'Exception in keyPressEvent\n{get_trace(e)}')
+
+def get_trace(ex: BaseException):
+    return ''.join(traceback.TracebackException.from_exception(ex).format())
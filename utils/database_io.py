@@ -13,8 +13,10 @@ import contextlib
 import os
 import sqlite3
 import logging
+import threading
 from datetime import datetime
-from config.constants import logger, DB_TIME_FORMAT
+from utils.config_io import load_config
+from config.constants import logger, DB_TIME_FORMAT, CALCULATOR_DB_PATH, CHARACTERS_DB_PATH, CONFIG_PATH
 
 logger = logging.getLogger(__name__)
 
@@ -106,14 +108,9 @@ def table_exists(db_name, table_name):
         logger.debug(f"The database '{db_name}' does not exist.")
         return False
     
-    # Connect to the database and check for the table
+    # Check for the table in the cached schema of the database
     try:
-        conn = sqlite3.connect(db_name)
-        cursor = conn.cursor()
-        cursor.execute(f"SELECT name FROM sqlite_master WHERE type='table' AND name='{table_name}';")
-        table_exists = cursor.fetchone() is not None
-        conn.close()
-        return table_exists
+        return schema_cache.has_table(db_name, table_name)
     except sqlite3.Error as e:
         logger.error(f"An error occurred while checking for table '{table_name}': {e}")
         return False
@@ -129,9 +126,329 @@ def ensure_directory_exists(db_name):
     if not os.path.exists(directory) and directory != "":
         os.makedirs(directory)
 
+class PooledConnection(sqlite3.Connection):
+    """
+    A connection that stays open when it is closed, so it can be reused by the connection pool.
+
+    Closing it only rolls back uncommitted changes, like closing a regular connection would.
+    The connection pool closes it for real with close_pooled().
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.attached_databases = {}
+
+    def close(self):
+        if self.in_transaction:
+            self.rollback()
+
+    def close_pooled(self):
+        super().close()
+
+class ConnectionPool:
+    """
+    Keeps one open connection per database file and thread instead of opening and closing
+    a connection for every query.
+
+    The journal mode is only switched to WAL for the databases in wal_databases, because the
+    journal mode is stored in the database file itself and the other databases are shipped 
+    with the repository and only read by the calculator.
+
+    :param pre_attached: The databases to attach to every connection, with their aliases as keys.
+    :type pre_attached: dict, optional
+    :param pragmas: The PRAGMAs to set on every connection, defaults to DEFAULT_PRAGMAS.
+    :type pragmas: dict, optional
+    :param wal_databases: The databases to use the WAL journal mode for, defaults to the calculator database.
+    :type wal_databases: list, optional
+    """
+    DEFAULT_PRAGMAS = {
+        "synchronous": "NORMAL",
+        "cache_size": -16000, # 16 MB
+        "temp_store": "MEMORY"
+    }
+
+    def __init__(self, pre_attached=None, pragmas=None, wal_databases=None):
+        self.pre_attached = {alias: os.path.abspath(db_name) for alias, db_name in (pre_attached or {}).items()}
+        self.pragmas = self.DEFAULT_PRAGMAS if pragmas is None else pragmas
+        self.wal_databases = {os.path.abspath(db_name) for db_name in (wal_databases if wal_databases is not None else [CALCULATOR_DB_PATH])}
+        self.local = threading.local()
+        self.all_connections = []
+        self.lock = threading.Lock()
+
+    def get_connection(self, db_name):
+        """
+        Get the connection to a database for the current thread, opening it if necessary.
+
+        :param db_name: The name of the database.
+        :type db_name: str
+        :return: The pooled connection.
+        :rtype: PooledConnection
+        """
+        path = os.path.abspath(db_name)
+        connections = self.local.__dict__.setdefault("connections", {})
+        if path not in connections:
+            conn = sqlite3.connect(db_name, factory=PooledConnection, check_same_thread=False) # only used by this thread, but closed by close_all
+            for pragma, value in self.pragmas.items():
+                conn.execute(f"PRAGMA {pragma} = {value}")
+            if path in self.wal_databases:
+                conn.execute("PRAGMA journal_mode = WAL")
+            for alias, attached_path in self.pre_attached.items():
+                if attached_path != path and os.path.exists(attached_path):
+                    attach_second_database(conn, alias, attached_path)
+                    conn.attached_databases[attached_path] = alias
+            connections[path] = conn
+            with self.lock:
+                self.all_connections.append(conn)
+            # The schema is checked once per connection
+            schema_cache.invalidate(db_name)
+            logger.debug(f"Opened pooled connection to {db_name}")
+        return connections[path]
+
+    def release(self):
+        """
+        Close the connections of the current thread, e.g. before a worker thread finishes.
+        """
+        connections = self.local.__dict__.pop("connections", {})
+        with self.lock:
+            for conn in connections.values():
+                if conn in self.all_connections:
+                    self.all_connections.remove(conn)
+                conn.close_pooled()
+        if connections:
+            logger.debug(f"Closed {len(connections)} pooled connections of the finished thread")
+
+    def close_all(self):
+        """
+        Close all connections of the pool.
+        """
+        with self.lock:
+            for conn in self.all_connections:
+                conn.close_pooled()
+            self.all_connections = []
+        self.local = threading.local()
+
+# The active connection pool, None if every helper should open its own connection
+connection_pool = None
+
+def enable_connection_pool(pre_attached=None, pragmas=None, wal_databases=None):
+    """
+    Make all database helpers of this module reuse pooled connections instead of opening a new connection every time.
+
+    :param pre_attached: The databases to attach to every connection, with their aliases as keys.
+    :type pre_attached: dict, optional
+    :param pragmas: The PRAGMAs to set on every connection, defaults to ConnectionPool.DEFAULT_PRAGMAS.
+    :type pragmas: dict, optional
+    :param wal_databases: The databases to use the WAL journal mode for, defaults to the calculator database.
+    :type wal_databases: list, optional
+    :return: The connection pool.
+    :rtype: ConnectionPool
+    """
+    global connection_pool
+    disable_connection_pool()
+    connection_pool = ConnectionPool(pre_attached=pre_attached, pragmas=pragmas, wal_databases=wal_databases)
+    return connection_pool
+
+def disable_connection_pool():
+    """
+    Close all pooled connections and go back to opening a new connection for every operation.
+    """
+    global connection_pool
+    if connection_pool is not None:
+        connection_pool.close_all()
+        connection_pool = None
+
+def release_thread_connections():
+    """
+    Close the pooled connections of the current thread, if the connection pool is enabled.
+    Threads that only run once, like the calculation workers, call it when they are done.
+    """
+    if connection_pool is not None:
+        connection_pool.release()
+
+# Called with every SQL statement executed on a connection of connect_to_database, see set_statement_callback
+statement_callback = None
+
+def set_statement_callback(callback):
+    """
+    Call a function with every SQL statement that is executed on the connections returned by connect_to_database,
+    e.g. to count the queries of a calculation.
+
+    :param callback: The function to call with the statement, or None to stop calling the previous one.
+    :type callback: callable
+    """
+    global statement_callback
+    statement_callback = callback
+
+@contextlib.contextmanager
+def pooled_connections(pre_attached=None, pragmas=None, wal_databases=None):
+    """
+    Use pooled connections within a with block.
+
+    :param pre_attached: The databases to attach to every connection, with their aliases as keys.
+    :type pre_attached: dict, optional
+    :param pragmas: The PRAGMAs to set on every connection, defaults to ConnectionPool.DEFAULT_PRAGMAS.
+    :type pragmas: dict, optional
+    :param wal_databases: The databases to use the WAL journal mode for, defaults to the calculator database.
+    :type wal_databases: list, optional
+    """
+    pool = enable_connection_pool(pre_attached=pre_attached, pragmas=pragmas, wal_databases=wal_databases)
+    try:
+        yield pool
+    finally:
+        disable_connection_pool()
+
+class SchemaCache:
+    """
+    A registry of the columns of every table, so the hot paths don't have to query the 
+    catalog with PRAGMA table_info or sqlite_master on every call.
+
+    The registry is built from the table configuration and checked against each database 
+    with a single catalog query, once per pooled connection or, without the connection pool, 
+    once until the schema is invalidated. Tables that differ from the configuration or are 
+    missing from it are registered the way they are in the database, configured tables that 
+    don't exist in the database aren't registered. Creating or clearing a table invalidates 
+    the schema of its database, so it is checked again the next time it is used.
+
+    :param config_path: The path to the table configuration file.
+    :type config_path: str, optional
+    """
+    def __init__(self, config_path=CONFIG_PATH):
+        self.config_path = config_path
+        self.configured_schemas = None
+        self.schemas = {}
+        self.lock = threading.Lock()
+
+    def get_configured_schema(self, db_name):
+        """
+        Get the columns the table configuration defines for the tables of a database.
+
+        :param db_name: The name of the database.
+        :type db_name: str
+        :return: The configured columns, including ID, with the table names as keys.
+        :rtype: dict
+        """
+        if self.configured_schemas is None:
+            try:
+                config = load_config(self.config_path)
+            except FileNotFoundError:
+                config = {}
+            self.configured_schemas = {
+                os.path.abspath(db_key) if db_key.endswith(".db") else db_key: {
+                    table["table_name"]: ["ID"] + list(table["db_columns"].keys()) 
+                    for table in db_config.get("tables", [])}
+                for db_key, db_config in config.items()}
+        path = os.path.abspath(db_name)
+        if os.path.dirname(path) == os.path.abspath(CHARACTERS_DB_PATH):
+            return self.configured_schemas.get("characters", {})
+        return self.configured_schemas.get(path, {})
+
+    def read_schema(self, db_name):
+        """
+        Read the columns of all tables of a database with a single catalog query.
+
+        :param db_name: The name of the database.
+        :type db_name: str
+        :return: The columns, including ID, with the table names as keys.
+        :rtype: dict
+        """
+        conn = connect_to_database(db_name)
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+            SELECT m.name, p.name 
+            FROM sqlite_master AS m 
+            JOIN pragma_table_info(m.name) AS p 
+            WHERE m.type = 'table' 
+            ORDER BY m.name, p.cid
+            """)
+            schema = {}
+            for table_name, column_name in cursor.fetchall():
+                schema.setdefault(table_name, []).append(column_name)
+            return schema
+        finally:
+            # Closing a pooled connection would roll back the transaction of the caller
+            if not isinstance(conn, PooledConnection):
+                conn.close()
+
+    def get_schema(self, db_name):
+        """
+        Get the registered columns of all tables of a database, checking the configuration against the database 
+        if it hasn't been checked yet.
+
+        :param db_name: The name of the database.
+        :type db_name: str
+        :return: The columns, including ID, with the table names as keys.
+        :rtype: dict
+        """
+        path = os.path.abspath(db_name)
+        with self.lock:
+            schema = self.schemas.get(path)
+        if schema is not None:
+            return schema
+
+        database_schema = self.read_schema(db_name)
+        schema = {}
+        for table_name, configured_columns in self.get_configured_schema(db_name).items():
+            if database_schema.get(table_name) == configured_columns:
+                schema[table_name] = configured_columns
+            elif table_name in database_schema:
+                logger.debug(f"Table {table_name} in database {db_name} does not match the configuration, using the columns of the database")
+        for table_name, columns in database_schema.items():
+            schema.setdefault(table_name, columns)
+
+        with self.lock:
+            self.schemas[path] = schema
+        return schema
+
+    def has_table(self, db_name, table_name):
+        """
+        Check if a table exists.
+
+        :param db_name: The name of the database.
+        :type db_name: str
+        :param table_name: The name of the table.
+        :type table_name: str
+        :return: Whether the table exists in the database.
+        :rtype: bool
+        """
+        return table_name in self.get_schema(db_name)
+
+    def get_columns(self, db_name, table_name):
+        """
+        Get the columns of a table.
+
+        :param db_name: The name of the database.
+        :type db_name: str
+        :param table_name: The name of the table.
+        :type table_name: str
+        :return: A copy of the columns of the table including ID.
+        :rtype: list
+        :raises ValueError: If the table doesn't exist in the database.
+        """
+        columns = self.get_schema(db_name).get(table_name)
+        if columns is None:
+            raise ValueError(f"Table '{table_name}' does not exist in the database {db_name}.")
+        return list(columns)
+
+    def invalidate(self, db_name=None):
+        """
+        Remove the cached schema of a database, or of all databases if no database is specified.
+
+        :param db_name: The name of the database, defaults to None.
+        :type db_name: str, optional
+        """
+        with self.lock:
+            if db_name is None:
+                self.schemas = {}
+            else:
+                self.schemas.pop(os.path.abspath(db_name), None)
+
+# The cached table schemas of all databases
+schema_cache = SchemaCache()
+
 def connect_to_database(db_name):
     """
     Establish a connection to the SQLite database.
+    If the connection pool is enabled, the pooled connection for this database is returned instead.
 
     :param db_name: The name of the database.
     :type db_name: str
@@ -140,7 +457,10 @@ def connect_to_database(db_name):
     """
     try:
         ensure_directory_exists(db_name)
-        return sqlite3.connect(db_name)
+        conn = connection_pool.get_connection(db_name) if connection_pool is not None else sqlite3.connect(db_name)
+        # Also set when there is no callback, a pooled connection may still have the previous one
+        conn.set_trace_callback(statement_callback)
+        return conn
     except sqlite3.Error as e:
         logger.critical(f"Failed to connect to the database {db_name}: {e}")
         raise
@@ -162,6 +482,7 @@ def create_metadata_table(db_name):
     """)
     conn.commit()
     conn.close()
+    schema_cache.invalidate(db_name)
 
 def create_table(conn, table_name, db_columns):
     """
@@ -244,6 +565,7 @@ def initialize_database(db_name, table_name, db_columns, initial_data=None):
         conn.commit()
     finally:
         conn.close()
+    schema_cache.invalidate(db_name)
 
 def get_last_update_timestamp(db_name):
     """
@@ -277,6 +599,25 @@ def update_metadata(db_name, metadata):
     conn.commit()
     conn.close()
 
+def set_metadata_value(db_name, key, value):
+    """
+    Set a single value of the metadata table, creating the table if it doesn't exist.
+
+    :param db_name: The name of the database.
+    :type db_name: str
+    :param key: The key of the value.
+    :type key: str
+    :param value: The value.
+    :type value: str
+    """
+    if not table_exists(db_name, "metadata"):
+        create_metadata_table(db_name)
+    conn = connect_to_database(db_name)
+    cursor = conn.cursor()
+    cursor.execute("REPLACE INTO metadata (key, value) VALUES (?, ?)", (key, value))
+    conn.commit()
+    conn.close()
+
 def validate_columns(table_data, expected_columns, db_name, table_name):
     """
     Validate if the table data's first row matches the expected columns.
@@ -457,7 +798,7 @@ def update_table_using_fetch_function(db_name, table_name, db_columns, fetch_fun
         logger.critical(f"Failed to update table {table_name} in database {db_name}:\n{e}")
         raise
 
-def determine_columns_to_fetch(cursor, table_name, columns):
+def determine_columns_to_fetch(cursor, table_name, columns, db_name=None):
     """
     Determine which columns to fetch from the database.
 
@@ -467,12 +808,18 @@ def determine_columns_to_fetch(cursor, table_name, columns):
     :type table_name: str
     :param columns: The columns to fetch or None to fetch all columns except "ID".
     :type columns: str, list or None
+    :param db_name: The name of the database the table is in, used to look up the columns in the schema cache.
+    :type db_name: str, optional
     :return: A comma-separated string of columns to fetch or None.
     :rtype: str or None
     """
     if columns is None:
-        cursor.execute(f"PRAGMA table_info({table_name})")
-        columns = [info[1] for info in cursor.fetchall() if info[1].lower() != "id"]
+        if db_name is not None:
+            table_columns = schema_cache.get_columns(db_name, table_name)
+        else:
+            cursor.execute(f"PRAGMA table_info({table_name})")
+            table_columns = [info[1] for info in cursor.fetchall()]
+        columns = [column for column in table_columns if column.lower() != "id"]
     elif isinstance(columns, list):
         columns = [col for col in columns if col]
     elif isinstance(columns, str):
@@ -534,10 +881,10 @@ def fetch_data_from_database(db_name, table_name, columns=None, where_clause=Non
     conn = connect_to_database(db_name)
     cursor = conn.cursor()
     
-    columns_to_fetch = determine_columns_to_fetch(cursor, table_name, columns)
-    query = build_query(table_name, columns_to_fetch, where_clause)
-    
     try:
+        # The columns are looked up inside the try, a table that doesn't exist is logged like a failed query
+        columns_to_fetch = determine_columns_to_fetch(cursor, table_name, columns, db_name)
+        query = build_query(table_name, columns_to_fetch, where_clause)
         data = execute_query(cursor, query)
         if isinstance(columns, str):
             columns = [columns]
@@ -545,7 +892,7 @@ def fetch_data_from_database(db_name, table_name, columns=None, where_clause=Non
         # Handle the case where only one column is requested in total
         if columns is not None and len(columns) == 1:
             data = [row[0] for row in data]
-    except sqlite3.Error as e:
+    except (sqlite3.Error, ValueError) as e:
         logger.error(f"Failed to fetch data from table {table_name} in database {db_name}: {e}")
         data = []
     finally:
@@ -632,17 +979,11 @@ def check_table_exists(db_name, table_name):
     :return: True if the table exists, False otherwise.
     :rtype: bool
     """
-    conn = connect_to_database(db_name)
-    cursor = conn.cursor()
-
     try:
-        cursor.execute(f"SELECT name FROM sqlite_master WHERE type='table' AND name='{table_name}';")
-        exists = cursor.fetchone() is not None
+        exists = schema_cache.has_table(db_name, table_name)
     except sqlite3.Error as e:
         logger.error(f"Error checking table existence in {db_name}: {e}")
         exists = False
-    finally:
-        conn.close()
 
     return exists
 
@@ -700,12 +1041,15 @@ def fetch_data_comparing_two_databases(db_name1, table_name1, db_name2, table_na
         return []
     
     conn = connect_to_database(db_name1)
+    # Pooled connections may already have the second database attached
+    alias = getattr(conn, "attached_databases", {}).get(os.path.abspath(db_name2))
     try:
-        attach_second_database(conn, 'db2', db_name2)
-        columns1_to_fetch = determine_columns_to_fetch(conn.cursor(), table_name1, columns1)
-        columns2_to_fetch = determine_columns_to_fetch(conn.cursor(), table_name2, columns2)
+        if alias is None:
+            attach_second_database(conn, 'db2', db_name2)
+        columns1_to_fetch = determine_columns_to_fetch(conn.cursor(), table_name1, columns1, db_name1)
+        columns2_to_fetch = determine_columns_to_fetch(conn.cursor(), table_name2, columns2, db_name2)
 
-        query = build_comparison_query(table_name1, columns1_to_fetch, f'db2.{table_name2}', columns2_to_fetch, where_clause)
+        query = build_comparison_query(table_name1, columns1_to_fetch, f'{alias or "db2"}.{table_name2}', columns2_to_fetch, where_clause)
         data = execute_comparison_query(conn, query)
 
         # Handle the case where only one column is requested in total
@@ -716,6 +1060,9 @@ def fetch_data_comparing_two_databases(db_name1, table_name1, db_name2, table_na
         logger.error(f"Failed to fetch data comparing tables from {db_name1} and {db_name2}: {e}")
         data = []
     finally:
+        if alias is None and isinstance(conn, PooledConnection):
+            with contextlib.suppress(sqlite3.OperationalError):
+                conn.execute("DETACH DATABASE db2")
         conn.close()
     
     return data
@@ -779,9 +1126,7 @@ def overwrite_table_data_by_columns(db_name, table_name, columns, new_data):
     cursor = conn.cursor()
 
     # Validate the table columns
-    cursor.execute(f"PRAGMA table_info({table_name})")
-    table_info = cursor.fetchall()
-    table_columns = [info[1] for info in table_info]
+    table_columns = schema_cache.get_columns(db_name, table_name)
     
     if isinstance(columns, str):
         columns = [columns]
@@ -932,8 +1277,7 @@ def set_unspecified_columns_to_null(db_name, table_name, specified_columns, wher
     cursor = conn.cursor()
 
     # Retrieve the column names from the table schema
-    cursor.execute(f"PRAGMA table_info({table_name})")
-    all_columns = [info[1] for info in cursor.fetchall()]
+    all_columns = schema_cache.get_columns(db_name, table_name)
 
     # Ignore the "ID" column which is assumed to be the auto-increment primary key
     if "ID" in all_columns:
@@ -987,9 +1331,7 @@ def append_rows_to_table(db_name, table_name, columns=None, new_data=None):
     cursor = conn.cursor()
 
     # Retrieve table columns
-    cursor.execute(f"PRAGMA table_info({table_name})")
-    table_info = cursor.fetchall()
-    table_columns = [info[1] for info in table_info]
+    table_columns = schema_cache.get_columns(db_name, table_name)
 
     # Determine columns to insert into
     if columns is None:
@@ -1058,4 +1400,178 @@ def append_rows_to_table(db_name, table_name, columns=None, new_data=None):
 
     logger.debug(
         f"Appended {len(formatted_new_data)} row(s) to table '{table_name}' in database '{db_name}'."
-    )
\ No newline at end of file
+    )
+
+class BatchWriter:
+    """
+    Collect writes to a database and flush them with executemany in a single transaction,
+    so either all of them are visible or none of them.
+
+    The methods mirror overwrite_table_data, overwrite_table_data_by_columns and 
+    overwrite_table_data_by_row_ids, but nothing is written until flush() is called.
+    Used as a context manager, the writes are flushed at the end of the with block 
+    unless an exception has been raised.
+
+    Usage Example:
+
+        with BatchWriter("app.db") as writer:
+            writer.overwrite_table_data_by_columns("users", "name", ["John Doe", "Jane Smith"])
+            writer.overwrite_table_data_by_row_ids("users", [{"ID": 1, "age": 30}])
+
+    :param db_name: The name of the database.
+    :type db_name: str
+    """
+    def __init__(self, db_name):
+        self.db_name = db_name
+        self.operations = []
+        self.created_tables = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.flush()
+        else:
+            self.operations = []
+            self.created_tables = []
+
+    def validate_columns(self, table_name, columns):
+        table_columns = schema_cache.get_columns(self.db_name, table_name)
+        for col in columns:
+            if col not in table_columns:
+                raise ValueError(f"Column '{col}' does not exist in table '{table_name}'.")
+
+    def overwrite_table_data(self, table_name, db_columns, table_data):
+        """
+        Queue overwriting the data in the specified table with new data, creating the table if necessary.
+
+        :param table_name: The name of the table.
+        :type table_name: str
+        :param db_columns: A dictionary of column names and their data types.
+        :type db_columns: dict
+        :param table_data: The table data to be inserted.
+        :type table_data: list
+        """
+        placeholders = ", ".join(["?"] * len(db_columns))
+        insert_query = f"INSERT INTO {table_name} ({', '.join(db_columns.keys())}) VALUES ({placeholders})"
+        # Replace empty values with None (NULL) if necessary
+        rows = [[None if cell == "" else cell for cell in row] for row in table_data]
+
+        def operation(cursor):
+            create_table(cursor.connection, table_name, db_columns)
+            clear_table(cursor, table_name)
+            try:
+                cursor.executemany(insert_query, rows)
+            except sqlite3.ProgrammingError as e:
+                raise ValueError(
+                    f"{e}\n"
+                    f"insert_query = {insert_query}"
+                ) from e
+
+        self.operations.append(operation)
+        self.created_tables.append(table_name)
+
+    def overwrite_table_data_by_columns(self, table_name, columns, new_data):
+        """
+        Queue overwriting specific columns in a table with new data. If there are more rows in new_data than in the table,
+        new rows will be inserted.
+
+        :param table_name: The name of the table to update.
+        :type table_name: str
+        :param columns: The list of column names to be updated.
+        :type columns: str or list of str
+        :param new_data: The new data to insert into the specified columns.
+        :type new_data: list of tuples, list of lists, or list of values if single column
+        :raises ValueError: If the number of columns does not match the data.
+        """
+        if not new_data or not columns:
+            raise ValueError("Both 'new_data' and 'column_names' must be provided and cannot be empty.")
+
+        if isinstance(columns, str):
+            columns = [columns]
+        self.validate_columns(table_name, columns)
+
+        # Ensure new_data is in the correct format
+        if len(columns) == 1:
+            new_data = [(value,) for value in new_data]
+        else:
+            new_data = [tuple(row) for row in new_data]
+        for row_data in new_data:
+            if len(row_data) != len(columns):
+                raise ValueError(f"Row data length {len(row_data)} does not match the number of columns {len(columns)}.")
+
+        update_columns = ", ".join([f"{col} = ?" for col in columns])
+        update_query = f"UPDATE {table_name} SET {update_columns} WHERE ID = ?"
+        insert_query = f"INSERT INTO {table_name} ({', '.join(columns)}) VALUES ({', '.join(['?'] * len(columns))})"
+
+        def operation(cursor):
+            cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
+            row_count = cursor.fetchone()[0]
+            cursor.executemany(update_query, [(*row_data, row_id) for row_id, row_data in enumerate(new_data[:row_count], start=1)])
+            if len(new_data) > row_count:
+                cursor.executemany(insert_query, new_data[row_count:])
+
+        self.operations.append(operation)
+
+    def overwrite_table_data_by_row_ids(self, table_name, new_data):
+        """
+        Queue overwriting the data of the rows with the given IDs, inserting the rows that don't exist yet.
+        Only the columns provided in the new data dictionaries will be updated or inserted.
+
+        :param table_name: The name of the table.
+        :type table_name: str
+        :param new_data: A list of dictionaries containing the new data to insert/update.
+                        Each dictionary must include an "ID" key for identifying rows.
+        :type new_data: list of dict
+        """
+        self.validate_columns(table_name, [col for row_data in new_data for col in row_data.keys()])
+        row_ids = [row_data["ID"] for row_data in new_data]
+        insert_columns = list(new_data[0].keys())
+
+        def operation(cursor):
+            cursor.execute(f"SELECT ID FROM {table_name} WHERE ID IN ({', '.join(['?'] * len(row_ids))})", row_ids)
+            existing_ids = {row[0] for row in cursor.fetchall()}
+
+            # Group the updates by their columns so each group can be executed at once
+            updates = {}
+            for row_data in new_data:
+                if row_data["ID"] in existing_ids:
+                    update_columns = tuple(col for col in row_data.keys() if col != "ID")
+                    updates.setdefault(update_columns, []).append((*[row_data[col] for col in update_columns], row_data["ID"]))
+            for update_columns, values in updates.items():
+                set_clause = ", ".join([f"{col} = ?" for col in update_columns])
+                cursor.executemany(f"UPDATE {table_name} SET {set_clause} WHERE ID = ?", values)
+
+            inserts = [[row_data[col] for col in insert_columns] for row_data in new_data if row_data["ID"] not in existing_ids]
+            if inserts:
+                placeholders = ", ".join(["?"] * len(insert_columns))
+                cursor.executemany(f"INSERT INTO {table_name} ({', '.join(insert_columns)}) VALUES ({placeholders})", inserts)
+
+        self.operations.append(operation)
+
+    def flush(self):
+        """
+        Execute all queued writes in a single transaction.
+        If any of them fails, none of the writes are applied.
+        """
+        if not self.operations:
+            return
+        conn = connect_to_database(self.db_name)
+        try:
+            cursor = conn.cursor()
+            cursor.execute("BEGIN")
+            for operation in self.operations:
+                operation(cursor)
+            conn.commit()
+            logger.debug(f"Flushed {len(self.operations)} write(s) to database {self.db_name} in one transaction.")
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Failed to write to database {self.db_name}, all writes have been rolled back: {e}")
+            raise
+        finally:
+            conn.close()
+            if self.created_tables:
+                schema_cache.invalidate(self.db_name)
+            self.operations = []
+            self.created_tables = []
@@ -0,0 +1,263 @@
+"""
+Instrumentation
+===============
+
+by @HikariTenshi
+
+This module measures where the time of a calculation goes. While a run is being recorded, named
+phase timers add up the time spent in each phase and counters count things like the database
+queries, the written rows, the evaluated buffs, the procs and the deep copies. The report of a run
+is logged when the run is finished and can also be saved as a JSON file.
+
+The instrumentation is enabled by setting the environment variable WUWA_INSTRUMENTATION to 1 or
+with the "Instrument Calculations" toggle of the Run menu. If the environment variable
+WUWA_INSTRUMENTATION_REPORTS is set, the report of every run is saved to that directory.
+While no run is being recorded, the timers and counters only check that there is no recorder,
+so they can stay in the code.
+
+Usage Example:
+
+    from utils import instrumentation
+
+    instrumentation.start_run("calculation")
+
+    with instrumentation.phase("load"):
+        rows = load_rows()
+
+    start = instrumentation.start_timer()
+    for row in rows:
+        process(row)
+    instrumentation.stop_timer("rows", start)
+    instrumentation.count("rows_processed", len(rows))
+
+    report = instrumentation.finish_run()
+"""
+
+import contextlib
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from utils.database_io import set_statement_callback
+from config.constants import logger
+
+logger = logging.getLogger(__name__)
+
+# Enables the instrumentation when set to 1
+ENABLE_VARIABLE = "WUWA_INSTRUMENTATION"
+
+# The directory to save the JSON reports to
+REPORT_DIRECTORY_VARIABLE = "WUWA_INSTRUMENTATION_REPORTS"
+
+# The SQL statements counted as written rows, executemany reports every row as its own statement
+WRITE_STATEMENTS = ("INSERT", "UPDATE", "REPLACE")
+
+class RunRecorder:
+    """
+    Records the phase times and counters of a single run.
+    The phases and counters may be recorded from several threads, e.g. the worker thread and the GUI thread.
+
+    :param name: The name of the run, used for the report.
+    :type name: str
+    """
+    def __init__(self, name):
+        self.name = name
+        self.started = datetime.now()
+        self.start_time = time.perf_counter()
+        self.phases = {} # the total seconds and the amount of calls, by phase name
+        self.counters = {}
+        self.lock = threading.Lock()
+
+    def add_time(self, name, seconds):
+        """
+        Add the time of a call to a phase.
+
+        :param name: The name of the phase.
+        :type name: str
+        :param seconds: The time spent in the phase.
+        :type seconds: float
+        """
+        with self.lock:
+            phase = self.phases.get(name)
+            if phase is None:
+                self.phases[name] = [seconds, 1]
+            else:
+                phase[0] += seconds
+                phase[1] += 1
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """
+        Add the time spent within a with block to a phase.
+
+        :param name: The name of the phase.
+        :type name: str
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def count(self, name, amount=1):
+        """
+        Increase a counter.
+
+        :param name: The name of the counter.
+        :type name: str
+        :param amount: The amount to add, defaults to 1.
+        :type amount: int, optional
+        """
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def count_statement(self, statement):
+        self.count("db_queries")
+        if statement.lstrip().upper().startswith(WRITE_STATEMENTS):
+            self.count("rows_written")
+
+    def get_report(self):
+        """
+        Get the recorded phases and counters.
+
+        :return: The report, with the name, start and wall time of the run, the seconds and calls of each phase
+            and the counters.
+        :rtype: dict
+        """
+        with self.lock:
+            return {
+                "name": self.name,
+                "started": self.started.isoformat(timespec="milliseconds"),
+                "wall_time": time.perf_counter() - self.start_time,
+                "phases": {
+                    name: {"seconds": seconds, "calls": calls}
+                    for name, (seconds, calls) in sorted(self.phases.items(), key=lambda item: item[1][0], reverse=True)},
+                "counters": dict(sorted(self.counters.items()))
+            }
+
+# Whether the next runs are recorded
+enabled = os.environ.get(ENABLE_VARIABLE, "").lower() in ("1", "true", "yes")
+
+# The recorder of the current run, None while no run is being recorded
+recorder = None
+
+# Returned by phase while no run is being recorded
+NO_PHASE = contextlib.nullcontext()
+
+def set_enabled(value):
+    """
+    Enable or disable recording the next runs, a run that is already being recorded isn't affected.
+
+    :param value: Whether to record the next runs.
+    :type value: bool
+    """
+    global enabled
+    enabled = bool(value)
+    logger.info(f"Instrumentation {'enabled' if enabled else 'disabled'}")
+
+def start_run(name):
+    """
+    Start recording a run if the instrumentation is enabled.
+
+    :param name: The name of the run, used for the report.
+    :type name: str
+    :return: The recorder of the run, or None if the instrumentation is disabled.
+    :rtype: RunRecorder
+    """
+    global recorder
+    if not enabled:
+        return None
+    recorder = RunRecorder(name)
+    set_statement_callback(recorder.count_statement)
+    return recorder
+
+def finish_run():
+    """
+    Stop recording the current run, log its report and save it if WUWA_INSTRUMENTATION_REPORTS is set.
+
+    :return: The report of the run, or None if no run is being recorded.
+    :rtype: dict
+    """
+    global recorder
+    if recorder is None:
+        return None
+    set_statement_callback(None)
+    report = recorder.get_report()
+    recorder = None
+
+    logger.info(f'Instrumentation of {report["name"]}: {report["wall_time"]:.4f} s')
+    for name, phase in report["phases"].items():
+        logger.info(f'  {name:<24} {phase["seconds"]:>9.4f} s {phase["calls"]:>8} calls')
+    for name, value in report["counters"].items():
+        logger.info(f"  {name:<24} {value:>9}")
+
+    report_directory = os.environ.get(REPORT_DIRECTORY_VARIABLE)
+    if report_directory:
+        save_report(report, report_directory)
+    return report
+
+def save_report(report, directory):
+    """
+    Save the report of a run as a JSON file, named after the run and its start.
+
+    :param report: The report of finish_run.
+    :type report: dict
+    :param directory: The directory to save the report to, it is created if it doesn't exist.
+    :type directory: str
+    :return: The path of the report.
+    :rtype: str
+    """
+    os.makedirs(directory, exist_ok=True)
+    started = datetime.fromisoformat(report["started"])
+    path = os.path.join(directory, f'{report["name"]}_{started:%Y%m%d_%H%M%S_%f}.json')
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(report, file, indent=2)
+    logger.info(f"Saved the instrumentation report to {path}")
+    return path
+
+def phase(name):
+    """
+    Add the time spent within a with block to a phase of the current run.
+
+    :param name: The name of the phase.
+    :type name: str
+    :return: The context manager to use in the with statement, which does nothing while no run is being recorded.
+    """
+    if recorder is None:
+        return NO_PHASE
+    return recorder.phase(name)
+
+def start_timer():
+    """
+    Start timing a phase that doesn't fit into a with block, see stop_timer.
+
+    :return: The start time, or None while no run is being recorded.
+    :rtype: float
+    """
+    return time.perf_counter() if recorder is not None else None
+
+def stop_timer(name, start):
+    """
+    Add the time since start_timer to a phase of the current run.
+
+    :param name: The name of the phase.
+    :type name: str
+    :param start: The return value of start_timer.
+    :type start: float
+    """
+    if start is not None and recorder is not None:
+        recorder.add_time(name, time.perf_counter() - start)
+
+def count(name, amount=1):
+    """
+    Increase a counter of the current run.
+
+    :param name: The name of the counter.
+    :type name: str
+    :param amount: The amount to add, defaults to 1.
+    :type amount: int, optional
+    """
+    if recorder is not None:
+        recorder.count(name, amount)